@@ -0,0 +1,179 @@
+"""
+Columnar BOQ representation and vectorized pricing
+"""
+import numpy as np
+
+from .costing import cost_breakdown
+
+# Lookups of up to this many codes go through a dict, so pricing an ordinary
+# BOQ does not import pandas; bulk lookups use a pandas hash index
+DICT_LOOKUP_MAX = 4096
+
+
+def _text_array(values):
+    """Text column as an array; fixed-width (e.g. memory-mapped) arrays are kept as-is"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'UO':
+        return values
+    return np.asarray(values, dtype=object)
+
+
+class RateIndex:
+    """Rate book held as arrays, with the code -> position map built once
+
+    Arrays that are already float64 / fixed-width text (such as memory-mapped
+    snapshot arrays) are used without copying.
+    """
+
+    def __init__(self, codes, rates, descriptions=None, units=None):
+        self.codes = _text_array(codes)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.descriptions = _text_array(descriptions) if descriptions is not None else self.codes
+        self.units = (_text_array(units)
+                      if units is not None else np.full(len(self.codes), 'unit', dtype=object))
+        self._index = None
+        self._positions = None
+        self._rates_padded = None
+
+    @classmethod
+    def from_dict(cls, rates, rates_full=None):
+        """Build from a {item_code: rate} dict, taking text columns from rates_full"""
+        codes = list(rates.keys())
+        values = list(rates.values())
+        if rates_full is None:
+            return cls(codes, values)
+        info = rates_full.reindex(codes)
+        descriptions = info['description'].to_numpy(dtype=object)
+        missing = info['description'].isna().to_numpy()
+        descriptions[missing] = np.asarray(codes, dtype=object)[missing]
+        return cls(codes, values, descriptions, info['unit'].fillna('unit').to_numpy())
+
+    @classmethod
+    def from_frame(cls, rates_full):
+        """Build from a frame indexed by item_code with rate_inr/description/unit"""
+        return cls(rates_full.index.to_numpy(), rates_full['rate_inr'].to_numpy(),
+                   rates_full['description'].to_numpy(), rates_full['unit'].to_numpy())
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _position_map(self):
+        """{code: position}, built on first use"""
+        if self._positions is None:
+            self._positions = dict(zip(self.codes.tolist(), range(len(self.codes))))
+        return self._positions
+
+    def _hash_index(self):
+        """pandas Index over the codes, built on first bulk lookup"""
+        if self._index is None:
+            import pandas as pd
+            self._index = pd.Index(self.codes)
+        return self._index
+
+    def __contains__(self, code):
+        return code in self._position_map()
+
+    def position(self, code):
+        """Position of one code in the rate book (-1 if missing)"""
+        return self._position_map().get(code, -1)
+
+    def lookup(self, codes):
+        """Positions of codes in the rate book (-1 where missing)"""
+        codes = np.asarray(codes, dtype=object)
+        if codes.size <= DICT_LOOKUP_MAX:
+            get = self._position_map().get
+            return np.fromiter((get(code, -1) for code in codes.ravel()), dtype=np.intp, count=codes.size)
+        return self._hash_index().get_indexer(codes)
+
+    def rates_at(self, positions):
+        """Rates for positions returned by ``lookup`` (0 for missing codes)"""
+        if self._rates_padded is None:
+            # Trailing zero slot: position -1 (unknown code) prices at 0
+            self._rates_padded = np.append(self.rates, 0.0)
+        return self._rates_padded[positions]
+
+
+class ColumnarBOQ:
+    """BOQ as parallel arrays: rate-book positions, quantities and item codes"""
+
+    def __init__(self, positions, quantities, rate_index, codes=None):
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.quantities = np.asarray(quantities, dtype=np.float64)
+        self.rate_index = rate_index
+        self.codes = codes
+
+    @classmethod
+    def from_dict(cls, boq_dict, rate_index):
+        """Build from a {item_code: quantity} dict"""
+        codes = np.fromiter(boq_dict.keys(), dtype=object, count=len(boq_dict))
+        quantities = np.fromiter(boq_dict.values(), dtype=np.float64, count=len(boq_dict))
+        return cls(rate_index.lookup(codes), quantities, rate_index, codes)
+
+    @classmethod
+    def from_arrays(cls, codes, quantities, rate_index):
+        """Build from parallel code and quantity sequences (codes may repeat)"""
+        codes = np.asarray(codes, dtype=object)
+        return cls(rate_index.lookup(codes), quantities, rate_index, codes)
+
+    def __len__(self):
+        return len(self.quantities)
+
+    @property
+    def rates(self):
+        return self.rate_index.rates_at(self.positions)
+
+    @property
+    def amounts(self):
+        return self.quantities * self.rates
+
+    def net_cost(self):
+        return float(self.quantities @ self.rates)
+
+    def to_frame(self):
+        """Tabular BOQ with description and unit from the rate book"""
+        known = self.positions >= 0
+        codes = self.codes if self.codes is not None else self.rate_index.codes[self.positions]
+        descriptions = np.where(known, self.rate_index.descriptions[self.positions], codes)
+        units = np.where(known, self.rate_index.units[self.positions], 'unit')
+        import pandas as pd
+        rates = self.rates
+        return pd.DataFrame({
+            'Item Code': codes,
+            'Description': descriptions,
+            'Unit': units,
+            'Quantity': self.quantities,
+            'Rate (₹)': rates,
+            'Amount (₹)': self.quantities * rates,
+        })
+
+
+def price_boq(boq, overhead=0.08, contingency=0.10, gst=0.18):
+    """Cost summary for a ColumnarBOQ, including per-item amounts"""
+    amounts = boq.amounts
+    summary = cost_breakdown(amounts.sum(), overhead, contingency, gst)
+    summary = {key: float(value) for key, value in summary.items()}
+    summary['amounts'] = amounts
+    return summary
+
+
+def price_many(boqs, overhead=0.08, contingency=0.10, gst=0.18):
+    """Price several BOQs that share one RateIndex in a single vectorized pass"""
+    if not boqs:
+        return []
+    rate_index = boqs[0].rate_index
+    if any(boq.rate_index is not rate_index for boq in boqs):
+        raise ValueError("All BOQs must be priced against the same RateIndex")
+
+    lengths = np.array([len(boq) for boq in boqs])
+    positions = np.concatenate([boq.positions for boq in boqs])
+    quantities = np.concatenate([boq.quantities for boq in boqs])
+    amounts = quantities * rate_index.rates_at(positions)
+
+    owners = np.repeat(np.arange(len(boqs)), lengths)
+    net = np.bincount(owners, weights=amounts, minlength=len(boqs))
+    totals = cost_breakdown(net, overhead, contingency, gst)
+
+    splits = np.split(amounts, np.cumsum(lengths)[:-1])
+    return [
+        dict({key: float(values[i]) for key, values in totals.items()}, amounts=splits[i])
+        for i in range(len(boqs))
+    ]
@@ -4,8 +4,6 @@ Costing engine with rate loading and cost calculations
 import pathlib
 import sys
 
-import pandas as pd
-
 
 def get_csv_path():
     """Get the path to unit rates CSV"""
@@ -20,17 +18,16 @@ def get_csv_path():
     return base_path / 'data' / 'unit_rates_rajssr2024.csv'
 
 
-def load_rates():
-    """Load unit rates from CSV file"""
-    csv_path = get_csv_path()
-    df = pd.read_csv(csv_path)
-    return df.set_index('item_code')['rate_inr'].to_dict()
+def load_rates(name='unit', region=None, year=None):
+    """Load unit rates as {item_code: rate} from the shared rate book registry"""
+    from .ratebook import get_registry
+    return get_registry().get(name, region, year).as_dict()
 
 
-def load_rates_full():
+def load_rates_full(name='unit', region=None, year=None):
     """Load full rate data including descriptions and units"""
-    csv_path = get_csv_path()
-    return pd.read_csv(csv_path).set_index('item_code')
+    from .ratebook import get_registry
+    return get_registry().get(name, region, year).as_frame()
 
 
 def cost_item(qty, item_code, rates):
@@ -38,18 +35,12 @@ def cost_item(qty, item_code, rates):
     return qty * rates.get(item_code, 0)
 
 
-def total_project_cost(boq_dict, rates, overhead=0.08, contingency=0.10, gst=0.18):
+def cost_breakdown(net, overhead=0.08, contingency=0.10, gst=0.18):
     """
-    Calculate total project cost with overheads
+    Apply overhead, contingency and GST to a net cost
     
-    Parameters:
-    - boq_dict: Dictionary of {item_code: quantity}
-    - rates: Dictionary of {item_code: rate}
-    - overhead: Overhead percentage (default 8%)
-    - contingency: Contingency percentage (default 10%)
-    - gst: GST percentage (default 18%)
+    Works on scalars or NumPy arrays (parameters broadcast against net).
     """
-    net = sum(cost_item(q, code, rates) for code, q in boq_dict.items())
     oh = net * overhead
     cont = (net + oh) * contingency
     tax = (net + oh + cont) * gst
@@ -61,3 +52,23 @@ def total_project_cost(boq_dict, rates, overhead=0.08, contingency=0.10, gst=0.1
         'gst': tax,
         'grand_total': net + oh + cont + tax
     }
+
+
+def total_project_cost(boq_dict, rates, overhead=0.08, contingency=0.10, gst=0.18):
+    """
+    Calculate total project cost with overheads
+    
+    Parameters:
+    - boq_dict: Dictionary of {item_code: quantity}, or a ColumnarBOQ
+    - rates: Dictionary of {item_code: rate} (ignored for a ColumnarBOQ,
+      which carries its own rate book)
+    - overhead: Overhead percentage (default 8%)
+    - contingency: Contingency percentage (default 10%)
+    - gst: GST percentage (default 18%)
+    """
+    if isinstance(boq_dict, dict):
+        net = sum(cost_item(q, code, rates) for code, q in boq_dict.items())
+    else:
+        net = boq_dict.net_cost()
+    
+    return cost_breakdown(net, overhead, contingency, gst)
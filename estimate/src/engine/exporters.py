@@ -1,48 +1,123 @@
 """
 Export functions for Excel and PDF reports
 """
+import numpy as np
 import pandas as pd
+import xlsxwriter
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import (Paragraph, SimpleDocTemplate, Spacer, Table,
                                 TableStyle)
 
+from .boq import ColumnarBOQ, RateIndex
+from .ratebook import get_registry
 
-def export_excel(boq_dict, rates, rates_full, cost_summary, file_name):
-    """Export BOQ to Excel with formatting"""
-    rows = []
-    for code, qty in boq_dict.items():
-        rate = rates.get(code, 0)
-        amount = qty * rate
-        
-        # Get description and unit from full rates
-        if code in rates_full.index:
-            desc = rates_full.loc[code, 'description']
-            unit = rates_full.loc[code, 'unit']
+
+def boq_table(boq_dict, rates, rates_full):
+    """BOQ rows (code, description, unit, qty, rate, amount) computed column-wise"""
+    if isinstance(boq_dict, ColumnarBOQ):
+        return boq_dict.to_frame()
+    # Rates from load_rates() reuse the registry's prebuilt index
+    rate_index = get_registry().index_for(rates) or RateIndex.from_dict(rates, rates_full)
+    return ColumnarBOQ.from_dict(boq_dict, rate_index).to_frame()
+
+
+SUMMARY_LINES = [
+    ('Net Cost:', 'net_cost'),
+    ('Overhead (8%):', 'overhead'),
+    ('Contingency (10%):', 'contingency'),
+    ('GST (18%):', 'gst'),
+    ('Grand Total:', 'grand_total'),
+]
+
+
+def _column_widths(df, min_width=8, max_width=60):
+    """Column widths from vectorized string-length maxima"""
+    widths = []
+    for name in df.columns:
+        values = df[name]
+        if values.dtype.kind in 'fi':
+            longest = len(f"{np.nanmax(np.abs(values.to_numpy())) if len(values) else 0:,.3f}") + 1
         else:
-            desc = code
-            unit = 'unit'
-        
-        rows.append([code, desc, unit, qty, rate, amount])
-    
-    df = pd.DataFrame(rows, columns=['Item Code', 'Description', 'Unit', 'Quantity', 'Rate (₹)', 'Amount (₹)'])
-    
-    # Add summary rows
-    summary_rows = pd.DataFrame([
-        ['', '', '', '', 'Net Cost:', cost_summary['net_cost']],
-        ['', '', '', '', 'Overhead (8%):', cost_summary['overhead']],
-        ['', '', '', '', 'Contingency (10%):', cost_summary['contingency']],
-        ['', '', '', '', 'GST (18%):', cost_summary['gst']],
-        ['', '', '', '', 'Grand Total:', cost_summary['grand_total']]
-    ], columns=df.columns)
-    
-    df = pd.concat([df, summary_rows], ignore_index=True)
-    df.to_excel(file_name, index=False, sheet_name='BOQ')
+            longest = values.astype(str).str.len().max() if len(values) else 0
+        widths.append(min(max(min_width, len(str(name)), int(longest) + 2), max_width))
+    return widths
+
+
+def write_boq_xlsx(df, cost_summary, file_name, sheet_name='BOQ'):
+    """
+    Stream a BOQ frame and its cost summary to an .xlsx file
+
+    Rows are flushed to disk as they are written (constant memory) and all
+    formatting comes from a handful of formats applied per column.
+    """
+    workbook = xlsxwriter.Workbook(file_name, {'constant_memory': True, 'nan_inf_to_errors': True})
+    try:
+        header = workbook.add_format({'bold': True, 'bg_color': '#D9D9D9', 'border': 1})
+        qty = workbook.add_format({'num_format': '#,##0.000'})
+        money = workbook.add_format({'num_format': '#,##0.00'})
+        label = workbook.add_format({'bold': True, 'align': 'right'})
+        total = workbook.add_format({'bold': True, 'num_format': '#,##0.00', 'top': 1})
+        ws = workbook.add_worksheet(sheet_name)
 
+        for col, width in enumerate(_column_widths(df)):
+            ws.set_column(col, col, width, qty if col == 3 else money if col >= 4 else None)
+        ws.freeze_panes(1, 0)
+        ws.write_row(0, 0, list(df.columns), header)
 
-def export_pdf(boq_dict, rates, rates_full, cost_summary, file_name):
-    """Export BOQ to PDF"""
+        # Plain Python lists: one conversion per column, then a tight row loop
+        codes, descriptions, units, quantities, rates, amounts = (
+            df[name].tolist() for name in df.columns[:6]
+        )
+        write_string, write_number = ws.write_string, ws.write_number
+        for row, values in enumerate(zip(codes, descriptions, units, quantities, rates, amounts), start=1):
+            write_string(row, 0, str(values[0]))
+            write_string(row, 1, str(values[1]))
+            write_string(row, 2, str(values[2]))
+            write_number(row, 3, values[3])
+            write_number(row, 4, values[4])
+            write_number(row, 5, values[5])
+
+        row = len(df) + 1
+        for offset, (text, key) in enumerate(SUMMARY_LINES):
+            ws.write_string(row + offset, 4, text, label)
+            ws.write_number(row + offset, 5, float(cost_summary[key]),
+                            total if key == 'grand_total' else money)
+    finally:
+        workbook.close()
+
+
+def _cached(cache, kind, df, cost_summary, file_name, build):
+    """Run build(file_name), or let an artifact cache serve identical inputs"""
+    if cache is None:
+        build(file_name)
+        return False
+    summary = {key: value for key, value in cost_summary.items() if np.ndim(value) == 0}
+    _, hit = cache.export(kind, {'boq': df, 'summary': summary}, file_name, build)
+    return hit
+
+
+def export_excel(boq_dict, rates, rates_full, cost_summary, file_name, cache=None):
+    """Export BOQ to Excel with formatting
+
+    cache: optional artifact cache (modules.artifact_cache.ArtifactCache or
+    anything with its export() signature); returns True when served from it.
+    """
+    df = boq_table(boq_dict, rates, rates_full)
+    return _cached(cache, 'boq_xlsx', df, cost_summary, file_name,
+                   lambda path: write_boq_xlsx(df, cost_summary, path))
+
+
+def export_pdf(boq_dict, rates, rates_full, cost_summary, file_name, cache=None):
+    """Export BOQ to PDF (cache as for export_excel)"""
+    boq_df = boq_table(boq_dict, rates, rates_full)
+    return _cached(cache, 'boq_pdf', boq_df, cost_summary, file_name,
+                   lambda path: write_boq_pdf(boq_df, cost_summary, path))
+
+
+def write_boq_pdf(boq_df, cost_summary, file_name):
+    """Render a BOQ table and its cost summary to PDF"""
     doc = SimpleDocTemplate(file_name, pagesize=A4)
     styles = getSampleStyleSheet()
     story = []
@@ -56,25 +131,15 @@ def export_pdf(boq_dict, rates, rates_full, cost_summary, file_name):
     # BOQ Table
     data = [['Item Code', 'Description', 'Unit', 'Qty', 'Rate (₹)', 'Amount (₹)']]
     
-    for code, qty in boq_dict.items():
-        rate = rates.get(code, 0)
-        amount = qty * rate
-        
-        if code in rates_full.index:
-            desc = rates_full.loc[code, 'description']
-            unit = rates_full.loc[code, 'unit']
-        else:
-            desc = code
-            unit = 'unit'
-        
-        data.append([
-            code,
-            desc[:30],  # Truncate long descriptions
-            unit,
-            f"{qty:.3f}",
-            f"{rate:,.0f}",
-            f"{amount:,.0f}"
-        ])
+    data.extend(zip(
+        boq_df['Item Code'],
+        boq_df['Description'].astype(str).str[:30],  # Truncate long descriptions
+        boq_df['Unit'],
+        boq_df['Quantity'].map('{:.3f}'.format),
+        boq_df['Rate (₹)'].map('{:,.0f}'.format),
+        boq_df['Amount (₹)'].map('{:,.0f}'.format)
+    ))
+    data = [list(row) for row in data]
     
     # Add summary
     data.append(['', '', '', '', '', ''])
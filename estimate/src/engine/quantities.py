@@ -1,5 +1,8 @@
 """
 Quantity calculation functions for bridge components
+
+All functions accept scalars or NumPy arrays; array arguments broadcast,
+so one call can evaluate a whole grid of design alternatives.
 """
 import math
 
@@ -52,3 +55,23 @@ def formwork_sides(perimeter, height):
 def backfill_volume(excav_vol, concrete_vol):
     """Calculate backfill volume"""
     return excav_vol - concrete_vol
+
+
+def bridge_boq(span, width, deck_thk, n_girders, girder_area, pier_dia, pier_height, n_piers):
+    """
+    Bridge BOQ {item_code: quantity} from the main design parameters
+
+    Quantities are scalars or arrays, following the inputs.
+    """
+    d_conc = deck_concrete(span, width, deck_thk)
+    d_fw = deck_formwork(span, width)
+    g_conc = girder_concrete(n_girders, span, girder_area)
+    p_conc = pier_concrete(pier_dia, pier_height, n_piers)
+    total_conc = d_conc + g_conc + p_conc
+
+    return {
+        'CONC_M30': total_conc,
+        'REBAR_FE500': steel_from_concrete(total_conc),
+        'FORMWORK': d_fw + n_girders * span * 0.4,
+        'EXCAV_SOFT': 1.2 * total_conc,
+    }
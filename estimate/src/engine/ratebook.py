@@ -0,0 +1,194 @@
+"""
+Rate book registry: discovers rate CSVs in the data directory, loads each
+once and keeps a memory-mapped binary snapshot for fast later starts
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from .boq import RateIndex
+from .costing import get_csv_path
+
+# <name>_rates_<source><year>.csv, e.g. unit_rates_rajssr2024.csv
+RATE_BOOK_PATTERN = re.compile(r'^(?P<name>\w+?)_rates_(?P<source>[a-z]+)(?P<year>\d{4})\.csv$')
+
+SOURCE_REGIONS = {
+    'rajssr': 'Rajasthan',
+    'cpwddsr': 'All India',
+}
+
+SNAPSHOT_VERSION = 1
+
+
+class RateBook:
+    """One rate book (region, year, source) backed by a CSV file"""
+
+    def __init__(self, path, name, region, year, source, cache_dir=None):
+        self.path = Path(path)
+        self.name = name
+        self.region = region
+        self.year = year
+        self.source = source
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._index = None
+        self._dict = None
+        self._frame = None
+
+    @property
+    def key(self):
+        return f"{self.name}_{self.source}{self.year}"
+
+    @property
+    def index(self):
+        """Columnar RateIndex, loaded on first use"""
+        if self._index is None:
+            self._index = self._load()
+        return self._index
+
+    def rate(self, code, default=0.0):
+        """Rate for one item code"""
+        position = self.index.position(code)
+        return default if position < 0 else float(self.index.rates[position])
+
+    def rates_for(self, codes):
+        """Rates for a sequence of item codes (0 where unknown)"""
+        return self.index.rates_at(self.index.lookup(codes))
+
+    def as_dict(self):
+        """{item_code: rate} view, built once and shared - do not mutate"""
+        if self._dict is None:
+            self._dict = dict(zip(self.index.codes.tolist(), self.index.rates.tolist()))
+        return self._dict
+
+    def as_frame(self):
+        """Frame indexed by item_code, built once and shared - do not mutate"""
+        if self._frame is None:
+            import pandas as pd
+            self._frame = pd.DataFrame({
+                'description': self.index.descriptions,
+                'unit': self.index.units,
+                'rate_inr': np.asarray(self.index.rates),
+            }, index=pd.Index(self.index.codes, name='item_code'))
+        return self._frame
+
+    def metadata(self):
+        return {
+            'key': self.key,
+            'name': self.name,
+            'region': self.region,
+            'year': self.year,
+            'source': self.source,
+            'path': str(self.path),
+            'loaded': self._index is not None,
+        }
+
+    # Snapshot handling -----------------------------------------------------
+
+    def _snapshot_dir(self):
+        return self.cache_dir / self.key if self.cache_dir else None
+
+    def _source_stamp(self):
+        stat = self.path.stat()
+        return {'version': SNAPSHOT_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _load(self):
+        snapshot = self._snapshot_dir()
+        stamp = self._source_stamp()
+        if snapshot is not None:
+            try:
+                with open(snapshot / 'meta.json', encoding='utf-8') as f:
+                    if json.load(f) == stamp:
+                        return RateIndex(
+                            np.load(snapshot / 'codes.npy', mmap_mode='r'),
+                            np.load(snapshot / 'rates.npy', mmap_mode='r'),
+                            np.load(snapshot / 'descriptions.npy', mmap_mode='r'),
+                            np.load(snapshot / 'units.npy', mmap_mode='r'),
+                        )
+            except (OSError, ValueError):
+                pass
+
+        # pandas is only needed to parse the CSV; snapshot loads are NumPy-only
+        import pandas as pd
+        df = pd.read_csv(self.path, dtype={'item_code': str, 'description': str, 'unit': str})
+        index = RateIndex(df['item_code'].to_numpy(), df['rate_inr'].to_numpy(dtype=np.float64),
+                          df['description'].fillna('').to_numpy(), df['unit'].fillna('unit').to_numpy())
+        if snapshot is not None:
+            self._write_snapshot(snapshot, index, stamp)
+        return index
+
+    @staticmethod
+    def _write_snapshot(snapshot, index, stamp):
+        tmp = None
+        try:
+            snapshot.parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(dir=snapshot.parent, prefix=f".{snapshot.name}."))
+            np.save(tmp / 'codes.npy', index.codes.astype(str))
+            np.save(tmp / 'rates.npy', np.ascontiguousarray(index.rates))
+            np.save(tmp / 'descriptions.npy', index.descriptions.astype(str))
+            np.save(tmp / 'units.npy', index.units.astype(str))
+            with open(tmp / 'meta.json', 'w', encoding='utf-8') as f:
+                json.dump(stamp, f)
+            if snapshot.exists():
+                shutil.rmtree(snapshot, ignore_errors=True)
+            os.replace(tmp, snapshot)
+        except OSError:
+            # Read-only install: keep working from the CSV
+            if tmp is not None:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+
+class RateBookRegistry:
+    """All rate books found in a data directory"""
+
+    def __init__(self, data_dir=None, cache_dir=None):
+        self.data_dir = Path(data_dir) if data_dir else get_csv_path().parent
+        self.cache_dir = Path(cache_dir) if cache_dir else self.data_dir / '.cache'
+        self.books = {}
+        self.discover()
+
+    def discover(self):
+        """Scan the data directory for rate book CSVs"""
+        for path in sorted(self.data_dir.glob('*_rates_*.csv')):
+            match = RATE_BOOK_PATTERN.match(path.name)
+            if not match:
+                continue
+            source = match['source']
+            book = RateBook(path, match['name'], SOURCE_REGIONS.get(source, source.upper()),
+                            int(match['year']), source, self.cache_dir)
+            if book.key not in self.books:
+                self.books[book.key] = book
+        return self.books
+
+    def get(self, name='unit', region=None, year=None):
+        """Latest matching rate book, e.g. get('building', region='Rajasthan')"""
+        matches = [
+            book for book in self.books.values()
+            if book.name == name
+            and (region is None or book.region == region)
+            and (year is None or book.year == year)
+        ]
+        if not matches:
+            raise KeyError(f"No rate book for name={name!r}, region={region!r}, year={year!r}")
+        return max(matches, key=lambda book: book.year)
+
+    def list_books(self):
+        return [book.metadata() for book in self.books.values()]
+
+    def index_for(self, rates):
+        """RateIndex of the book whose shared dict is ``rates``, if any"""
+        for book in self.books.values():
+            if book._dict is not None and book._dict is rates:
+                return book.index
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_registry(data_dir=None):
+    """Process-wide registry shared by the GUI, exporters and Streamlit app"""
+    return RateBookRegistry(data_dir)
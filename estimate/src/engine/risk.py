@@ -0,0 +1,276 @@
+"""
+Monte Carlo cost-risk simulation: P50/P80/P90 tender values from
+quantity and rate uncertainty per item or category
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .boq import ColumnarBOQ, RateIndex
+from .costing import cost_breakdown, load_rates, total_project_cost
+from .scenarios import code_category
+
+DEFAULT_PERCENTILES = (50, 80, 90)
+
+
+def triangular(low, mode, high):
+    """Triangular factor, e.g. triangular(0.95, 1.0, 1.15)"""
+    if not low <= mode <= high or low == high:
+        raise ValueError("Triangular needs low <= mode <= high and low < high")
+    return ('triangular', float(low), float(mode), float(high))
+
+
+def lognormal(sigma, mean=1.0):
+    """Lognormal factor with the given mean and log-space sigma"""
+    if sigma < 0 or mean <= 0:
+        raise ValueError("Lognormal needs sigma >= 0 and mean > 0")
+    return ('lognormal', float(sigma), float(mean), 0.0)
+
+
+class RiskModel:
+    """
+    Uncertainty on quantities and rates
+
+    quantity / rate: {category or item_code: triangular(...) | lognormal(...)}
+    correlations: {(driver_a, driver_b): rho} between categories/items
+    categories: optional callable mapping item codes to category labels
+
+    Items with their own spec (keyed by item code) are simulated separately;
+    other items share their category's draw, so a category moves together.
+    Items without any spec are treated as certain.
+    """
+
+    def __init__(self, quantity=None, rate=None, correlations=None, categories=None):
+        self.quantity = dict(quantity or {})
+        self.rate = dict(rate or {})
+        self.correlations = dict(correlations or {})
+        self.categories = categories or code_category
+
+    def plan(self, boq):
+        """Reduce a ColumnarBOQ to per-driver net amounts and sampling arrays"""
+        codes = boq.codes if boq.codes is not None else boq.rate_index.codes[boq.positions]
+        codes = np.asarray(codes, dtype=object).astype(str)
+        categories = np.asarray(self.categories(codes), dtype=object).astype(str)
+
+        keyed = set(self.quantity) | set(self.rate)
+        drivers = np.where(np.isin(codes, list(keyed)), codes, categories)
+        names, owners = np.unique(drivers, return_inverse=True)
+        net = np.bincount(owners, weights=boq.amounts, minlength=len(names))
+
+        corr = np.eye(len(names))
+        position = {name: i for i, name in enumerate(names)}
+        for (a, b), rho in self.correlations.items():
+            if a in position and b in position and a != b:
+                corr[position[a], position[b]] = corr[position[b], position[a]] = rho
+        try:
+            chol = np.linalg.cholesky(corr)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlations do not form a valid (positive definite) matrix")
+
+        return SimulationPlan(names, net, _spec_arrays(self.quantity, names),
+                              _spec_arrays(self.rate, names), chol)
+
+
+class SimulationPlan:
+    """Picklable arrays needed to sample one chunk of trials"""
+
+    def __init__(self, drivers, net, quantity, rate, chol):
+        self.drivers = drivers
+        self.net = net
+        self.quantity = quantity
+        self.rate = rate
+        self.chol = chol
+
+    def sample_net(self, rng, n_trials):
+        """Net cost for n_trials random trials"""
+        q = _factors(self.quantity, self._correlated_normals(rng, n_trials))
+        r = _factors(self.rate, self._correlated_normals(rng, n_trials))
+        q *= r
+        return q @ self.net
+
+    def _correlated_normals(self, rng, n_trials):
+        z = rng.standard_normal((n_trials, len(self.net)))
+        return z @ self.chol.T
+
+
+def _spec_arrays(specs, names):
+    """Per-driver (kind, p1, p2, p3) arrays; kind 0 = certain, 1 = triangular, 2 = lognormal"""
+    kind = np.zeros(len(names), dtype=np.int8)
+    params = np.zeros((3, len(names)))
+    for i, name in enumerate(names):
+        spec = specs.get(name)
+        if spec is None:
+            continue
+        kind[i] = 1 if spec[0] == 'triangular' else 2
+        params[:, i] = spec[1:]
+    return kind, params
+
+
+def _normal_cdf(z):
+    """Standard normal CDF (Abramowitz & Stegun 7.1.26, |error| < 1.5e-7)"""
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+def _factors(spec, z):
+    """Turn correlated standard normals into multiplicative factors"""
+    kind, (p1, p2, p3) = spec
+    factors = np.ones_like(z)
+
+    tri = kind == 1
+    if tri.any():
+        low, mode, high = p1[tri], p2[tri], p3[tri]
+        u = _normal_cdf(z[:, tri])
+        split = (mode - low) / (high - low)
+        left = low + np.sqrt(u * (high - low) * (mode - low))
+        right = high - np.sqrt((1.0 - u) * (high - low) * (high - mode))
+        factors[:, tri] = np.where(u < split, left, right)
+
+    logn = kind == 2
+    if logn.any():
+        sigma, mean = p1[logn], p2[logn]
+        factors[:, logn] = mean * np.exp(sigma * z[:, logn] - 0.5 * sigma * sigma)
+
+    return factors
+
+
+def _run_chunk(plan, seed_seq, n_trials, overhead, contingency, gst):
+    rng = np.random.default_rng(seed_seq)
+    return cost_breakdown(plan.sample_net(rng, n_trials), overhead, contingency, gst)['grand_total']
+
+
+def iter_simulation(boq, model, n_trials=100_000, seed=None, chunk_size=50_000, workers=1,
+                    overhead=0.08, contingency=0.10, gst=0.18, percentiles=DEFAULT_PERCENTILES):
+    """
+    Run the simulation in chunks, yielding running estimates as chunks finish
+
+    Each yield is {'trials', 'mean', 'percentiles': {p: value}, 'totals'} where
+    'totals' holds the grand totals completed so far. Chunk seeds are spawned
+    from ``seed`` so results do not depend on ``workers`` or chunk order.
+    Peak memory is about chunk_size x drivers x 8 bytes per live chunk, plus
+    8 bytes per trial for the grand totals.
+    """
+    plan = model.plan(boq)
+    sizes = [min(chunk_size, n_trials - start) for start in range(0, n_trials, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int)
+
+    totals = np.empty(n_trials)
+    done = np.zeros(n_trials, dtype=bool)
+    completed = 0
+
+    def snapshot():
+        current = totals[done] if completed < n_trials else totals
+        return {
+            'trials': completed,
+            'mean': float(current.mean()),
+            'percentiles': dict(zip(percentiles, np.percentile(current, percentiles).tolist())),
+            'totals': current,
+        }
+
+    args = (overhead, contingency, gst)
+    if workers and workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            futures = {
+                pool.submit(_run_chunk, plan, seeds[i], sizes[i], *args): i
+                for i in range(len(sizes))
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                totals[offsets[i]:offsets[i] + sizes[i]] = future.result()
+                done[offsets[i]:offsets[i] + sizes[i]] = True
+                completed += sizes[i]
+                yield snapshot()
+    else:
+        for i in range(len(sizes)):
+            totals[offsets[i]:offsets[i] + sizes[i]] = _run_chunk(plan, seeds[i], sizes[i], *args)
+            done[offsets[i]:offsets[i] + sizes[i]] = True
+            completed += sizes[i]
+            yield snapshot()
+
+
+def simulate(boq, model, n_trials=100_000, seed=None, chunk_size=50_000, workers=1,
+             overhead=0.08, contingency=0.10, gst=0.18, percentiles=DEFAULT_PERCENTILES,
+             progress=None):
+    """
+    Run a full simulation and return the final estimates
+
+    progress: optional callable receiving each running estimate (see iter_simulation)
+    """
+    result = None
+    for result in iter_simulation(boq, model, n_trials, seed, chunk_size, workers,
+                                  overhead, contingency, gst, percentiles):
+        if progress:
+            progress(result)
+    return result
+
+
+def naive_simulation(boq_dict, rates, model, n_trials, seed=None,
+                     overhead=0.08, contingency=0.10, gst=0.18):
+    """Reference loop: perturb every item and call total_project_cost per trial"""
+    rng = np.random.default_rng(seed)
+    codes = list(boq_dict)
+    categories = model.categories(np.asarray(codes, dtype=object))
+
+    def draw(specs, code, category, cache):
+        key = code if code in specs else category
+        if key not in specs:
+            return 1.0
+        if key not in cache:
+            kind, p1, p2, p3 = specs[key]
+            if kind == 'triangular':
+                cache[key] = rng.triangular(p1, p2, p3)
+            else:
+                cache[key] = p2 * np.exp(p1 * rng.standard_normal() - 0.5 * p1 * p1)
+        return cache[key]
+
+    totals = np.empty(n_trials)
+    for t in range(n_trials):
+        q_cache, r_cache = {}, {}
+        trial_boq, trial_rates = {}, {}
+        for code, category in zip(codes, categories):
+            trial_boq[code] = boq_dict[code] * draw(model.quantity, code, category, q_cache)
+            trial_rates[code] = rates.get(code, 0) * draw(model.rate, code, category, r_cache)
+        totals[t] = total_project_cost(trial_boq, trial_rates, overhead, contingency, gst)['grand_total']
+    return totals
+
+
+def benchmark(n_items=2000, n_trials=1_000_000, naive_trials=200, workers=None, seed=0):
+    """Time the vectorized simulation against the naive per-trial loop"""
+    rates = load_rates()
+    rng = np.random.default_rng(seed)
+    codes = rng.choice(list(rates), n_items)
+    boq_dict = {f"{code}#{i}": float(q) for i, (code, q) in enumerate(zip(codes, rng.uniform(1, 500, n_items)))}
+    item_rates = {key: rates[key.split('#')[0]] for key in boq_dict}
+    boq = ColumnarBOQ.from_dict(boq_dict, RateIndex.from_dict(item_rates))
+    model = RiskModel(
+        quantity={'CONC': triangular(0.95, 1.0, 1.10), 'EXCAV': triangular(0.9, 1.0, 1.25)},
+        rate={'CONC': lognormal(0.08), 'REBAR': lognormal(0.12), 'STEEL': lognormal(0.12)},
+        correlations={('REBAR', 'STEEL'): 0.8, ('CONC', 'REBAR'): 0.3},
+        categories=lambda c: code_category([str(x).split('#')[0] for x in c]),
+    )
+
+    start = time.perf_counter()
+    naive_simulation(boq_dict, item_rates, model, naive_trials, seed)
+    naive_per_trial = (time.perf_counter() - start) / naive_trials
+
+    start = time.perf_counter()
+    result = simulate(boq, model, n_trials, seed=seed, workers=workers or os.cpu_count())
+    vectorized = time.perf_counter() - start
+
+    return {
+        'trials': n_trials,
+        'vectorized_s': vectorized,
+        'naive_s_estimated': naive_per_trial * n_trials,
+        'speedup': naive_per_trial * n_trials / vectorized,
+        'percentiles': result['percentiles'],
+    }
+
+
+if __name__ == '__main__':
+    print(benchmark())
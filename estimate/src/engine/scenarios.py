@@ -0,0 +1,94 @@
+"""
+Broadcast scenario evaluation for overhead, contingency, GST and
+per-category rate escalation what-ifs
+"""
+import numpy as np
+import pandas as pd
+
+from .costing import cost_breakdown
+
+
+def code_category(codes):
+    """Default item category: the item code prefix (CONC_M30 -> CONC)"""
+    return pd.Series(codes, dtype=object).astype(str).str.split('_', n=1).str[0].to_numpy()
+
+
+def category_net(boq, categories=None):
+    """Net cost per category -> (category names, net amounts)"""
+    if categories is None:
+        codes = boq.codes if boq.codes is not None else boq.rate_index.codes[boq.positions]
+        categories = code_category(codes)
+    names, owners = np.unique(np.asarray(categories, dtype=object).astype(str), return_inverse=True)
+    return names, np.bincount(owners, weights=boq.amounts, minlength=len(names))
+
+
+def scenario_grid(overhead=(0.08,), contingency=(0.10,), gst=(0.18,), escalation=None):
+    """
+    Full cartesian grid of parameter values as flat, equal-length arrays
+
+    escalation: {category: [rates, ...]} e.g. {'CONC': [0, 0.05], 'REBAR': [0, 0.1]}
+    """
+    escalation = escalation or {}
+    axes = [np.asarray(overhead, dtype=np.float64), np.asarray(contingency, dtype=np.float64),
+            np.asarray(gst, dtype=np.float64)]
+    axes += [np.asarray(values, dtype=np.float64) for values in escalation.values()]
+    mesh = np.meshgrid(*axes, indexing='ij')
+    flat = [m.ravel() for m in mesh]
+    return {
+        'overhead': flat[0],
+        'contingency': flat[1],
+        'gst': flat[2],
+        'escalation': dict(zip(escalation.keys(), flat[3:])),
+    }
+
+
+def evaluate_scenarios(boq, overhead=0.08, contingency=0.10, gst=0.18, escalation=None,
+                       categories=None):
+    """
+    Evaluate every scenario against a ColumnarBOQ in one broadcast computation
+
+    overhead/contingency/gst: scalars or arrays of length n_scenarios
+    escalation: {category: scalar or array}, fractional rate increase per category
+    categories: optional per-item category labels (default: item code prefix)
+
+    Returns one row per scenario with its parameters and the net, overhead,
+    contingency, GST and grand total amounts.
+    """
+    escalation = escalation or {}
+    names, net_by_category = category_net(boq, categories)
+
+    params = [np.asarray(overhead, dtype=np.float64), np.asarray(contingency, dtype=np.float64),
+              np.asarray(gst, dtype=np.float64)]
+    params += [np.asarray(values, dtype=np.float64) for values in escalation.values()]
+    n_scenarios = max([p.size for p in params] + [1])
+    params = [np.broadcast_to(p, (n_scenarios,)) for p in params]
+
+    # Escalation factors (n_scenarios x n_categories), then reduce items -> categories -> scenarios
+    factors = np.ones((n_scenarios, len(names)))
+    position = {name: i for i, name in enumerate(names)}
+    for (category, _), values in zip(escalation.items(), params[3:]):
+        if category in position:
+            factors[:, position[category]] += values
+    net = factors @ net_by_category
+
+    totals = cost_breakdown(net, params[0], params[1], params[2])
+
+    columns = {
+        'scenario': np.arange(n_scenarios),
+        'overhead_pct': params[0],
+        'contingency_pct': params[1],
+        'gst_pct': params[2],
+    }
+    for category, values in zip(escalation.keys(), params[3:]):
+        columns[f'escalation_{category}'] = values
+    columns.update(totals)
+    return pd.DataFrame(columns)
+
+
+def evaluate_grid(boq, overhead=(0.08,), contingency=(0.10,), gst=(0.18,), escalation=None,
+                  categories=None):
+    """Build the cartesian scenario grid and evaluate it against a BOQ"""
+    grid = scenario_grid(overhead, contingency, gst, escalation)
+    return evaluate_scenarios(boq, grid['overhead'], grid['contingency'], grid['gst'],
+                              grid['escalation'], categories)
+
@@ -0,0 +1,132 @@
+"""
+Design-space sweeps: evaluate bridge quantity kernels over large parameter
+grids in chunks and keep the minimum-cost and Pareto-optimal designs
+"""
+import numpy as np
+import pandas as pd
+
+from .costing import cost_breakdown
+from .quantities import bridge_boq
+
+BRIDGE_PARAMETERS = ('span', 'width', 'deck_thk', 'n_girders', 'girder_area',
+                     'pier_dia', 'pier_height', 'n_piers')
+
+
+def grid_size(axes):
+    """Number of combinations in a grid of {name: values}"""
+    return int(np.prod([len(values) for values in axes.values()], dtype=np.int64))
+
+
+def iter_grid(axes, chunk_size=100_000):
+    """
+    Yield the cartesian grid of {name: values} as dicts of flat arrays
+
+    Combinations are generated chunk by chunk from flat indices, so the full
+    grid is never held in memory.
+    """
+    names = list(axes)
+    values = [np.asarray(axes[name]) for name in names]
+    shape = tuple(len(v) for v in values)
+    total = grid_size(axes)
+    for start in range(0, total, chunk_size):
+        flat = np.arange(start, min(start + chunk_size, total))
+        coords = np.unravel_index(flat, shape)
+        yield {name: v[c] for name, v, c in zip(names, values, coords)}
+
+
+def price_designs(params, rates, overhead=0.08, contingency=0.10, gst=0.18):
+    """Quantities and cost for arrays of bridge design parameters"""
+    boq = bridge_boq(*(params[name] for name in BRIDGE_PARAMETERS))
+    n = len(next(iter(params.values())))
+    net = np.zeros(n)
+    for code, qty in boq.items():
+        net += np.broadcast_to(qty, (n,)) * rates.get(code, 0)
+    frame = pd.DataFrame({name: np.broadcast_to(params[name], (n,)) for name in BRIDGE_PARAMETERS})
+    for code, qty in boq.items():
+        frame[code] = np.broadcast_to(qty, (n,))
+    for key, value in cost_breakdown(net, overhead, contingency, gst).items():
+        frame[key] = value
+    frame['deck_area'] = frame['span'] * frame['width']
+    frame['cost_per_sqm'] = frame['grand_total'] / frame['deck_area']
+    return frame
+
+
+def iter_bridge_sweep(axes, rates, fixed=None, chunk_size=100_000, **cost_kwargs):
+    """
+    Yield priced design chunks for a grid of bridge parameters
+
+    axes: {parameter: values} to sweep, e.g. {'span': np.arange(10, 40, 0.5)}
+    fixed: {parameter: value} for parameters not swept
+    """
+    fixed = dict(fixed or {})
+    unknown = (set(axes) | set(fixed)) - set(BRIDGE_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown bridge parameters: {sorted(unknown)}")
+    missing = set(BRIDGE_PARAMETERS) - set(axes) - set(fixed)
+    if missing:
+        raise ValueError(f"Bridge parameters need a value or an axis: {sorted(missing)}")
+
+    offset = 0
+    for chunk in iter_grid(axes, chunk_size):
+        n = len(next(iter(chunk.values())))
+        params = dict(chunk)
+        params.update({name: np.full(n, value) for name, value in fixed.items()})
+        frame = price_designs(params, rates, **cost_kwargs)
+        frame.index = pd.RangeIndex(offset, offset + n)
+        offset += n
+        yield frame
+
+
+def pareto_front(frame, minimize=('grand_total',), maximize=('deck_area',)):
+    """Rows of frame not dominated on the given objectives"""
+    if frame.empty:
+        return frame
+    objectives = np.column_stack(
+        [frame[c].to_numpy(dtype=float) for c in minimize]
+        + [-frame[c].to_numpy(dtype=float) for c in maximize]
+    )
+    order = np.lexsort(objectives.T[::-1])
+    objectives = objectives[order]
+
+    if objectives.shape[1] == 2:
+        # Sorted by the first objective: keep rows that strictly improve the second
+        second = objectives[:, 1]
+        best_before = np.concatenate([[np.inf], np.minimum.accumulate(second)[:-1]])
+        keep = order[second < best_before]
+    else:
+        kept = []
+        for i in range(len(objectives)):
+            point = objectives[i]
+            if not any(np.all(objectives[j] <= point) and np.any(objectives[j] < point) for j in kept):
+                kept.append(i)
+        keep = order[kept]
+    return frame.iloc[np.sort(keep)]
+
+
+def sweep_bridge(axes, rates, fixed=None, chunk_size=100_000, top=10,
+                 minimize=('grand_total',), maximize=('deck_area',), progress=None,
+                 **cost_kwargs):
+    """
+    Sweep a bridge design grid and return the best designs
+
+    Returns {'evaluated', 'min_cost', 'pareto'}: the ``top`` cheapest designs
+    and the Pareto front on the given objectives. Only running candidates are
+    kept between chunks, so memory stays bounded by ``chunk_size``.
+    progress: optional callable(evaluated, total)
+    """
+    total = grid_size(axes)
+    best = None
+    front = None
+    evaluated = 0
+    for frame in iter_bridge_sweep(axes, rates, fixed, chunk_size, **cost_kwargs):
+        best = pd.concat([best, frame.nsmallest(top, 'grand_total')]) if best is not None \
+            else frame.nsmallest(top, 'grand_total')
+        best = best.nsmallest(top, 'grand_total')
+        chunk_front = pareto_front(frame, minimize, maximize)
+        front = pareto_front(pd.concat([front, chunk_front]) if front is not None else chunk_front,
+                             minimize, maximize)
+        evaluated += len(frame)
+        if progress:
+            progress(evaluated, total)
+
+    return {'evaluated': evaluated, 'min_cost': best, 'pareto': front}
@@ -0,0 +1,218 @@
+"""
+Dependency-graph quantity takeoff: each quantity declares its inputs and is
+recomputed only when something upstream changes
+"""
+from collections import defaultdict
+
+from .building_quantities import (brick_masonry, excavation_foundation, plaster_area,
+                                  rcc_column, rcc_slab, shuttering_area, steel_reinforcement)
+
+
+class TakeoffGraph:
+    """
+    Memoized quantity graph with dirty propagation
+
+    Nodes may only depend on nodes that already exist, so the graph is
+    always acyclic. Setting an input marks its downstream nodes dirty; they
+    are recomputed lazily the next time they are read.
+    """
+
+    def __init__(self):
+        self._funcs = {}
+        self._inputs = {}
+        self._values = {}
+        self._dirty = set()
+        self._dependents = defaultdict(set)
+        self.recomputed = 0
+
+    def __contains__(self, name):
+        return name in self._inputs
+
+    def add_input(self, name, value=None):
+        """Add an input node holding a plain value"""
+        self._check_new(name)
+        self._inputs[name] = ()
+        self._values[name] = value
+        return name
+
+    def add_node(self, name, func, inputs):
+        """Add a derived node computed as func(*[value of each input])"""
+        self._check_new(name)
+        missing = [i for i in inputs if i not in self._inputs]
+        if missing:
+            raise KeyError(f"Node {name!r} depends on unknown nodes: {missing}")
+        self._funcs[name] = func
+        self._inputs[name] = tuple(inputs)
+        for i in inputs:
+            self._dependents[i].add(name)
+        self._dirty.add(name)
+        return name
+
+    def set(self, name, value):
+        """Change an input; returns True if anything was invalidated"""
+        if name in self._funcs:
+            raise ValueError(f"{name!r} is a derived node and cannot be set")
+        if name not in self._inputs:
+            raise KeyError(name)
+        if self._values.get(name) == value:
+            return False
+        self._values[name] = value
+        self._invalidate(name)
+        return True
+
+    def update(self, values):
+        """Set several inputs; returns the names that actually changed"""
+        return [name for name, value in values.items() if self.set(name, value)]
+
+    def get(self, name):
+        """Current value of a node, recomputing it (and stale inputs) if dirty"""
+        if name in self._dirty:
+            args = [self.get(i) for i in self._inputs[name]]
+            self._values[name] = self._funcs[name](*args)
+            self._dirty.discard(name)
+            self.recomputed += 1
+        return self._values[name]
+
+    def dirty(self):
+        return set(self._dirty)
+
+    def _check_new(self, name):
+        if name in self._inputs:
+            raise ValueError(f"Node {name!r} already exists")
+
+    def _invalidate(self, name):
+        stack = list(self._dependents[name])
+        while stack:
+            node = stack.pop()
+            if node not in self._dirty:
+                self._dirty.add(node)
+                stack.extend(self._dependents[node])
+
+
+BUILDING_INPUTS = {
+    'length': 10.0,
+    'width': 8.0,
+    'n_floors': 1,
+    'floor_ht': 3.0,
+    'slab_thk': 0.125,
+    'wall_thk': 0.23,
+    'n_cols': 4,
+    'col_w': 0.23,
+    'col_d': 0.3,
+    'flooring': True,
+    'sanitary': False,
+    'electrical': False,
+}
+
+
+def add_building(graph, prefix='', **inputs):
+    """
+    Add one building block to a takeoff graph
+
+    Node names are prefixed with ``prefix`` (e.g. 'block_a.'). Returns
+    {item_code: node name} for the block's BOQ items; optional items evaluate
+    to None when their trade is switched off.
+    """
+    values = dict(BUILDING_INPUTS, **inputs)
+    n = {key: graph.add_input(prefix + key, values[key]) for key in BUILDING_INPUTS}
+
+    def node(name, func, *deps):
+        return graph.add_node(prefix + name, func, [n.get(d, prefix + d) for d in deps])
+
+    node('floor_area', lambda l, w: l * w, 'length', 'width')
+    node('perimeter', lambda l, w: 2 * (l + w), 'length', 'width')
+    node('total_height', lambda f, h: f * h, 'n_floors', 'floor_ht')
+
+    # Foundation
+    node('excav_vol', lambda l, w: excavation_foundation(l + 2, w + 2, 1.5), 'length', 'width')
+    node('pcc_vol', lambda a: a * 0.15, 'floor_area')
+
+    # Concrete
+    node('col_vol', lambda cw, cd, h, nc, f: rcc_column(cw, cd, h, nc) * f,
+         'col_w', 'col_d', 'floor_ht', 'n_cols', 'n_floors')
+    node('beam_length', lambda p, f: p * f, 'perimeter', 'n_floors')
+    node('beam_vol', lambda bl: bl * 0.23 * 0.45, 'beam_length')
+    node('slab_vol', lambda a, t, f: rcc_slab(a, t) * f, 'floor_area', 'slab_thk', 'n_floors')
+    node('rcc_vol', lambda c, b, s: c + b + s, 'col_vol', 'beam_vol', 'slab_vol')
+    node('wall_vol', lambda p, t, h: brick_masonry(p, t, h), 'perimeter', 'wall_thk', 'total_height')
+
+    # Steel from concrete volumes
+    node('steel', lambda pcc, c, b, s: (steel_reinforcement(pcc, 25) + steel_reinforcement(c, 150)
+                                        + steel_reinforcement(b, 250) + steel_reinforcement(s, 100)),
+         'pcc_vol', 'col_vol', 'beam_vol', 'slab_vol')
+
+    # Shuttering from perimeters
+    node('shutter_cols', lambda cw, cd, h, nc, f: shuttering_area(2 * (cw + cd), h) * nc * f,
+         'col_w', 'col_d', 'floor_ht', 'n_cols', 'n_floors')
+    node('shutter_beams', lambda bl: bl * 0.68, 'beam_length')
+    node('shutter_slabs', lambda a, f: a * f, 'floor_area', 'n_floors')
+
+    # Finishes
+    node('plaster', lambda p, h: 2 * plaster_area(p, h), 'perimeter', 'total_height')
+    node('flooring_area', lambda on, a, f: a * f if on else 0, 'flooring', 'floor_area', 'n_floors')
+
+    # Services (None when not selected)
+    node('wc', lambda on, f: f * 2 if on else None, 'sanitary', 'n_floors')
+    node('washbasin', lambda on, f: f * 2 if on else None, 'sanitary', 'n_floors')
+    node('pvc_pipe', lambda on, h: h * 2 if on else None, 'sanitary', 'total_height')
+    node('mcb_db', lambda on, f: f if on else None, 'electrical', 'n_floors')
+    node('switch_socket', lambda on, a: a * 0.5 if on else None, 'electrical', 'floor_area')
+    node('led_light', lambda on, a: a * 0.3 if on else None, 'electrical', 'floor_area')
+
+    items = {
+        'EXCAV_FOUND': 'excav_vol',
+        'PCC_148': 'pcc_vol',
+        'RCC_M25': 'rcc_vol',
+        'STEEL_FE500': 'steel',
+        'SHUTTERING_COL': 'shutter_cols',
+        'SHUTTERING_BEAM': 'shutter_beams',
+        'SHUTTERING_SLAB': 'shutter_slabs',
+        'BRICK_230_CM16': 'wall_vol',
+        'PLASTER_20MM_CM16': 'plaster',
+        'FLOOR_KOTA_STONE': 'flooring_area',
+        'SANITARY_WC': 'wc',
+        'SANITARY_WASHBASIN': 'washbasin',
+        'PLUMB_PVC_110MM': 'pvc_pipe',
+        'ELEC_MCB_DB': 'mcb_db',
+        'ELEC_SWITCH_SOCKET': 'switch_socket',
+        'ELEC_LED_LIGHT': 'led_light',
+    }
+    return {code: prefix + name for code, name in items.items()}
+
+
+class BuildingTakeoff:
+    """Multi-block building takeoff on a shared TakeoffGraph"""
+
+    def __init__(self):
+        self.graph = TakeoffGraph()
+        self.blocks = {}
+
+    def add_block(self, name, **inputs):
+        if name in self.blocks:
+            raise ValueError(f"Block {name!r} already exists")
+        self.blocks[name] = add_building(self.graph, f"{name}.", **inputs)
+        return name
+
+    def update_block(self, name, **inputs):
+        """Change inputs of one block; only its dependent quantities go stale"""
+        return self.graph.update({f"{name}.{key}": value for key, value in inputs.items()})
+
+    def quantity(self, block, name):
+        return self.graph.get(f"{block}.{name}")
+
+    def block_boq(self, name):
+        """{item_code: quantity} for one block"""
+        boq = {}
+        for code, node in self.blocks[name].items():
+            value = self.graph.get(node)
+            if value is not None:
+                boq[code] = value
+        return boq
+
+    def boq(self):
+        """{item_code: quantity} summed over all blocks"""
+        total = {}
+        for name in self.blocks:
+            for code, value in self.block_boq(name).items():
+                total[code] = total.get(code, 0) + value
+        return total
@@ -15,6 +15,7 @@ from engine.building_quantities import *
 from engine.costing import load_rates, load_rates_full, total_project_cost
 from engine.exporters import export_excel, export_pdf
 from engine.quantities import *
+from engine.takeoff import BuildingTakeoff
 
 # Load rates at startup
 try:
@@ -26,15 +27,16 @@ except:
 
 # Load building rates
 try:
-    import pandas as pd
-    csv_path = pathlib.Path(__file__).parent.parent / 'data' / 'building_rates_rajssr2024.csv'
-    df_building = pd.read_csv(csv_path)
-    rates_building = df_building.set_index('item_code')['rate_inr'].to_dict()
-    rates_building_full = df_building.set_index('item_code')
+    rates_building = load_rates('building')
+    rates_building_full = load_rates_full('building')
 except:
     rates_building = {}
     rates_building_full = None
 
+# Building takeoff graph, kept between clicks so edits recompute incrementally
+building_takeoff = BuildingTakeoff()
+building_takeoff.add_block('main')
+
 # Set theme if available
 try:
     sg.theme('LightBlue2')
@@ -132,21 +134,8 @@ def estimate_bridge(vals):
     except Exception as e:
         return None, None, f'Input error: {e}'
     
-    # Calculate quantities
-    d_conc = deck_concrete(s, w, dt)
-    d_fw = deck_formwork(s, w)
-    g_conc = girder_concrete(ng, s, Ag)
-    p_conc = pier_concrete(pd, ph, np_val)
-    total_conc = d_conc + g_conc + p_conc
-    steel_kg = steel_from_concrete(total_conc)
-    
-    # Build BOQ
-    boq = {
-        'CONC_M30': total_conc,
-        'REBAR_FE500': steel_kg,
-        'FORMWORK': d_fw + ng * s * 0.4,
-        'EXCAV_SOFT': 1.2 * total_conc,
-    }
+    # Calculate quantities and build BOQ
+    boq = bridge_boq(s, w, dt, ng, Ag, pd, ph, np_val)
     
     # Calculate costs
     cost_summary = total_project_cost(boq, rates_bridge)
@@ -195,71 +184,15 @@ def estimate_building(vals):
     except Exception as e:
         return None, None, f'Input error: {e}'
     
-    # Calculate quantities
-    floor_area = length * width
-    total_height = n_floors * floor_ht
-    
-    # Foundation
-    excav_vol = excavation_foundation(length + 2, width + 2, 1.5)
-    pcc_vol = floor_area * 0.15
-    
-    # Columns
-    col_vol = rcc_column(col_w, col_d, floor_ht, n_cols) * n_floors
-    
-    # Beams (approximate)
-    beam_length = 2 * (length + width) * n_floors
-    beam_vol = beam_length * 0.23 * 0.45
-    
-    # Slabs
-    slab_vol = rcc_slab(floor_area, slab_thk) * n_floors
-    
-    # Walls (approximate perimeter walls)
-    wall_vol = brick_masonry(2 * (length + width), wall_thk, total_height)
-    
-    # Steel
-    steel_footings = steel_reinforcement(pcc_vol, 25)
-    steel_cols = steel_reinforcement(col_vol, 150)
-    steel_beams = steel_reinforcement(beam_vol, 250)
-    steel_slabs = steel_reinforcement(slab_vol, 100)
-    total_steel = steel_footings + steel_cols + steel_beams + steel_slabs
-    
-    # Shuttering
-    shutter_cols = shuttering_area(2 * (col_w + col_d), floor_ht) * n_cols * n_floors
-    shutter_beams = beam_length * 0.68  # sides
-    shutter_slabs = floor_area * n_floors
-    
-    # Plaster
-    plaster_int = plaster_area(2 * (length + width), total_height)
-    plaster_ext = plaster_area(2 * (length + width), total_height)
-    
-    # Flooring
-    flooring = floor_area * n_floors if vals['bldg_flooring'] else 0
-    
-    # Build BOQ
-    boq = {
-        'EXCAV_FOUND': excav_vol,
-        'PCC_148': pcc_vol,
-        'RCC_M25': col_vol + beam_vol + slab_vol,
-        'STEEL_FE500': total_steel,
-        'SHUTTERING_COL': shutter_cols,
-        'SHUTTERING_BEAM': shutter_beams,
-        'SHUTTERING_SLAB': shutter_slabs,
-        'BRICK_230_CM16': wall_vol,
-        'PLASTER_20MM_CM16': plaster_int + plaster_ext,
-        'FLOOR_KOTA_STONE': flooring,
-    }
-    
-    # Add sanitary if selected
-    if vals['bldg_sanitary']:
-        boq['SANITARY_WC'] = n_floors * 2
-        boq['SANITARY_WASHBASIN'] = n_floors * 2
-        boq['PLUMB_PVC_110MM'] = total_height * 2
-    
-    # Add electrical if selected
-    if vals['bldg_electrical']:
-        boq['ELEC_MCB_DB'] = n_floors
-        boq['ELEC_SWITCH_SOCKET'] = floor_area * 0.5
-        boq['ELEC_LED_LIGHT'] = floor_area * 0.3
+    # Update the takeoff graph; only quantities downstream of changed inputs are recomputed
+    building_takeoff.update_block(
+        'main', length=length, width=width, n_floors=n_floors, floor_ht=floor_ht,
+        slab_thk=slab_thk, wall_thk=wall_thk, n_cols=n_cols, col_w=col_w, col_d=col_d,
+        flooring=bool(vals['bldg_flooring']), sanitary=bool(vals['bldg_sanitary']),
+        electrical=bool(vals['bldg_electrical']),
+    )
+    floor_area = building_takeoff.quantity('main', 'floor_area')
+    boq = building_takeoff.block_boq('main')
     
     # Calculate costs
     cost_summary = total_project_cost(boq, rates_building)
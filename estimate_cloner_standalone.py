@@ -6,11 +6,10 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional
 
-import openpyxl
 import pandas as pd
 from openpyxl import load_workbook
-from openpyxl.styles import Alignment, Font, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+from modules.workbook_writer import save_estimate_workbook
 
 # PDF generation imports
 try:
@@ -30,9 +29,11 @@ except ImportError:
 class EstimateClonerStandalone:
     """Clone and modify existing estimates - Standalone version"""
     
-    def __init__(self):
+    def __init__(self, artifact_cache=None):
         self.source_estimate = None
         self.modifications = []
+        # Optional modules.artifact_cache.ArtifactCache for repeat exports
+        self.artifact_cache = artifact_cache
     
     def load_estimate(self, file_path: str) -> Dict:
         """Load an archived estimate"""
@@ -156,65 +157,27 @@ class EstimateClonerStandalone:
             print(f"Error recalculating totals: {e}")
             return False
     
+    def _artifact_inputs(self, project_info: Dict) -> Dict:
+        """Everything an export of this estimate depends on"""
+        return {
+            'sheets': self.source_estimate['sheets'],
+            'modifications': self.modifications,
+            'project_info': project_info
+        }
+    
     def save_as_new_estimate(self, output_path: str, project_info: Dict) -> bool:
         """Save modified estimate as new file"""
         try:
-            # Create new workbook
-            wb = openpyxl.Workbook()
-            wb.remove(wb.active)  # Remove default sheet
-            
-            # Add each sheet
-            for sheet_name, df in self.source_estimate['sheets'].items():
-                ws = wb.create_sheet(sheet_name)
-                
-                # Write data
-                for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
-                    for c_idx, value in enumerate(row, 1):
-                        cell = ws.cell(row=r_idx, column=c_idx, value=value)
-                        
-                        # Style header row
-                        if r_idx == 1:
-                            cell.font = Font(bold=True, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                            cell.alignment = Alignment(horizontal="center", vertical="center")
-                
-                # Auto-adjust column widths
-                for column in ws.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Add metadata sheet
-            meta_ws = wb.create_sheet("Metadata", 0)
-            meta_ws['A1'] = "Project Information"
-            meta_ws['A1'].font = Font(bold=True, size=14)
-            
-            row = 3
-            for key, value in project_info.items():
-                meta_ws[f'A{row}'] = key
-                meta_ws[f'B{row}'] = value
-                meta_ws[f'A{row}'].font = Font(bold=True)
-                row += 1
+            def build(path):
+                # xlsxwriter streams the rows to disk in constant-memory mode
+                save_estimate_workbook(path, self.source_estimate['sheets'],
+                                       project_info, self.modifications)
             
-            # Add modifications log
-            row += 2
-            meta_ws[f'A{row}'] = "Modifications Log"
-            meta_ws[f'A{row}'].font = Font(bold=True, size=12)
-            row += 1
-            
-            for mod in self.modifications:
-                meta_ws[f'A{row}'] = f"{mod['type'].upper()}: {mod.get('sheet', '')} - {mod.get('timestamp', '')}"
-                row += 1
-            
-            # Save
-            wb.save(output_path)
+            if self.artifact_cache is None:
+                build(output_path)
+            else:
+                self.artifact_cache.export('cloner_xlsx', self._artifact_inputs(project_info),
+                                           output_path, build)
             
             return True
             
@@ -255,6 +218,21 @@ class EstimateClonerStandalone:
                 output_path = str(timestamped_folder / output_filename)
                 
                 print(f"PDF will be saved to: {output_path}")
+            
+            if self.artifact_cache is not None:
+                ok, _ = self.artifact_cache.export(
+                    'cloner_pdf', self._artifact_inputs(project_info), output_path,
+                    lambda path: self._render_pdf(path, project_info))
+                return ok
+            return self._render_pdf(output_path, project_info)
+        
+        except Exception as e:
+            print(f"Error generating PDF: {e}")
+            return False
+    
+    def _render_pdf(self, output_path: str, project_info: Dict) -> bool:
+        """Render the estimate to an A4 PDF at output_path"""
+        try:
             # Create PDF document
             doc = SimpleDocTemplate(
                 output_path,
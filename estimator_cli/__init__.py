@@ -0,0 +1,18 @@
+"""
+Estimator CLI
+Command-line access to bulk pricing, matching, imports and exports without
+the Streamlit app. Run ``python -m estimator_cli --help``.
+
+Only the estimating engine (estimate/src/engine) and the data-layer modules
+are imported, and each command imports what it needs when it runs.
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ENGINE_SRC_DIR = REPO_ROOT / "estimate" / "src"
+
+for _path in (REPO_ROOT, ENGINE_SRC_DIR):
+    if str(_path) not in sys.path:
+        sys.path.append(str(_path))
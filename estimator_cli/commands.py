@@ -0,0 +1,222 @@
+"""
+Per-file command implementations
+
+Each function handles one input file and returns a result dict, so the
+entry point can fan the same function out over a process pool. Engine and
+data-layer modules are imported inside the functions that use them; pricing
+a CSV or JSON BOQ needs only NumPy.
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CODE_COLUMNS = ('item_code', 'item code', 'code', 'ssr_code', 'ssr code')
+QUANTITY_COLUMNS = ('quantity', 'qty')
+DESCRIPTION_COLUMNS = ('description', 'particulars', 'item of work', 'name of item', 'item_description')
+
+_ssr_databases = {}
+
+
+def _pick(columns, candidates, label: str, path) -> str:
+    """Actual column name matching one of the candidates (case-insensitive)"""
+    lookup = {str(column).strip().lower(): column for column in columns}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    raise ValueError(f"{Path(path).name}: no {label} column (expected one of {', '.join(candidates)})")
+
+
+def _number(value) -> float:
+    try:
+        return float(str(value).replace(',', '').strip())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _read_records(path) -> List[Dict]:
+    """Rows of a CSV, JSON list or first Excel sheet as dicts"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            return list(csv.DictReader(f))
+    if suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return [{'item_code': code, 'quantity': qty} for code, qty in data.items()]
+        return list(data)
+    import pandas as pd
+    df = pd.read_excel(path)
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def read_boq(path) -> Tuple[List[str], List[float]]:
+    """Item codes and quantities from a BOQ file ({code: qty} JSON, CSV or Excel)"""
+    records = _read_records(path)
+    if not records:
+        return [], []
+    code_column = _pick(records[0].keys(), CODE_COLUMNS, 'item code', path)
+    quantity_column = _pick(records[0].keys(), QUANTITY_COLUMNS, 'quantity', path)
+    codes, quantities = [], []
+    for record in records:
+        code = record.get(code_column)
+        if code is None or not str(code).strip():
+            continue
+        codes.append(str(code).strip())
+        quantities.append(_number(record.get(quantity_column)))
+    return codes, quantities
+
+
+def read_descriptions(path, column: Optional[str] = None) -> List[str]:
+    """Non-blank item descriptions from a CSV or the first Excel sheet"""
+    records = _read_records(path)
+    if not records:
+        return []
+    column = _pick(records[0].keys(), (column.lower(),) if column else DESCRIPTION_COLUMNS, 'description', path)
+    return [str(r[column]).strip() for r in records if r.get(column) is not None and str(r[column]).strip()]
+
+
+def _priced(path, book='unit', region=None, year=None, overhead=0.08, contingency=0.10, gst=0.18):
+    from engine.boq import ColumnarBOQ, price_boq
+    from engine.ratebook import get_registry
+
+    codes, quantities = read_boq(path)
+    boq = ColumnarBOQ.from_arrays(codes, quantities, get_registry().get(book, region, year).index)
+    summary = price_boq(boq, overhead, contingency, gst)
+    del summary['amounts']
+    return boq, summary
+
+
+def price_file(path, **pricing) -> Dict:
+    """Cost summary of one BOQ"""
+    boq, summary = _priced(path, **pricing)
+    unknown = len(set(boq.codes[boq.positions < 0])) if len(boq) else 0
+    return dict({'file': str(path), 'items': len(boq), 'unknown_codes': unknown}, **summary)
+
+
+def export_xlsx_file(path, output_dir: str, **pricing) -> Dict:
+    """Priced BOQ workbook with cost summary"""
+    from engine.exporters import write_boq_xlsx
+
+    boq, summary = _priced(path, **pricing)
+    output = Path(output_dir) / f"{Path(path).stem}.xlsx"
+    write_boq_xlsx(boq.to_frame(), summary, str(output))
+    return {'file': str(path), 'output': str(output), 'items': len(boq), 'grand_total': summary['grand_total']}
+
+
+def export_pdf_file(path, output_dir: str, **pricing) -> Dict:
+    """Priced BOQ as PDF with cost summary"""
+    from engine.exporters import write_boq_pdf
+
+    boq, summary = _priced(path, **pricing)
+    output = Path(output_dir) / f"{Path(path).stem}.pdf"
+    write_boq_pdf(boq.to_frame(), summary, str(output))
+    return {'file': str(path), 'output': str(output), 'items': len(boq), 'grand_total': summary['grand_total']}
+
+
+def scenarios_file(path, output_dir: str, book='unit', region=None, year=None,
+                   overhead=(0.08,), contingency=(0.10,), gst=(0.18,),
+                   escalation: Optional[Dict[str, List[float]]] = None) -> Dict:
+    """What-if grid of overhead/contingency/GST/escalation values for one BOQ, saved as CSV"""
+    from engine.boq import ColumnarBOQ
+    from engine.ratebook import get_registry
+    from engine.scenarios import evaluate_grid
+
+    codes, quantities = read_boq(path)
+    boq = ColumnarBOQ.from_arrays(codes, quantities, get_registry().get(book, region, year).index)
+    results = evaluate_grid(boq, overhead, contingency, gst, escalation)
+    output = Path(output_dir) / f"{Path(path).stem}_scenarios.csv"
+    results.to_csv(output, index=False)
+    return {'file': str(path), 'output': str(output), 'scenarios': len(results),
+            'min_grand_total': float(results['grand_total'].min()),
+            'max_grand_total': float(results['grand_total'].max())}
+
+
+def risk_file(path, book='unit', region=None, year=None, overhead=0.08, contingency=0.10, gst=0.18,
+              quantity: Optional[Dict[str, List[float]]] = None,
+              rate: Optional[Dict[str, List[float]]] = None,
+              trials: int = 100_000, seed: Optional[int] = None) -> Dict:
+    """Monte Carlo P50/P80/P90 grand totals for one BOQ
+
+    quantity / rate map a code prefix or item code to [sigma] (lognormal) or
+    [low, mode, high] (triangular) multiplicative factors.
+    """
+    from engine.boq import ColumnarBOQ, price_boq
+    from engine.ratebook import get_registry
+    from engine.risk import RiskModel, lognormal, simulate, triangular
+
+    def spec(values):
+        return lognormal(*values) if len(values) == 1 else triangular(*values)
+
+    model = RiskModel({key: spec(v) for key, v in (quantity or {}).items()},
+                      {key: spec(v) for key, v in (rate or {}).items()})
+    codes, quantities = read_boq(path)
+    boq = ColumnarBOQ.from_arrays(codes, quantities, get_registry().get(book, region, year).index)
+    result = simulate(boq, model, trials, seed=seed,
+                      overhead=overhead, contingency=contingency, gst=gst)
+    deterministic = price_boq(boq, overhead, contingency, gst)['grand_total']
+    return dict({'file': str(path), 'trials': result['trials'], 'deterministic_total': deterministic,
+                 'mean': result['mean']},
+                **{f"p{p}": value for p, value in result['percentiles'].items()})
+
+
+def import_file(path, output_dir: str) -> Dict:
+    """Read an estimate workbook and store it as a Parquet project folder"""
+    import pandas as pd
+
+    from modules.columnar_store import export_project
+
+    sheets = pd.read_excel(path, sheet_name=None)
+    abstracts = {name: df for name, df in sheets.items() if 'abs' in name.lower()}
+    measurements = {name: df for name, df in sheets.items() if name not in abstracts}
+    output = Path(output_dir) / Path(path).stem
+    export_project(output, {'name': Path(path).stem, 'source_file': str(path)}, measurements, abstracts)
+    return {'file': str(path), 'output': str(output), 'measurement_sheets': len(measurements),
+            'abstract_sheets': len(abstracts), 'rows': sum(len(df) for df in sheets.values())}
+
+
+def match_file(path, output_dir: str, db_path: str, threshold: int = 70, column: Optional[str] = None) -> Dict:
+    """Best SSR/BSR match for every description in a file, written as CSV"""
+    from modules.job_runner import best_matches
+    from ssr_bsr_integration import SSRBSRDatabase
+
+    if db_path not in _ssr_databases:
+        _ssr_databases[db_path] = SSRBSRDatabase(db_path)
+    matches = best_matches(_ssr_databases[db_path], read_descriptions(path, column), threshold)
+    output = Path(output_dir) / f"{Path(path).stem}_matches.csv"
+    matches.to_csv(output, index=False)
+    return {'file': str(path), 'output': str(output), 'items': len(matches),
+            'matched': int(matches['code'].notna().sum())}
+
+
+def triage_file(path, full: bool = False) -> Dict:
+    """Suggested import mode from the zip-level fingerprint (full analysis on demand)"""
+    from modules.excel_analyzer import ExcelAnalyzer
+
+    row = ExcelAnalyzer().triage([path], full=full)[0]
+    error = row.pop('error')
+    if error:
+        raise ValueError(error)
+    return row
+
+
+def reprice(db_path: str) -> Dict:
+    """Roll SSR rates up the item tree and save them"""
+    from modules.rate_rollup import RateRollupEngine
+
+    engine = RateRollupEngine.from_db(db_path)
+    engine.compute_all()
+    updated = engine.write_back(db_path)
+    return dict({'database': db_path, 'items_updated': updated}, **engine.timings)
+
+
+def archive_index(archive_root: str, rebuild: bool = False, jobs: int = 1) -> Dict:
+    """Index line items of archived workbooks (all of them with rebuild)"""
+    from project_archive_manager import ProjectArchiveManager
+
+    results = ProjectArchiveManager(archive_root).build_content_index(rebuild=rebuild, jobs=jobs)
+    return {'archive': archive_root, 'indexed_projects': results['indexed_projects'],
+            'indexed_items': results['indexed_items'], 'failed': len(results['failed'])}
@@ -0,0 +1,192 @@
+"""
+Entry point: python -m estimator_cli <command> [files or globs...] [--jobs N]
+"""
+
+import argparse
+import csv
+import glob
+import json
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from . import commands
+
+FILE_COMMANDS = {
+    'import': commands.import_file,
+    'match': commands.match_file,
+    'price': commands.price_file,
+    'export-xlsx': commands.export_xlsx_file,
+    'export-pdf': commands.export_pdf_file,
+    'triage': commands.triage_file,
+    'scenarios': commands.scenarios_file,
+    'risk': commands.risk_file,
+}
+
+
+def expand(patterns: Iterable[str]) -> List[str]:
+    """Files matching the given paths/globs (recursive '**' allowed), in order, without repeats"""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or ([pattern] if Path(pattern).exists() else [])
+        files.extend(path for path in matches if Path(path).is_file() and path not in files)
+    return files
+
+
+def parse_factors(values: Iterable[str], option: str) -> Dict[str, List[float]]:
+    """['CONC=0,0.05', 'REBAR=0.1'] -> {'CONC': [0.0, 0.05], 'REBAR': [0.1]}"""
+    factors = {}
+    for value in values:
+        key, _, numbers = value.partition('=')
+        try:
+            if not key.strip():
+                raise ValueError(value)
+            factors[key.strip()] = [float(number) for number in numbers.split(',')]
+        except ValueError:
+            raise SystemExit(f"Invalid {option} {value!r}, expected KEY=V1,V2,...")
+    return factors
+
+
+def _safe_call(func: Callable, path: str, **options) -> Dict:
+    """Run one file; a failure becomes an error result instead of stopping the batch"""
+    try:
+        return dict(func(path, **options), status='ok')
+    except Exception as e:
+        return {'file': str(path), 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+
+
+def run_each(func: Callable, paths: List[str], jobs: int = 1, **options) -> List[Dict]:
+    """Apply func to every path, in a process pool when jobs > 1 (results keep input order)"""
+    task = partial(_safe_call, func, **options)
+    if jobs <= 1 or len(paths) <= 1:
+        return [task(path) for path in paths]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        return list(pool.map(task, paths))
+
+
+def _format_value(value) -> str:
+    return f"{value:,.2f}" if isinstance(value, float) else str(value)
+
+
+def report(results: List[Dict], as_json: bool = False, stream=None):
+    stream = stream or sys.stdout
+    for result in results:
+        if as_json:
+            print(json.dumps(result, default=str), file=stream)
+        elif result.get('status') == 'error':
+            print(f"❌ {result['file']}: {result['error']}", file=stream)
+        else:
+            details = ", ".join(f"{key}={_format_value(value)}" for key, value in result.items()
+                                if key not in ('file', 'status', 'database', 'archive'))
+            name = result.get('file') or result.get('database') or result.get('archive')
+            print(f"✅ {name}: {details}", file=stream)
+
+
+def write_summary_csv(results: List[Dict], output_path: str):
+    columns = []
+    for result in results:
+        columns.extend(key for key in result if key not in columns)
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--jobs', '-j', type=int, default=1, help="worker processes (default 1)")
+    common.add_argument('--json', action='store_true', help="print one JSON object per result")
+
+    files = argparse.ArgumentParser(add_help=False)
+    files.add_argument('files', nargs='+', help="input files or glob patterns, e.g. 'boqs/**/*.csv'")
+
+    rate_book = argparse.ArgumentParser(add_help=False)
+    rate_book.add_argument('--book', default='unit', help="rate book name (default: unit)")
+    rate_book.add_argument('--region', help="rate book region, e.g. Rajasthan")
+    rate_book.add_argument('--year', type=int, help="rate book year (default: latest)")
+
+    pricing = argparse.ArgumentParser(add_help=False, parents=[rate_book])
+    pricing.add_argument('--overhead', type=float, default=0.08)
+    pricing.add_argument('--contingency', type=float, default=0.10)
+    pricing.add_argument('--gst', type=float, default=0.18)
+
+    outputs = argparse.ArgumentParser(add_help=False)
+    outputs.add_argument('--out-dir', '-o', default='.', help="output folder (default: current folder)")
+
+    parser = argparse.ArgumentParser(prog='python -m estimator_cli',
+                                     description="Bulk pricing, matching, imports and exports without the UI")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('import', parents=[common, files, outputs],
+                   help="estimate workbooks -> Parquet project folders")
+    match = sub.add_parser('match', parents=[common, files, outputs],
+                           help="fuzzy-match item descriptions against SSR/BSR")
+    match.add_argument('--db', default='construction_estimates.db', help="SSR/BSR database")
+    match.add_argument('--threshold', type=int, default=70)
+    match.add_argument('--column', help="description column (default: auto-detect)")
+    price = sub.add_parser('price', parents=[common, files, pricing],
+                           help="price BOQs (code, quantity) against a rate book")
+    price.add_argument('--summary', help="also write the results to this CSV file")
+    sub.add_parser('export-xlsx', parents=[common, files, pricing, outputs], help="priced BOQ workbooks")
+    sub.add_parser('export-pdf', parents=[common, files, pricing, outputs], help="priced BOQ PDFs")
+    triage = sub.add_parser('triage', parents=[common, files],
+                            help="classify workbooks (Standard Estimate / Dynamic Template / Auto-detect)")
+    triage.add_argument('--full', action='store_true', help="full cell-level analysis instead of the fingerprint")
+    scenarios = sub.add_parser('scenarios', parents=[common, files, rate_book, outputs],
+                               help="what-if grid of overhead/contingency/GST/escalation -> CSV per BOQ")
+    scenarios.add_argument('--overhead', type=float, nargs='+', default=[0.08])
+    scenarios.add_argument('--contingency', type=float, nargs='+', default=[0.10])
+    scenarios.add_argument('--gst', type=float, nargs='+', default=[0.18])
+    scenarios.add_argument('--escalate', action='append', default=[], metavar='CATEGORY=R1,R2',
+                           help="rate escalation per code prefix, e.g. CONC=0,0.05 (repeatable)")
+    risk = sub.add_parser('risk', parents=[common, files, pricing],
+                          help="Monte Carlo P50/P80/P90 grand totals from quantity and rate uncertainty")
+    risk.add_argument('--quantity', action='append', default=[], metavar='KEY=SIGMA|LOW,MODE,HIGH',
+                      help="quantity factor per code prefix or item code, e.g. EXCAV=0.9,1,1.25 (repeatable)")
+    risk.add_argument('--rate', action='append', default=[], metavar='KEY=SIGMA|LOW,MODE,HIGH',
+                      help="rate factor per code prefix or item code, e.g. REBAR=0.12 (repeatable)")
+    risk.add_argument('--trials', type=int, default=100_000)
+    risk.add_argument('--seed', type=int, help="random seed for reproducible results")
+    reprice = sub.add_parser('reprice', parents=[common], help="roll SSR rates up the item tree and save them")
+    reprice.add_argument('--db', default='construction_estimates.db', help="database with ssr_items")
+    archive = sub.add_parser('archive-index', parents=[common], help="index line items of archived workbooks")
+    archive.add_argument('--root', default='project_archives', help="archive folder")
+    archive.add_argument('--rebuild', action='store_true', help="re-index every archived file")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'reprice':
+        results = [_safe_call(lambda path: commands.reprice(path), args.db)]
+    elif args.command == 'archive-index':
+        results = [_safe_call(lambda root: commands.archive_index(root, args.rebuild, args.jobs), args.root)]
+    else:
+        paths = expand(args.files)
+        if not paths:
+            print("No input files matched", file=sys.stderr)
+            return 2
+        options = {}
+        if args.command in ('price', 'export-xlsx', 'export-pdf', 'scenarios', 'risk'):
+            options.update(book=args.book, region=args.region, year=args.year,
+                           overhead=args.overhead, contingency=args.contingency, gst=args.gst)
+        if args.command == 'scenarios':
+            options['escalation'] = parse_factors(args.escalate, '--escalate')
+        if args.command == 'risk':
+            options.update(quantity=parse_factors(args.quantity, '--quantity'),
+                           rate=parse_factors(args.rate, '--rate'), trials=args.trials, seed=args.seed)
+        if args.command == 'triage':
+            options['full'] = args.full
+        elif args.command not in ('price', 'risk'):
+            Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+            options['output_dir'] = args.out_dir
+        if args.command == 'match':
+            options.update(db_path=args.db, threshold=args.threshold, column=args.column)
+        results = run_each(FILE_COMMANDS[args.command], paths, args.jobs, **options)
+        if args.command == 'price' and args.summary:
+            write_summary_csv(results, args.summary)
+
+    report(results, args.json)
+    return 1 if any(result.get('status') == 'error' for result in results) else 0
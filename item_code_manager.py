@@ -11,6 +11,9 @@ from typing import Dict, List, Optional
 
 import pandas as pd
 
+from modules.formula_engine import FormulaError, compile_formula
+from modules.measurements import measurement_totals
+
 
 class ItemCodeManager:
     """Enhanced item code management system with SSR/BSR integration"""
@@ -225,6 +228,13 @@ class ItemCodeManager:
     
     def add_measurement_template(self, template_data: Dict) -> bool:
         """Add a reusable measurement template"""
+        try:
+            # Reject unsafe or malformed formulas up front (and warm the compile cache)
+            compile_formula(template_data['formula'])
+        except FormulaError as e:
+            print(f"❌ Invalid template formula: {e}")
+            return False
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -271,6 +281,31 @@ class ItemCodeManager:
         conn.close()
         return results
     
+    def apply_measurement_template(self, template_code: str, rows):
+        """
+        Evaluate a measurement template on one row (dict of scalars) or many
+        rows (DataFrame or dict of column arrays) in a single vectorized call
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT formula FROM measurement_templates WHERE template_code = ?",
+                (template_code,)
+            ).fetchone()
+            if not row:
+                raise KeyError(f"Template not found: {template_code}")
+            
+            result = compile_formula(row[0]).evaluate(rows)
+            
+            conn.execute(
+                "UPDATE measurement_templates SET usage_count = usage_count + 1 WHERE template_code = ?",
+                (template_code,)
+            )
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+    
     def export_item_master(self, output_path: str) -> bool:
         """Export item master to Excel"""
         try:
@@ -299,46 +334,36 @@ class MultiRowMeasurementManager:
         cursor = conn.cursor()
         
         try:
-            for i, measurement in enumerate(measurements):
-                # Calculate total
-                nos = measurement.get('nos', 1)
-                length = measurement.get('length', 0)
-                breadth = measurement.get('breadth', 0)
-                height = measurement.get('height', 0)
-                
-                if length and breadth and height:
-                    total = nos * length * breadth * height
-                elif length and breadth:
-                    total = nos * length * breadth
-                elif length:
-                    total = nos * length
-                else:
-                    total = nos
-                
-                amount = total * measurement.get('rate', 0)
-                
-                cursor.execute("""
-                    INSERT INTO measurement_rows 
-                    (project_id, item_code, row_number, description, location,
-                     nos, length, breadth, height, unit, total, rate, amount, created_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+            # Quantities for all rows in one vectorized pass
+            totals = measurement_totals(measurements)
+            created = datetime.now().isoformat()
+            
+            rows = []
+            for i, (measurement, total) in enumerate(zip(measurements, totals.tolist())):
+                rows.append((
                     project_id,
                     item_code,
                     i + 1,
                     measurement['description'],
                     measurement.get('location', ''),
-                    nos,
-                    length,
-                    breadth,
-                    height,
+                    measurement.get('nos', 1),
+                    measurement.get('length', 0),
+                    measurement.get('breadth', 0),
+                    measurement.get('height', 0),
                     measurement['unit'],
                     total,
                     measurement['rate'],
-                    amount,
-                    datetime.now().isoformat()
+                    total * measurement.get('rate', 0),
+                    created
                 ))
             
+            cursor.executemany("""
+                INSERT INTO measurement_rows 
+                (project_id, item_code, row_number, description, location,
+                 nos, length, breadth, height, unit, total, rate, amount, created_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            
             conn.commit()
             print(f"✅ Added {len(measurements)} measurement rows for {item_code}")
             return True
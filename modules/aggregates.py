@@ -0,0 +1,350 @@
+"""
+Aggregates Module
+Incrementally maintained per-sheet, per-category and per-SSR-code totals for
+measurements and abstracts
+"""
+
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Fields kept for every group, in this order
+FIELDS = ('amount', 'quantity', 'count', 'matched', 'rate_sum')
+
+# Column holding the quantity for each kind of sheet
+QUANTITY_COLUMNS = {
+    'measurements': 'total',
+    'abstracts': 'quantity',
+}
+
+PROJECT_AGGREGATES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS project_aggregates (
+        project_id TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        updated_at TEXT
+    )
+"""
+
+
+def _numeric(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[column], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+
+
+def _labels(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), '', dtype=object)
+    return df[column].fillna('').astype(str).to_numpy(dtype=object)
+
+
+def _row_hashes(rows: pd.DataFrame) -> pd.Series:
+    return pd.Series(pd.util.hash_pandas_object(rows, index=False).to_numpy())
+
+
+def _multiset_difference(old: pd.DataFrame, old_hash: pd.Series, new: pd.DataFrame,
+                         new_hash: pd.Series) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Rows only in old and rows only in new, counting duplicates"""
+    old_counts = old_hash.value_counts()
+    new_counts = new_hash.value_counts()
+
+    # The k-th copy of a row survives if the other side has more than k copies
+    old_rank = old_hash.groupby(old_hash).cumcount().to_numpy()
+    new_rank = new_hash.groupby(new_hash).cumcount().to_numpy()
+    kept_in_new = new_counts.reindex(old_hash).fillna(0).to_numpy()
+    kept_in_old = old_counts.reindex(new_hash).fillna(0).to_numpy()
+    return old[old_rank >= kept_in_new], new[new_rank >= kept_in_old]
+
+
+class AggregateStore:
+    """
+    Running sums and counts for measurements and abstracts.
+
+    Each sheet's row contributions are remembered, so re-syncing a sheet only
+    applies the rows that were added, changed or removed (matched by content). Totals are kept per
+    sheet, per category and per SSR code and read in O(1). With ``audit=True``
+    every sync is checked against a full recompute.
+    """
+
+    def __init__(self, match_threshold: float = 0.6, audit: bool = False):
+        self.match_threshold = match_threshold
+        self.audit_enabled = audit
+        # (kind, sheet) -> {(group_type, key): np.array(FIELDS)}
+        self._sheet_groups: Dict[Tuple[str, str], Dict[Tuple[str, str], np.ndarray]] = {}
+        # (kind, group_type, key) -> np.array(FIELDS), summed over sheets
+        self._totals: Dict[Tuple[str, str, str], np.ndarray] = {}
+        # (kind, sheet) -> (per-row contributions, row hashes), used to compute deltas
+        self._rows: Dict[Tuple[str, str], Tuple[pd.DataFrame, pd.Series]] = {}
+        # kind -> {sheet: frame}, only kept for auditing
+        self._frames: Dict[str, Dict[str, pd.DataFrame]] = {}
+        self.stats = {'syncs': 0, 'rows_applied': 0, 'full_rebuilds': 0, 'audit_failures': 0}
+        # (db_path, project_id) that autosave() writes to, set by attach()
+        self._persist_to: Optional[Tuple[str, str]] = None
+
+    # Updates ---------------------------------------------------------------
+
+    def sync_sheet(self, kind: str, sheet: str, df: Optional[pd.DataFrame]):
+        """Bring a sheet's aggregates in line with its current frame"""
+        key = (kind, sheet)
+        new = self._contributions(kind, df if df is not None else pd.DataFrame())
+        new_hash = _row_hashes(new)
+        old, old_hash = self._rows.get(key, (None, None))
+
+        if old is None:
+            self._subtract_sheet(kind, sheet)
+            self._apply(kind, sheet, new, 1)
+            self.stats['full_rebuilds'] += 1
+            self.stats['rows_applied'] += len(new)
+        else:
+            # Rows are matched by content, not label, so index resets after a
+            # delete or insert do not turn every later row into a change
+            outgoing, incoming = _multiset_difference(old, old_hash, new, new_hash)
+            self._apply(kind, sheet, outgoing, -1)
+            self._apply(kind, sheet, incoming, 1)
+            self.stats['rows_applied'] += len(outgoing) + len(incoming)
+
+        self._rows[key] = (new, new_hash)
+        self.stats['syncs'] += 1
+        if self.audit_enabled:
+            self._frames.setdefault(kind, {})[sheet] = df
+            mismatches = self.audit(self._frames)
+            if mismatches:
+                self.stats['audit_failures'] += 1
+                logger.error(f"❌ Aggregate audit failed for {kind}/{sheet}: {mismatches[:5]}")
+
+    def remove_sheet(self, kind: str, sheet: str):
+        self._subtract_sheet(kind, sheet)
+        self._rows.pop((kind, sheet), None)
+        self._frames.get(kind, {}).pop(sheet, None)
+
+    def clear(self, kind: Optional[str] = None):
+        for k, sheet in list(self._sheet_groups):
+            if kind is None or k == kind:
+                self.remove_sheet(k, sheet)
+
+    def _contributions(self, kind: str, df: pd.DataFrame) -> pd.DataFrame:
+        quantity_column = QUANTITY_COLUMNS.get(kind, 'quantity')
+        if quantity_column not in df.columns and 'quantity' in df.columns:
+            quantity_column = 'quantity'
+        confidence = _numeric(df, 'ssr_match_confidence')
+        return pd.DataFrame({
+            'amount': _numeric(df, 'amount'),
+            'quantity': _numeric(df, quantity_column),
+            'count': np.ones(len(df)),
+            'matched': (confidence > self.match_threshold).astype(np.float64),
+            'rate_sum': _numeric(df, 'rate'),
+            'category': _labels(df, 'category'),
+            'ssr': _labels(df, 'ssr_code'),
+        }, index=df.index)
+
+    def _apply(self, kind: str, sheet: str, rows: pd.DataFrame, sign: int):
+        if rows.empty:
+            return
+        groups = self._sheet_groups.setdefault((kind, sheet), {})
+        values = rows[list(FIELDS)]
+        sheet_sum = values.sum().to_numpy()
+        deltas = [(('all', ''), sheet_sum), (('sheet', sheet), sheet_sum)]
+        for group_type, column in (('category', 'category'), ('ssr', 'ssr')):
+            sums = values.groupby(rows[column].to_numpy(), sort=False).sum()
+            deltas.extend(((group_type, label), sums.loc[label].to_numpy()) for label in sums.index)
+
+        for group, delta in deltas:
+            delta = sign * delta
+            groups[group] = groups.get(group, 0.0) + delta
+            total_key = (kind,) + group
+            self._totals[total_key] = self._totals.get(total_key, 0.0) + delta
+            if groups[group][2] == 0:
+                del groups[group]
+            if self._totals[total_key][2] == 0:
+                del self._totals[total_key]
+
+    def _subtract_sheet(self, kind: str, sheet: str):
+        for group, values in self._sheet_groups.pop((kind, sheet), {}).items():
+            total_key = (kind,) + group
+            remaining = self._totals.get(total_key, 0.0) - values
+            if np.ndim(remaining) and remaining[2] != 0:
+                self._totals[total_key] = remaining
+            else:
+                self._totals.pop(total_key, None)
+
+    # O(1) reads ------------------------------------------------------------
+
+    def _value(self, kind: str, group_type: str, key: str) -> Dict[str, float]:
+        values = self._totals.get((kind, group_type, key))
+        if values is None:
+            return {field: 0.0 for field in FIELDS}
+        return dict(zip(FIELDS, values.tolist()))
+
+    def sheet(self, kind: str, sheet: str) -> Dict[str, float]:
+        """{amount, quantity, count, matched, rate_sum} for one sheet"""
+        return self._value(kind, 'sheet', sheet)
+
+    def category(self, kind: str, category: str) -> Dict[str, float]:
+        return self._value(kind, 'category', category)
+
+    def ssr_code(self, kind: str, code: str) -> Dict[str, float]:
+        return self._value(kind, 'ssr', code)
+
+    def total(self, kind: str, field: str = 'amount') -> float:
+        """Sum of a field over every sheet of this kind"""
+        return self._value(kind, 'all', '')[field]
+
+    def groups(self, kind: str, group_type: str) -> Dict[str, Dict[str, float]]:
+        """All groups of one type, e.g. groups('abstracts', 'category')"""
+        return {key: dict(zip(FIELDS, values.tolist()))
+                for (k, g, key), values in self._totals.items() if k == kind and g == group_type}
+
+    def sheet_groups(self, kind: str, sheet: str, group_type: str) -> Dict[str, Dict[str, float]]:
+        """Groups of one type within a single sheet"""
+        return {key: dict(zip(FIELDS, values.tolist()))
+                for (g, key), values in self._sheet_groups.get((kind, sheet), {}).items() if g == group_type}
+
+    # Audit -----------------------------------------------------------------
+
+    def audit(self, sheets_by_kind: Dict[str, Dict[str, pd.DataFrame]],
+              tolerance: float = 1e-6) -> List[str]:
+        """Compare every maintained total with a full recompute; returns mismatches"""
+        fresh = AggregateStore(self.match_threshold)
+        for kind, sheets in sheets_by_kind.items():
+            for sheet, df in sheets.items():
+                fresh.sync_sheet(kind, sheet, df)
+
+        kinds = set(sheets_by_kind)
+        mismatches = []
+        for key in set(self._totals) | set(fresh._totals):
+            if key[0] not in kinds:
+                continue
+            ours = self._totals.get(key, np.zeros(len(FIELDS)))
+            theirs = fresh._totals.get(key, np.zeros(len(FIELDS)))
+            if not np.allclose(ours, theirs, rtol=tolerance, atol=tolerance):
+                mismatches.append(f"{key}: {ours.tolist()} != {theirs.tolist()}")
+        return mismatches
+
+    # Persistence -----------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        return {
+            'match_threshold': self.match_threshold,
+            'sheets': [
+                {'kind': kind, 'sheet': sheet,
+                 'groups': [[group_type, key, values.tolist()]
+                            for (group_type, key), values in groups.items()]}
+                for (kind, sheet), groups in self._sheet_groups.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, audit: bool = False) -> 'AggregateStore':
+        """Restore totals; the first sync of each sheet afterwards rebuilds it"""
+        store = cls(data.get('match_threshold', 0.6), audit)
+        for entry in data.get('sheets', []):
+            groups = {(g, k): np.asarray(v, dtype=np.float64) for g, k, v in entry['groups']}
+            store._sheet_groups[(entry['kind'], entry['sheet'])] = groups
+            for group, values in groups.items():
+                total_key = (entry['kind'],) + group
+                store._totals[total_key] = store._totals.get(total_key, 0.0) + values
+        return store
+
+    def save(self, db_path: str, project_id: str) -> bool:
+        """Persist the aggregates with the project"""
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                with conn:
+                    conn.execute(PROJECT_AGGREGATES_SCHEMA)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO project_aggregates (project_id, data, updated_at) VALUES (?, ?, ?)",
+                        (str(project_id), json.dumps(self.to_dict()), datetime.now().isoformat())
+                    )
+            finally:
+                conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error saving aggregates for project {project_id}: {e}")
+            return False
+
+    def attach(self, db_path: str, project_id: str) -> 'AggregateStore':
+        """Save to this project from now on whenever autosave() is called"""
+        self._persist_to = (db_path, str(project_id))
+        return self
+
+    def autosave(self) -> bool:
+        """Persist to the attached project, if any"""
+        return self.save(*self._persist_to) if self._persist_to else False
+
+    @classmethod
+    def load(cls, db_path: str, project_id: str, audit: bool = False) -> 'AggregateStore':
+        """Aggregates saved for a project (empty store if none)"""
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                conn.execute(PROJECT_AGGREGATES_SCHEMA)
+                row = conn.execute("SELECT data FROM project_aggregates WHERE project_id = ?",
+                                   (str(project_id),)).fetchone()
+            finally:
+                conn.close()
+            if row:
+                return cls.from_dict(json.loads(row[0]), audit)
+        except Exception as e:
+            logger.error(f"❌ Error loading aggregates for project {project_id}: {e}")
+        return cls(audit=audit)
+
+
+class TrackedSheets(dict):
+    """{sheet_name: DataFrame} that keeps an AggregateStore in sync on every assignment.
+
+    Every change is followed by ``store.autosave()``, so a store attached to a
+    project is saved with each edit.
+    """
+
+    def __init__(self, store: AggregateStore, kind: str, sheets: Optional[Dict] = None):
+        super().__init__()
+        self.store = store
+        self.kind = kind
+        for name, df in (sheets or {}).items():
+            self._set(name, df)
+        if sheets:
+            self.store.autosave()
+
+    def _set(self, name, df):
+        self.store.sync_sheet(self.kind, name, df)
+        super().__setitem__(name, df)
+
+    def __setitem__(self, name, df):
+        self._set(name, df)
+        self.store.autosave()
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        self.store.remove_sheet(self.kind, name)
+        self.store.autosave()
+
+    def pop(self, name, *default):
+        if name not in self:
+            return super().pop(name, *default)
+        self.store.remove_sheet(self.kind, name)
+        value = super().pop(name)
+        self.store.autosave()
+        return value
+
+    def update(self, *args, **kwargs):
+        for name, df in dict(*args, **kwargs).items():
+            self._set(name, df)
+        self.store.autosave()
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def clear(self):
+        super().clear()
+        self.store.clear(self.kind)
+        self.store.autosave()
@@ -0,0 +1,243 @@
+"""
+Artifact Cache Module
+Content-addressed cache for generated report files (PDF/Excel) with
+size-bounded LRU eviction and hit statistics
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import shutil
+import sqlite3
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    build_seconds REAL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_lru ON artifacts(last_access);
+CREATE INDEX IF NOT EXISTS idx_artifacts_scope ON artifacts(scope, kind);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+STAT_NAMES = ('hits', 'misses', 'bytes_saved', 'seconds_saved', 'evictions', 'invalidations')
+
+
+def _feed(h, obj):
+    """Feed a canonical byte form of obj into hash h"""
+    if isinstance(obj, pd.DataFrame):
+        h.update(b'D' + json.dumps([str(c) for c in obj.columns]).encode())
+        h.update(json.dumps([str(t) for t in obj.dtypes]).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+        except TypeError:
+            # Unhashable cells (lists, dicts): fall back to the CSV text
+            h.update(obj.to_csv().encode())
+    elif isinstance(obj, pd.Series):
+        h.update(b'S' + str(obj.name).encode() + str(obj.dtype).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(b'A' + str(obj.dtype).encode() + str(obj.shape).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, Mapping):
+        h.update(b'M%d' % len(obj))
+        for key in sorted(obj, key=str):
+            _feed(h, str(key))
+            _feed(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'L%d' % len(obj))
+        for item in obj:
+            _feed(h, item)
+    elif isinstance(obj, (set, frozenset)):
+        _feed(h, sorted(obj, key=repr))
+    elif dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        _feed(h, dataclasses.asdict(obj))
+    elif isinstance(obj, (datetime, date)):
+        h.update(b'T' + obj.isoformat().encode())
+    elif isinstance(obj, np.generic):
+        _feed(h, obj.item())
+    else:
+        h.update(b'V' + type(obj).__name__.encode() + repr(obj).encode())
+
+
+def stable_hash(obj) -> str:
+    """Hash of nested dicts/lists/DataFrames that is stable across runs"""
+    h = hashlib.sha256()
+    _feed(h, obj)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Generated files stored under a key derived from their inputs
+
+    The key is the hash of (kind, data hash, options); repeats are served by
+    copying the stored file. Storing a new artifact for a scope/kind drops
+    the ones built from older data, and the directory is kept under max_bytes
+    by evicting least recently used files.
+    """
+
+    def __init__(self, cache_dir: str = "artifact_cache", max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / "index.db"
+        with self._connect() as conn:
+            conn.executescript(ARTIFACT_SCHEMA)
+            conn.executemany("INSERT OR IGNORE INTO cache_stats (name, value) VALUES (?, 0)",
+                             [(name,) for name in STAT_NAMES])
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def _bump(self, conn, **amounts):
+        conn.executemany("UPDATE cache_stats SET value = value + ? WHERE name = ?",
+                         [(value, name) for name, value in amounts.items()])
+
+    @staticmethod
+    def key_for(kind: str, data_hash: str, options: Optional[Mapping] = None) -> str:
+        return stable_hash({'kind': kind, 'data': data_hash, 'options': dict(options or {})})
+
+    def get(self, key: str) -> Optional[Path]:
+        """Stored file for key (marked as recently used), or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT file_name FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path = self.cache_dir / row[0]
+            if not path.exists():
+                conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE artifacts SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                         (time.time(), key))
+        return path
+
+    def put(self, key: str, source: str, scope: str = '', kind: str = '', data_hash: str = '',
+            build_seconds: float = 0.0) -> Optional[Path]:
+        """Copy a generated file into the cache; returns its cached path"""
+        size = Path(source).stat().st_size
+        if size > self.max_bytes:
+            logger.warning(f"⚠️ Artifact larger than cache limit, not cached: {source}")
+            return None
+        file_name = key + Path(source).suffix
+        target = self.cache_dir / file_name
+        shutil.copyfile(source, target)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO artifacts
+                (key, scope, kind, data_hash, file_name, size, build_seconds, created_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+            """, (key, scope, kind, data_hash, file_name, size, build_seconds, now, now))
+        if scope:
+            self.invalidate(scope, kind, keep_data_hash=data_hash)
+        self._evict()
+        return target
+
+    def invalidate(self, scope: str, kind: Optional[str] = None, keep_data_hash: Optional[str] = None) -> int:
+        """Drop artifacts of a scope (optionally one kind) not built from keep_data_hash"""
+        query = "SELECT key, file_name FROM artifacts WHERE scope = ?"
+        params = [scope]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        if keep_data_hash is not None:
+            query += " AND data_hash != ?"
+            params.append(keep_data_hash)
+        with self._connect() as conn:
+            stale = conn.execute(query, params).fetchall()
+            self._remove(conn, stale)
+            if stale:
+                self._bump(conn, invalidations=len(stale))
+        return len(stale)
+
+    def _remove(self, conn, rows):
+        for key, file_name in rows:
+            (self.cache_dir / file_name).unlink(missing_ok=True)
+        conn.executemany("DELETE FROM artifacts WHERE key = ?", [(key,) for key, _ in rows])
+
+    def _evict(self):
+        """Remove least recently used files until the cache fits max_bytes"""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for key, file_name, size in conn.execute(
+                    "SELECT key, file_name, size FROM artifacts ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                victims.append((key, file_name))
+                total -= size
+            self._remove(conn, victims)
+            self._bump(conn, evictions=len(victims))
+
+    def export(self, kind: str, inputs: Any, output_path: str, build: Callable[[str], Any],
+               options: Optional[Mapping] = None, scope: str = '') -> Tuple[bool, bool]:
+        """
+        Produce output_path, from the cache when the same inputs and options
+        were built before
+
+        build(path) writes the file and returns False on failure.
+        Returns (ok, served_from_cache).
+        """
+        data_hash = stable_hash(inputs)
+        key = self.key_for(kind, data_hash, options)
+        cached = self.get(key)
+        if cached is not None:
+            shutil.copyfile(cached, output_path)
+            with self._connect() as conn:
+                build_seconds = conn.execute("SELECT build_seconds FROM artifacts WHERE key = ?",
+                                             (key,)).fetchone()
+                self._bump(conn, hits=1, bytes_saved=cached.stat().st_size,
+                           seconds_saved=build_seconds[0] if build_seconds else 0.0)
+            logger.info(f"⚡ Served {kind} from artifact cache: {output_path}")
+            return True, True
+
+        start = time.perf_counter()
+        result = build(output_path)
+        elapsed = time.perf_counter() - start
+        with self._connect() as conn:
+            self._bump(conn, misses=1)
+        if result is False or not Path(output_path).exists():
+            return False, False
+        try:
+            self.put(key, output_path, scope, kind, data_hash, elapsed)
+        except OSError as e:
+            logger.error(f"❌ Could not store artifact in cache: {e}")
+        return True, False
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rate, bytes/seconds saved and current cache size"""
+        with self._connect() as conn:
+            values = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        requests = values['hits'] + values['misses']
+        return dict(values, requests=requests, hit_rate=values['hits'] / requests if requests else 0.0,
+                    entries=entries, size_bytes=size, max_bytes=self.max_bytes)
+
+    def clear(self):
+        with self._connect() as conn:
+            self._remove(conn, conn.execute("SELECT key, file_name FROM artifacts").fetchall())
+            conn.execute("UPDATE cache_stats SET value = 0")
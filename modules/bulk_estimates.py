@@ -0,0 +1,267 @@
+"""
+Bulk Estimates Module
+Generate many small-works estimate workbooks (Technical Report, Measurements,
+Abstract) from one table of works and line items
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from .measurements import nlbh_quantities
+
+# Format definitions shared by every generated workbook; each workbook adds
+# them once and reuses the handles for all cells
+BORDER = {'border': 1}
+TITLE_FORMAT = {'bold': True, 'font_size': 14, 'align': 'center'}
+LABEL_FORMAT = {'bold': True}
+HEADER_FORMAT = dict(BORDER, bold=True, font_color='#FFFFFF', font_size=12,
+                     bg_color='#4A90E2', align='center')
+TEXT_FORMAT = dict(BORDER)
+NUMBER_FORMAT = dict(BORDER, align='right')
+QUANTITY_FORMAT = dict(NUMBER_FORMAT, num_format='0.000')
+AMOUNT_FORMAT = dict(NUMBER_FORMAT, num_format='0.00')
+TOTAL_LABEL_FORMAT = dict(BORDER, bold=True, bg_color='#E8F4F8')
+TOTAL_AMOUNT_FORMAT = dict(TOTAL_LABEL_FORMAT, align='right', num_format='0.00')
+
+MEASUREMENT_HEADERS = ['S.N.', 'Particulars', 'Nos', 'Length', 'Breadth', 'Height', 'Qty', 'Unit']
+MEASUREMENT_WIDTHS = [6, 40, 8, 10, 10, 10, 12, 8]
+ABSTRACT_HEADERS = ['S.N.', 'Description of Item', 'Quantity', 'Unit', 'Rate (₹)', 'Amount (₹)']
+ABSTRACT_WIDTHS = [6, 40, 12, 8, 12, 15]
+
+WORK_DEFAULTS = {'location': 'Udaipur', 'client': 'PWD Rajasthan', 'engineer': 'Er. Rajkumar'}
+LINE_COLUMNS = ['item_description', 'nos', 'length', 'breadth', 'height', 'unit', 'rate', 'quantity', 'amount']
+MANIFEST_COLUMNS = ['work_name', 'file_name', 'file_path', 'items', 'total_amount', 'status', 'error']
+
+
+class EstimateFormats:
+    """Format handles for one workbook, created from the shared definitions"""
+
+    def __init__(self, workbook):
+        add = workbook.add_format
+        self.title = add(TITLE_FORMAT)
+        self.label = add(LABEL_FORMAT)
+        self.header = add(HEADER_FORMAT)
+        self.text = add(TEXT_FORMAT)
+        self.number = add(NUMBER_FORMAT)
+        self.quantity = add(QUANTITY_FORMAT)
+        self.amount = add(AMOUNT_FORMAT)
+        self.total_label = add(TOTAL_LABEL_FORMAT)
+        self.total_amount = add(TOTAL_AMOUNT_FORMAT)
+
+
+def prepare_line_items(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize a works table and compute quantity/amount for every line at once
+
+    Expected columns: work_name, item_description (or description), nos,
+    length, breadth, height, unit, rate; optional location, client, engineer
+    and work_id (groups works that share a name).
+    """
+    items = df.rename(columns={'description': 'item_description'}).copy()
+    missing = {'work_name', 'item_description', 'rate'} - set(items.columns)
+    if missing:
+        raise ValueError(f"Works table is missing columns: {', '.join(sorted(missing))}")
+    for column in ('nos', 'length', 'breadth', 'height'):
+        if column not in items.columns:
+            items[column] = 1 if column == 'nos' else 0
+    if 'unit' not in items.columns:
+        items['unit'] = ''
+    if 'work_id' not in items.columns:
+        items['work_id'] = items['work_name']
+    for column, default in WORK_DEFAULTS.items():
+        items[column] = items[column].fillna(default) if column in items.columns else default
+
+    items['quantity'] = nlbh_quantities(items['nos'], items['length'], items['breadth'], items['height'])
+    items['rate'] = pd.to_numeric(items['rate'], errors='coerce').fillna(0.0)
+    items['amount'] = items['quantity'] * items['rate']
+    return items
+
+
+def group_works(items: pd.DataFrame) -> List[Tuple[Dict, Dict[str, list]]]:
+    """
+    (work details, {column: values}) per work, in first-appearance order
+
+    Columns are converted to arrays once and sliced per work, so the
+    per-estimate cost does not include any DataFrame indexing.
+    """
+    codes, uniques = pd.factorize(items['work_id'], sort=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    items = items.assign(item_description=items['item_description'].astype(str),
+                         unit=items['unit'].fillna('').astype(str))
+    columns = {column: items[column].to_numpy() for column in LINE_COLUMNS}
+    names = items['work_name'].astype(str).to_numpy()
+    details = {column: items[column].astype(str).to_numpy() for column in WORK_DEFAULTS}
+
+    works = []
+    for group in range(len(uniques)):
+        rows = order[bounds[group]:bounds[group + 1]]
+        first = rows[0]
+        work = {'work_name': names[first]}
+        work.update({column: values[first] for column, values in details.items()})
+        works.append((work, {column: values[rows].tolist() for column, values in columns.items()}))
+    return works
+
+
+def _cell(value):
+    """Plain Python value for xlsxwriter (NaN becomes blank)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def write_estimate_workbook(output_path: str, work: Mapping, lines: Mapping[str, Sequence],
+                            date_text: Optional[str] = None) -> Dict:
+    """
+    Write one estimate and return its totals
+
+    lines maps LINE_COLUMNS to per-line values (see group_works). Estimates
+    are small, so the workbook is assembled in memory rather than through
+    per-sheet temp files.
+    """
+    workbook = xlsxwriter.Workbook(output_path, {'in_memory': True, 'nan_inf_to_errors': True})
+    try:
+        fmt = EstimateFormats(workbook)
+        descriptions, units, rates = lines['item_description'], lines['unit'], lines['rate']
+        n = len(descriptions)
+        quantities = [round(float(q), 3) for q in lines['quantity']]
+        amounts = [round(float(a), 2) for a in lines['amount']]
+        total = float(sum(lines['amount']))
+
+        # Technical Report
+        ws = workbook.add_worksheet("Technical Report")
+        ws.merge_range(0, 0, 0, 5, f"ESTIMATE FOR {work['work_name'].upper()}", fmt.title)
+        details = [("Name of Work", work['work_name']), ("Location", work['location']),
+                   ("Client", work['client']), ("Engineer", work['engineer']),
+                   ("Date", date_text or datetime.now().strftime('%d-%m-%Y'))]
+        for row, (label, value) in enumerate(details, start=2):
+            ws.write_string(row, 0, label, fmt.label)
+            ws.write_string(row, 1, ":")
+            ws.merge_range(row, 2, row, 5, str(value))
+
+        # Measurements
+        ws = workbook.add_worksheet("Measurements")
+        for col, width in enumerate(MEASUREMENT_WIDTHS):
+            ws.set_column(col, col, width)
+        ws.merge_range(0, 0, 0, 7, "DETAILS OF MEASUREMENTS", fmt.title)
+        ws.write_row(2, 0, MEASUREMENT_HEADERS, fmt.header)
+        dimensions = list(zip(lines['nos'], lines['length'], lines['breadth'], lines['height']))
+        for i in range(n):
+            row = 3 + i
+            ws.write_number(row, 0, i + 1, fmt.text)
+            ws.write_string(row, 1, descriptions[i], fmt.text)
+            for col, value in enumerate(dimensions[i], start=2):
+                ws.write(row, col, _cell(value), fmt.number)
+            ws.write_number(row, 6, quantities[i], fmt.quantity)
+            ws.write_string(row, 7, units[i], fmt.number)
+
+        # Abstract
+        ws = workbook.add_worksheet("Abstract")
+        for col, width in enumerate(ABSTRACT_WIDTHS):
+            ws.set_column(col, col, width)
+        ws.merge_range(0, 0, 0, 5, "ABSTRACT OF COST", fmt.title)
+        ws.write_row(2, 0, ABSTRACT_HEADERS, fmt.header)
+        for i in range(n):
+            row = 3 + i
+            ws.write_number(row, 0, i + 1, fmt.text)
+            ws.write_string(row, 1, descriptions[i], fmt.text)
+            ws.write_number(row, 2, quantities[i], fmt.quantity)
+            ws.write_string(row, 3, units[i], fmt.number)
+            ws.write_number(row, 4, float(rates[i]), fmt.amount)
+            ws.write_number(row, 5, amounts[i], fmt.amount)
+        row = 3 + n
+        ws.write_row(row, 0, ['', 'TOTAL', '', '', ''], fmt.total_label)
+        ws.write_number(row, 5, round(total, 2), fmt.total_amount)
+        ws.merge_range(row + 2, 0, row + 2, 1, "GRAND TOTAL (in words):", fmt.label)
+        ws.merge_range(row + 2, 2, row + 2, 5, f"Rupees {int(total):,} only")
+    finally:
+        workbook.close()
+
+    return {'items': n, 'total_quantity': float(sum(lines['quantity'])), 'total_amount': total}
+
+
+def estimate_file_name(index: int, work_name: str) -> str:
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', work_name).strip('_')[:60] or 'Work'
+    return f"Estimate_{index:04d}_{slug}.xlsx"
+
+
+def _write_one(task: Tuple) -> Dict:
+    """Worker: write one estimate and report its manifest row"""
+    output_path, work, lines, date_text = task
+    entry = {'work_name': work['work_name'], 'file_name': Path(output_path).name,
+             'file_path': str(output_path), 'items': len(lines['quantity']), 'total_amount': 0.0,
+             'status': 'success', 'error': None}
+    try:
+        entry.update(write_estimate_workbook(output_path, work, lines, date_text))
+    except Exception as e:
+        entry.update(status='error', error=str(e))
+    return entry
+
+
+def generate_bulk_estimates(works_df: pd.DataFrame, output_dir: str = "generated_estimates",
+                            workers: Optional[int] = None, chunksize: int = 8) -> pd.DataFrame:
+    """
+    One estimate workbook per work in works_df, written by a process pool
+
+    Returns a manifest DataFrame with each file's path, line count, total
+    amount and status, in the order the works appear in the input.
+    """
+    items = prepare_line_items(works_df)
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    date_text = datetime.now().strftime('%d-%m-%Y')
+    tasks = [(str(output / estimate_file_name(index, work['work_name'])), work, lines, date_text)
+             for index, (work, lines) in enumerate(group_works(items), start=1)]
+
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        entries = [_write_one(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            entries = list(pool.map(_write_one, tasks, chunksize=chunksize))
+    return pd.DataFrame(entries, columns=MANIFEST_COLUMNS)
+
+
+def synthetic_works(n_estimates: int, lines_per_estimate: int = 5, seed: int = 0) -> pd.DataFrame:
+    """Works table with n_estimates works for benchmarks and tests"""
+    rng = np.random.default_rng(seed)
+    n = n_estimates * lines_per_estimate
+    return pd.DataFrame({
+        'work_name': np.repeat([f"Small Work {i + 1}" for i in range(n_estimates)], lines_per_estimate),
+        'item_description': [f"Item {i % lines_per_estimate + 1}: earth work in excavation" for i in range(n)],
+        'nos': rng.integers(1, 4, n),
+        'length': np.round(rng.uniform(1, 30, n), 2),
+        'breadth': np.round(rng.uniform(0.2, 10, n), 2),
+        'height': np.round(rng.uniform(0, 2, n), 2),
+        'unit': 'Cum',
+        'rate': np.round(rng.uniform(80, 6000, n), 2),
+    })
+
+
+def throughput_report(n_estimates: int = 1000, lines_per_estimate: int = 5,
+                      output_dir: str = "generated_estimates/bulk_benchmark",
+                      workers: Optional[int] = None) -> Dict[str, float]:
+    """Time generate_bulk_estimates for n_estimates works"""
+    works = synthetic_works(n_estimates, lines_per_estimate)
+    start = time.perf_counter()
+    manifest = generate_bulk_estimates(works, output_dir, workers=workers)
+    elapsed = time.perf_counter() - start
+    return {'estimates': len(manifest), 'errors': int((manifest['status'] != 'success').sum()),
+            'seconds': elapsed, 'estimates_per_second': len(manifest) / elapsed if elapsed else 0.0}
+
+
+if __name__ == "__main__":
+    import sys
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    report = throughput_report(count)
+    print(f"{report['estimates']} estimates in {report['seconds']:.2f}s "
+          f"({report['estimates_per_second']:.1f}/s, {report['errors']} errors)")
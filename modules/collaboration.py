@@ -10,6 +10,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, List, Optional
 
+from modules.event_logger import get_event_logger
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -179,41 +181,33 @@ class CollaborationManager:
             return []
     
     def log_activity(self, user_id: str, project_id: str, action: str, details: str):
-        """Log user activity"""
+        """Log user activity (buffered, written in batches by the event logger)"""
         try:
-            activity = ActivityLog(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                project_id=project_id,
+            get_event_logger(self.database.db_path).log(
                 action=action,
-                details=details
+                entity_type='project',
+                entity_id=project_id,
+                user_id=user_id,
+                details=details,
+                project_id=project_id
             )
             
-            conn = self.database.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO activity_logs (id, user_id, project_id, action, details, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                activity.id, activity.user_id, activity.project_id,
-                activity.action, activity.details, activity.timestamp
-            ))
-            
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Error logging activity: {e}")
     
     def get_project_activity(self, project_id: str, limit: int = 50) -> List[ActivityLog]:
         """Get recent activity for a project"""
         try:
+            # Make buffered events visible to this read
+            get_event_logger(self.database.db_path).flush()
+            
             conn = self.database.get_connection()
             cursor = conn.cursor()
             
             cursor.execute("""
-                SELECT * FROM activity_logs 
+                SELECT CAST(id AS TEXT) AS id, user_id, project_id, action, details,
+                       timestamp, COALESCE(ip_address, '') AS ip_address
+                FROM activity_log 
                 WHERE project_id = ? 
                 ORDER BY timestamp DESC 
                 LIMIT ?
@@ -275,7 +269,7 @@ class CollaborationManager:
             cursor.execute("""
                 SELECT DISTINCT u.id, u.username, u.full_name, u.role, u.last_login
                 FROM users u
-                JOIN activity_logs a ON u.id = a.user_id
+                JOIN activity_log a ON u.id = a.user_id
                 WHERE a.project_id = ? AND u.status = 'active'
                 ORDER BY u.last_login DESC
             """, (project_id,))
@@ -310,7 +304,7 @@ class CollaborationManager:
             cursor.execute("""
                 SELECT DISTINCT p.id, p.name, p.location, p.status, p.created_date, p.total_cost
                 FROM projects p
-                LEFT JOIN activity_logs a ON p.id = a.project_id
+                LEFT JOIN activity_log a ON p.id = a.project_id
                 WHERE p.created_by = ? OR a.user_id = ?
                 ORDER BY p.last_modified DESC
             """, (user_id, user_id))
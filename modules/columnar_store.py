@@ -0,0 +1,208 @@
+"""
+Columnar Store Module
+Parquet export/import of project measurements, abstracts and SSR matches, and
+partitioned Parquet datasets of the project archive for BI tools
+"""
+
+import json
+import logging
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality text columns stored as Arrow dictionaries (categoricals in pandas)
+DICTIONARY_COLUMNS = ('sheet_name', 'unit', 'ssr_code', 'item_code', 'code', 'category',
+                      'sub_category', 'subcategory', 'measurement_type', 'status', 'source')
+PROJECT_TABLES = ('measurements', 'abstracts', 'ssr_matches')
+SSR_MATCH_COLUMNS = ['sheet_name', 'description', 'ssr_code', 'ssr_match_confidence', 'unit', 'rate']
+PROJECT_METADATA_KEY = b'estimator.project'
+
+ARCHIVE_DATASET_QUERY = """
+    SELECT p.category, i.project_id, p.project_name, p.location, p.client_name, p.date_prepared,
+           i.sheet_name, i.row_no, i.item_code, i.description, i.unit, i.quantity, i.rate, i.amount
+    FROM archived_items i
+    JOIN archived_projects p ON p.id = i.project_id
+    WHERE p.status = 'active'
+"""
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is required for Parquet export/import")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _arrow_column(series: pd.Series) -> 'pa.Array':
+    """Arrow array for a column; mixed-type object columns become strings"""
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        return pa.array(series.where(series.isna(), series.astype(str)), type=pa.string(), from_pandas=True)
+
+
+def _is_text(arrow_type) -> bool:
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+
+def frame_to_table(df: pd.DataFrame, metadata: Optional[Mapping[bytes, bytes]] = None) -> 'pa.Table':
+    """Arrow table with DICTIONARY_COLUMNS dictionary-encoded"""
+    _require_pyarrow()
+    arrays, names = [], []
+    for position, name in enumerate(df.columns):
+        array = _arrow_column(df.iloc[:, position])
+        if name in DICTIONARY_COLUMNS and _is_text(array.type):
+            array = pc.dictionary_encode(array)
+        arrays.append(array)
+        names.append(str(name))
+    table = pa.Table.from_arrays(arrays, names=names)
+    return table.replace_schema_metadata(metadata) if metadata else table
+
+
+def stack_sheets(sheets: Mapping[str, pd.DataFrame]) -> pd.DataFrame:
+    """One frame for all sheets, tagged with a leading sheet_name column"""
+    frames = [df.drop(columns='sheet_name', errors='ignore').assign(sheet_name=str(name))
+              for name, df in sheets.items() if df is not None]
+    if not frames:
+        return pd.DataFrame({'sheet_name': pd.Series(dtype=object)})
+    stacked = pd.concat(frames, ignore_index=True, sort=False)
+    return stacked[['sheet_name'] + [c for c in stacked.columns if c != 'sheet_name']]
+
+
+def ssr_matches_from_measurements(measurements: pd.DataFrame) -> pd.DataFrame:
+    """SSR codes and match confidence recorded on stacked measurement rows"""
+    if 'ssr_code' not in measurements.columns:
+        return pd.DataFrame(columns=SSR_MATCH_COLUMNS)
+    codes = measurements['ssr_code']
+    matched = measurements[codes.notna() & (codes.astype(str).str.strip() != '')]
+    return matched.reindex(columns=SSR_MATCH_COLUMNS).reset_index(drop=True)
+
+
+def export_project(output_dir: str, project_info: Mapping, measurements: Mapping[str, pd.DataFrame],
+                   abstracts: Mapping[str, pd.DataFrame], ssr_matches: Optional[pd.DataFrame] = None,
+                   compression: str = 'zstd') -> Dict[str, str]:
+    """
+    Write measurements.parquet, abstracts.parquet and ssr_matches.parquet
+
+    Each file holds every sheet of its kind with a sheet_name column; the
+    project details travel in the Parquet schema metadata. SSR matches
+    default to the ssr_code/ssr_match_confidence columns of the measurements.
+    Returns {table name: file path}.
+    """
+    _require_pyarrow()
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    metadata = {PROJECT_METADATA_KEY: json.dumps(dict(project_info), default=_json_default).encode()}
+
+    stacked_measurements = stack_sheets(measurements)
+    frames = {
+        'measurements': stacked_measurements,
+        'abstracts': stack_sheets(abstracts),
+        'ssr_matches': (ssr_matches if ssr_matches is not None
+                        else ssr_matches_from_measurements(stacked_measurements)),
+    }
+    paths = {}
+    for name, frame in frames.items():
+        table = frame_to_table(frame, metadata)
+        path = output / f"{name}.parquet"
+        dictionary = [c for c in table.column_names if pa.types.is_dictionary(table.schema.field(c).type)]
+        pq.write_table(table, path, compression=compression, use_dictionary=dictionary or False)
+        paths[name] = str(path)
+    logger.info(f"🧱 Exported project to Parquet: {output}")
+    return paths
+
+
+def _decode_dictionaries(table: 'pa.Table') -> 'pa.Table':
+    """Plain string columns in place of dictionary ones"""
+    schema = pa.schema([pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                        for f in table.schema], metadata=table.schema.metadata)
+    return table.cast(schema)
+
+
+def _split_sheets(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    if df.empty or 'sheet_name' not in df.columns:
+        return {}
+    keys = df['sheet_name'].astype(object)
+    return {str(name): group.drop(columns='sheet_name').reset_index(drop=True)
+            for name, group in df.groupby(keys, sort=False)}
+
+
+def import_project(input_dir: str, categorical: bool = False) -> Dict:
+    """
+    Load a project written by export_project
+
+    Columns are converted straight from Arrow buffers; only the split into
+    sheets happens in pandas. With categorical=True the dictionary columns
+    stay pandas categoricals (smaller and faster for analysis).
+    """
+    _require_pyarrow()
+    folder = Path(input_dir)
+    project = {'project_info': {}, 'measurements': {}, 'abstracts': {}, 'ssr_matches': pd.DataFrame()}
+    for name in PROJECT_TABLES:
+        path = folder / f"{name}.parquet"
+        if not path.exists():
+            continue
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        if PROJECT_METADATA_KEY in metadata and not project['project_info']:
+            project['project_info'] = json.loads(metadata[PROJECT_METADATA_KEY])
+        if not categorical:
+            table = _decode_dictionaries(table)
+        df = table.to_pandas()
+        project[name] = df if name == 'ssr_matches' else _split_sheets(df)
+    return project
+
+
+def export_archive_dataset(archive_db_path: str, output_dir: str, category: Optional[str] = None,
+                           compression: str = 'zstd') -> Dict:
+    """
+    Write archived line items as a Parquet dataset partitioned by category
+
+    Covers the whole archive, or one category when given; partitions being
+    written replace any previous export of them.
+    """
+    _require_pyarrow()
+    query, params = ARCHIVE_DATASET_QUERY, []
+    if category:
+        query += " AND p.category = ?"
+        params.append(category)
+    conn = sqlite3.connect(archive_db_path)
+    try:
+        items = pd.read_sql_query(query + " ORDER BY p.category, i.project_id, i.id", conn, params=params)
+    finally:
+        conn.close()
+
+    if items.empty:
+        return {'rows': 0, 'projects': 0, 'categories': [], 'path': str(output_dir)}
+    table = frame_to_table(items)
+    pq.write_to_dataset(table, output_dir, partition_cols=['category'], compression=compression,
+                        existing_data_behavior='delete_matching',
+                        basename_template='items-{i}.parquet')
+    return {'rows': len(items), 'projects': int(items['project_id'].nunique()),
+            'categories': sorted(items['category'].unique().tolist()), 'path': str(output_dir)}
+
+
+def read_archive_dataset(path: str, category: Optional[str] = None) -> pd.DataFrame:
+    """Archived items from a partitioned dataset (only the category's files are read)"""
+    _require_pyarrow()
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    table = dataset.to_table(filter=(ds.field('category') == category) if category else None)
+    return _decode_dictionaries(table).to_pandas()
@@ -293,10 +293,10 @@ class EstimationDatabase:
             return pd.DataFrame()
     
     def backup_database(self, backup_path: str) -> bool:
-        """Create database backup"""
+        """Create database backup with the sqlite3 online backup API"""
         try:
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            from modules.db_maintenance import online_backup
+            online_backup(self.db_path, backup_path)
             return True
         except Exception as e:
             st.error(f"Backup failed: {e}")
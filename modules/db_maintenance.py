@@ -0,0 +1,303 @@
+"""
+Database Maintenance Module
+Online backups, page-level incremental backups and scheduled SQLite upkeep
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Copy this many pages per backup step, then sleep so writers can get in
+DEFAULT_BACKUP_PAGES = 256
+DEFAULT_BACKUP_SLEEP = 0.005
+
+DELTA_MAGIC = b"EFDELTA1"
+_DELTA_HEADER = struct.Struct("<8sIII")  # magic, page_size, page_count, changed_pages
+_PAGE_NO = struct.Struct("<I")
+
+MAINTENANCE_TASKS = ('optimize', 'analyze', 'incremental_vacuum')
+
+
+@dataclass
+class MaintenanceRun:
+    """Outcome of one backup or maintenance task"""
+    task: str
+    db_path: str
+    started_at: str = ""
+    duration_s: float = 0.0
+    bytes_written: int = 0
+    status: str = "ok"
+    detail: str = ""
+
+    def __post_init__(self):
+        if not self.started_at:
+            self.started_at = datetime.now().isoformat()
+
+
+def online_backup(src_path: str, dest_path: str, pages: int = DEFAULT_BACKUP_PAGES,
+                  sleep: float = DEFAULT_BACKUP_SLEEP,
+                  progress: Optional[Callable[[int, int, int], None]] = None) -> int:
+    """Copy a live database with the sqlite3 backup API and return bytes written.
+
+    Pages are copied in steps of ``pages`` with a ``sleep`` between steps, so the
+    source stays available to writers and the copy is always transactionally
+    consistent (unlike a raw file copy of a WAL-mode database).
+    """
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.backup(dst, pages=pages, sleep=sleep, progress=progress)
+    finally:
+        dst.close()
+        src.close()
+    return os.path.getsize(dest_path)
+
+
+def read_page_size(db_file: str) -> int:
+    """Read the page size from a database file header"""
+    with open(db_file, 'rb') as f:
+        header = f.read(18)
+    page_size = struct.unpack(">H", header[16:18])[0]
+    return 65536 if page_size == 1 else page_size
+
+
+def page_hashes(db_file: str) -> Tuple[int, List[str]]:
+    """Return (page_size, per-page digests) for a database file"""
+    page_size = read_page_size(db_file)
+    hashes = []
+    with open(db_file, 'rb') as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            hashes.append(hashlib.blake2b(page, digest_size=16).hexdigest())
+    return page_size, hashes
+
+
+def write_page_delta(snapshot_file: str, previous_hashes: List[str],
+                     delta_path: str) -> Tuple[int, List[str], int]:
+    """Write the pages of ``snapshot_file`` that differ from ``previous_hashes``.
+
+    Returns (bytes_written, snapshot_hashes, changed_pages).
+    """
+    page_size = read_page_size(snapshot_file)
+    hashes = []
+    changed = 0
+    with open(snapshot_file, 'rb') as src, open(delta_path, 'wb') as out:
+        out.write(_DELTA_HEADER.pack(DELTA_MAGIC, page_size, 0, 0))
+        page_no = 0
+        while True:
+            page = src.read(page_size)
+            if not page:
+                break
+            digest = hashlib.blake2b(page, digest_size=16).hexdigest()
+            hashes.append(digest)
+            if page_no >= len(previous_hashes) or previous_hashes[page_no] != digest:
+                out.write(_PAGE_NO.pack(page_no))
+                out.write(page)
+                changed += 1
+            page_no += 1
+        out.seek(0)
+        out.write(_DELTA_HEADER.pack(DELTA_MAGIC, page_size, page_no, changed))
+    return os.path.getsize(delta_path), hashes, changed
+
+
+def apply_page_delta(target_file: str, delta_path: str):
+    """Apply a page delta produced by ``write_page_delta`` to a database file"""
+    with open(delta_path, 'rb') as delta, open(target_file, 'r+b') as target:
+        magic, page_size, page_count, changed = _DELTA_HEADER.unpack(delta.read(_DELTA_HEADER.size))
+        if magic != DELTA_MAGIC:
+            raise ValueError(f"Not a page delta file: {delta_path}")
+        for _ in range(changed):
+            page_no = _PAGE_NO.unpack(delta.read(_PAGE_NO.size))[0]
+            target.seek(page_no * page_size)
+            target.write(delta.read(page_size))
+        target.truncate(page_count * page_size)
+
+
+def enable_incremental_vacuum(db_path: str) -> bool:
+    """Switch a database to ``auto_vacuum=INCREMENTAL`` so freed pages can be reclaimed.
+
+    The mode only takes effect after a ``VACUUM``, which rewrites the file once;
+    databases already in incremental mode are left alone. Returns True if changed.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        logger.info(f"Enabled incremental auto_vacuum for {db_path}")
+        return True
+    finally:
+        conn.close()
+
+
+def run_pragma_task(db_path: str, task: str, vacuum_pages: int = 0) -> MaintenanceRun:
+    """Run ``PRAGMA optimize``, ``ANALYZE`` or ``PRAGMA incremental_vacuum``"""
+    if task not in MAINTENANCE_TASKS:
+        raise ValueError(f"Unknown maintenance task: {task}")
+
+    run = MaintenanceRun(task=task, db_path=db_path)
+    start = time.perf_counter()
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            if task == 'optimize':
+                conn.execute("PRAGMA optimize")
+            elif task == 'analyze':
+                conn.execute("ANALYZE")
+            else:
+                # incremental_vacuum is a no-op unless auto_vacuum=INCREMENTAL
+                auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+                if auto_vacuum != 2:
+                    run.status = "skipped"
+                    run.detail = "auto_vacuum is not INCREMENTAL"
+                else:
+                    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+                    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    run.detail = f"reclaimed {(before - after) * page_size} bytes"
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        run.status = "error"
+        run.detail = str(e)
+        logger.error(f"❌ Maintenance task {task} failed: {e}")
+    run.duration_s = time.perf_counter() - start
+    return run
+
+
+class MaintenanceLog:
+    """Append-only JSONL history of backup and maintenance runs"""
+
+    def __init__(self, log_path: Path, keep_in_memory: int = 200):
+        self.log_path = Path(log_path)
+        self._recent = deque(maxlen=keep_in_memory)
+        self._lock = threading.Lock()
+        if self.log_path.exists():
+            try:
+                with open(self.log_path, encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            self._recent.append(json.loads(line))
+            except Exception as e:
+                logger.warning(f"Could not read maintenance log: {e}")
+
+    def record(self, run: MaintenanceRun):
+        """Persist a run record"""
+        entry = asdict(run)
+        with self._lock:
+            self._recent.append(entry)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        """Return the most recent runs, newest first"""
+        with self._lock:
+            return list(reversed(self._recent))[:limit]
+
+
+class MaintenanceScheduler:
+    """Background thread that runs due backup/maintenance tasks on fixed intervals.
+
+    One scheduler serves every registered database, so a server process needs a
+    single thread no matter how many sessions are open.
+    """
+
+    DEFAULT_INTERVALS = {
+        'incremental_backup': 300,
+        'optimize': 3600,
+        'analyze': 86400,
+        'incremental_vacuum': 86400,
+    }
+
+    def __init__(self, backup_manager, db_path: Optional[str] = None,
+                 intervals: Dict[str, float] = None, tick: float = 5.0):
+        self.backup_manager = backup_manager
+        self.intervals = dict(self.DEFAULT_INTERVALS)
+        if intervals:
+            self.intervals.update(intervals)
+        self.tick = tick
+        self._last_run: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if db_path:
+            self.add_database(db_path)
+
+    def add_database(self, db_path: str):
+        """Schedule maintenance for a database (no-op if already registered)"""
+        db_path = str(Path(db_path).resolve())
+        with self._lock:
+            if db_path not in self._last_run:
+                now = time.monotonic()
+                self._last_run[db_path] = {task: now for task in self.intervals}
+
+    def remove_database(self, db_path: str):
+        with self._lock:
+            self._last_run.pop(str(Path(db_path).resolve()), None)
+
+    @property
+    def databases(self) -> List[str]:
+        with self._lock:
+            return list(self._last_run)
+
+    def run_pending(self) -> List[MaintenanceRun]:
+        """Run every task whose interval has elapsed, one database at a time"""
+        runs = []
+        for db_path in self.databases:
+            if not Path(db_path).exists():
+                # Session databases go away with their session
+                self.remove_database(db_path)
+                continue
+            with self._lock:
+                last_run = self._last_run.get(db_path)
+            if last_run is None:
+                continue
+            for task, interval in self.intervals.items():
+                now = time.monotonic()
+                if interval and now - last_run[task] >= interval:
+                    last_run[task] = now
+                    try:
+                        runs.append(self.backup_manager.run_task(db_path, task))
+                    except Exception as e:
+                        logger.error(f"❌ Scheduled {task} failed for {db_path}: {e}")
+        return runs
+
+    def start(self):
+        """Start the scheduler thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+        self._thread.start()
+        logger.info("Maintenance scheduler started")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the scheduler thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _loop(self):
+        while not self._stop.wait(self.tick):
+            self.run_pending()
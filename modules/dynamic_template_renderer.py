@@ -1,11 +1,59 @@
 """
 Dynamic Template Renderer
 Auto-detects input/output cells from Excel templates and generates UI forms
+
+Templates can be compiled once (input/output map stored in the ``templates``
+table) and then filled for many input sets by patching the input cells
+directly in the sheet XML, without loading the workbook again.
 """
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import hashlib
+import io
+import json
+import math
+import re
+import sqlite3
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
 
+import numpy as np
 import openpyxl
+from openpyxl.utils.datetime import to_excel
+
+from modules.excel_formulas import get_template_evaluator
+
+# Same definition as the templates table created by the main app database
+TEMPLATES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    template_type TEXT,
+    category TEXT,
+    description TEXT,
+    template_data TEXT NOT NULL,
+    template TEXT,
+    rating REAL DEFAULT 0,
+    usage_count INTEGER DEFAULT 0,
+    is_public BOOLEAN DEFAULT 0,
+    created_by TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    input_fields TEXT,
+    output_fields TEXT,
+    formulas TEXT,
+    validation_rules TEXT,
+    version INTEGER DEFAULT 1
+)
+"""
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
 
 
 @dataclass
@@ -22,6 +70,30 @@ class TemplateField:
     formula: Optional[str] = None
 
 
+@dataclass
+class CompiledTemplate:
+    """Input/output map of an analyzed template, keyed by the workbook's content hash"""
+    template_id: str
+    name: str
+    file_path: str
+    input_fields: List[Dict]
+    output_fields: List[Dict]
+    formulas: Dict[str, str]
+    named_ranges: Dict[str, str] = field(default_factory=dict)
+    sheet_parts: Dict[str, str] = field(default_factory=dict)  # sheet name -> zip part
+
+    def summary(self) -> Dict[str, Any]:
+        """Same structure as DynamicTemplateRenderer.analyze_template"""
+        return {
+            'input_fields': self.input_fields,
+            'output_fields': self.output_fields,
+            'formulas': self.formulas,
+            'named_ranges': self.named_ranges,
+            'total_inputs': len(self.input_fields),
+            'total_outputs': len(self.output_fields)
+        }
+
+
 class DynamicTemplateRenderer:
     """Renders Excel templates as dynamic UI forms"""
     
@@ -47,10 +119,14 @@ class DynamicTemplateRenderer:
         """
         try:
             wb = openpyxl.load_workbook(file_path, data_only=False)
-            
+            self.input_fields, self.output_fields = [], []
+            self.formulas, self.named_ranges = {}, {}
+
             # Extract named ranges
             if hasattr(wb, 'defined_names'):
-                for named_range in wb.defined_names.definedName:
+                # openpyxl >= 3.1 keeps defined names in a dict
+                defined = getattr(wb.defined_names, 'definedName', None)
+                for named_range in defined if defined is not None else wb.defined_names.values():
                     self.named_ranges[named_range.name] = str(named_range.value)
             
             # Analyze each sheet
@@ -276,3 +352,252 @@ class DynamicTemplateRenderer:
         wb.close()
         
         return output_path
+
+    def compile_template(self, file_path: str, db_path: str, name: Optional[str] = None) -> CompiledTemplate:
+        """
+        Analyze a template once and store its input/output map in the templates table
+
+        The row id is the SHA-256 of the workbook bytes, so compiling the same
+        file again only reads the stored map.
+
+        Args:
+            file_path: Path to Excel template file
+            db_path: SQLite database holding the templates table
+            name: Display name (defaults to the file name)
+
+        Returns:
+            CompiledTemplate for batch filling
+        """
+        data = Path(file_path).read_bytes()
+        template_id = hashlib.sha256(data).hexdigest()
+
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(TEMPLATES_SCHEMA)
+            row = conn.execute("""
+                SELECT name, template_data, input_fields, output_fields, formulas
+                FROM templates WHERE id = ?
+            """, (template_id,)).fetchone()
+            if row:
+                template_data = json.loads(row[1])
+                return CompiledTemplate(
+                    template_id=template_id,
+                    name=name or row[0],
+                    file_path=str(file_path),
+                    input_fields=json.loads(row[2] or '[]'),
+                    output_fields=json.loads(row[3] or '[]'),
+                    formulas=json.loads(row[4] or '{}'),
+                    named_ranges=template_data.get('named_ranges', {}),
+                    sheet_parts=template_data.get('sheet_parts', {})
+                )
+
+            analysis = self.analyze_template(file_path)
+            if 'error' in analysis:
+                raise ValueError(f"Template analysis failed: {analysis['error']}")
+            # Round-trip through JSON so fresh and stored templates look the same
+            analysis = json.loads(json.dumps(analysis, default=str))
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                sheet_parts = _sheet_parts(zf)
+
+            compiled = CompiledTemplate(
+                template_id=template_id,
+                name=name or Path(file_path).name,
+                file_path=str(file_path),
+                input_fields=analysis['input_fields'],
+                output_fields=analysis['output_fields'],
+                formulas=analysis['formulas'],
+                named_ranges=analysis['named_ranges'],
+                sheet_parts=sheet_parts
+            )
+            now = datetime.now().isoformat()
+            conn.execute("""
+                INSERT INTO templates (id, name, type, template_type, template_data,
+                                       created_at, updated_at, input_fields, output_fields, formulas)
+                VALUES (?, ?, 'excel', 'dynamic', ?, ?, ?, ?, ?, ?)
+            """, (template_id, compiled.name,
+                  json.dumps({'named_ranges': compiled.named_ranges, 'sheet_parts': sheet_parts}),
+                  now, now, json.dumps(compiled.input_fields), json.dumps(compiled.output_fields),
+                  json.dumps(compiled.formulas)))
+            conn.commit()
+            return compiled
+        finally:
+            conn.close()
+
+    def fill_batch(self, compiled: CompiledTemplate, input_sets: Iterable[Dict[str, Any]],
+                   output_dir: str, names: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Write one workbook per input set from a compiled template
+
+        Args:
+            compiled: Result of compile_template
+            input_sets: Dicts keyed by 'Sheet!A1' cell reference or field label
+            output_dir: Folder for the filled workbooks
+            names: Optional file names, one per input set
+
+        Returns:
+            Paths of the written workbooks
+        """
+        filler = TemplateFiller(compiled)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(compiled.name).stem
+
+        paths = []
+        for i, values in enumerate(input_sets):
+            file_name = names[i] if names else f"{stem}_{i + 1:04d}.xlsx"
+            output_path = output_dir / file_name
+            output_path.write_bytes(filler.render(values))
+            paths.append(str(output_path))
+
+        return paths
+
+    def compute_outputs(self, compiled: CompiledTemplate,
+                        input_sets: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Evaluate the output cells for many input sets without Excel
+
+        Args:
+            compiled: Result of compile_template
+            input_sets: Dicts keyed by 'Sheet!A1' cell reference or field label;
+                inputs not supplied keep the template value
+
+        Returns:
+            {'Sheet!A1': array with one value per input set} for every output field
+        """
+        resolve = InputResolver(compiled)
+        resolved = [resolve(values) for values in input_sets]
+        evaluator = get_template_evaluator(compiled.template_id, compiled.file_path)
+        columns = {}
+        for key in sorted({key for values in resolved for key in values}):
+            default = evaluator.model.cells.get(key)
+            columns[key] = [values.get(key, default) for values in resolved]
+
+        targets = [f"{f['sheet_name']}!{f['cell_ref']}" for f in compiled.output_fields]
+        return evaluator.evaluate_batch(columns, targets, size=len(resolved))
+
+
+def _sheet_parts(zf: zipfile.ZipFile) -> Dict[str, str]:
+    """Map sheet names to their worksheet XML parts inside the package"""
+    workbook = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+    rels = ElementTree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{{{PACKAGE_REL_NS}}}Relationship')}
+
+    parts = {}
+    for sheet in workbook.iter(f'{{{MAIN_NS}}}sheet'):
+        target = targets.get(sheet.get(f'{{{REL_NS}}}id'), '')
+        if target.startswith('/'):
+            parts[sheet.get('name')] = target.lstrip('/')
+        elif target:
+            parts[sheet.get('name')] = str(PurePosixPath('xl') / target)
+    return parts
+
+
+def _cell_xml(cell_ref: str, style: str, value: Any) -> str:
+    """SpreadsheetML for one cell holding value, keeping the template's style"""
+    attrs = f'r="{cell_ref}"{style}'
+    if value is None or (isinstance(value, float) and not math.isfinite(value)):
+        return f'<c {attrs}/>'
+    if isinstance(value, bool):
+        return f'<c {attrs} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c {attrs}><v>{value!r}</v></c>'
+    if isinstance(value, (datetime, date, time)):
+        return f'<c {attrs}><v>{to_excel(value)!r}</v></c>'
+    text = escape(str(value))
+    return f'<c {attrs} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _force_recalculation(workbook_xml: str) -> str:
+    """Ask Excel to recalculate formulas on open, since cached results are stale"""
+    if 'fullCalcOnLoad=' in workbook_xml:
+        return workbook_xml
+    if '<calcPr' in workbook_xml:
+        return workbook_xml.replace('<calcPr', '<calcPr fullCalcOnLoad="1"', 1)
+    for anchor in ('</definedNames>', '</externalReferences>', '</sheets>'):
+        if anchor in workbook_xml:
+            return workbook_xml.replace(anchor, anchor + '<calcPr fullCalcOnLoad="1"/>', 1)
+    return workbook_xml
+
+
+class InputResolver:
+    """Maps input-set keys ('Sheet!A1' or a unique field label) to cell refs"""
+
+    def __init__(self, compiled: CompiledTemplate):
+        keys_by_label: Dict[str, List[str]] = {}
+        for f in compiled.input_fields:
+            keys_by_label.setdefault(f['label'], []).append(f"{f['sheet_name']}!{f['cell_ref']}")
+        self.labels = {label: keys[0] for label, keys in keys_by_label.items() if len(keys) == 1}
+        self.input_keys = {key for keys in keys_by_label.values() for key in keys}
+
+    def __call__(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        resolved = {}
+        for name, value in values.items():
+            key = name if name in self.input_keys else self.labels.get(name)
+            if key is None:
+                raise ValueError(f"Not an input cell or unique input label: {name}")
+            resolved[key] = value
+        return resolved
+
+
+class TemplateFiller:
+    """Fills a compiled template by patching input cells in its sheet XML"""
+
+    def __init__(self, compiled: CompiledTemplate):
+        data = Path(compiled.file_path).read_bytes()
+        if hashlib.sha256(data).hexdigest() != compiled.template_id:
+            raise ValueError(f"{compiled.file_path} has changed since it was compiled")
+
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.entries = {info.filename: (info, zf.read(info)) for info in zf.infolist()}
+
+        self.resolve = InputResolver(compiled)
+        inputs_by_part: Dict[str, List[str]] = {}
+        for f in compiled.input_fields:
+            part = compiled.sheet_parts.get(f['sheet_name'])
+            if part not in self.entries:
+                raise ValueError(f"Sheet '{f['sheet_name']}' not found in {compiled.file_path}")
+            inputs_by_part.setdefault(part, []).append(f['cell_ref'])
+
+        # Each sheet with inputs becomes static chunks around (key, style) slots
+        self.sheets: Dict[str, tuple] = {}
+        sheet_names = {part: sheet for sheet, part in compiled.sheet_parts.items()}
+        for part, cell_refs in inputs_by_part.items():
+            xml = self.entries[part][1].decode('utf-8')
+            spans = []
+            for cell_ref in cell_refs:
+                match = re.search(rf'<c\b[^>]*?\br="{cell_ref}"[^>]*?(?:/>|>.*?</c>)', xml, re.DOTALL)
+                if not match:
+                    raise ValueError(f"Cell {sheet_names[part]}!{cell_ref} not found in sheet XML")
+                opening = match.group(0).split('>', 1)[0]
+                style = re.search(r'\ss="\d+"', opening)
+                spans.append((match.start(), match.end(), f"{sheet_names[part]}!{cell_ref}",
+                               cell_ref, style.group(0) if style else '', match.group(0)))
+            spans.sort()
+            chunks, slots, pos = [], [], 0
+            for start, end, key, cell_ref, style, original in spans:
+                chunks.append(xml[pos:start])
+                slots.append((key, cell_ref, style, original))
+                pos = end
+            chunks.append(xml[pos:])
+            self.sheets[part] = (chunks, slots)
+
+        if 'xl/workbook.xml' in self.entries:
+            info, workbook_xml = self.entries['xl/workbook.xml']
+            patched = _force_recalculation(workbook_xml.decode('utf-8')).encode('utf-8')
+            self.entries['xl/workbook.xml'] = (info, patched)
+
+    def render(self, values: Dict[str, Any]) -> bytes:
+        """Workbook bytes with the given input values; inputs not supplied keep the template value"""
+        values = self.resolve(values)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as out:
+            for name, (info, data) in self.entries.items():
+                if name in self.sheets:
+                    chunks, slots = self.sheets[name]
+                    pieces = [chunks[0]]
+                    for (key, cell_ref, style, original), chunk in zip(slots, chunks[1:]):
+                        pieces.append(_cell_xml(cell_ref, style, values[key]) if key in values else original)
+                        pieces.append(chunk)
+                    data = ''.join(pieces).encode('utf-8')
+                out.writestr(info, data)
+        return buffer.getvalue()
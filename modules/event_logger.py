@@ -0,0 +1,208 @@
+"""
+Event Logger Module
+Buffered, append-only activity and audit logging with a background flusher
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_LOG_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS activity_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        action TEXT NOT NULL,
+        entity_type TEXT NOT NULL,
+        entity_id TEXT,
+        details TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        timestamp TEXT,
+        project_id TEXT
+    )
+"""
+
+ACTIVITY_LOG_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_activity_log_project_id ON activity_log(project_id)",
+    "CREATE INDEX IF NOT EXISTS idx_activity_log_timestamp ON activity_log(timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_activity_log_user_id ON activity_log(user_id)",
+]
+
+_INSERT_SQL = """
+    INSERT INTO activity_log (user_id, action, entity_type, entity_id, details,
+                              ip_address, user_agent, timestamp, project_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class EventLogger:
+    """Append-only event log backed by an in-memory ring buffer.
+
+    ``log`` never touches the database: events are queued and a background
+    thread batch-inserts them every ``batch_size`` events or
+    ``flush_interval_ms`` milliseconds, whichever comes first. When the buffer
+    is full the calling thread flushes inline instead of dropping events; those
+    stalls are counted in ``metrics()`` so callers can see the backpressure.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 200, flush_interval_ms: int = 500,
+                 capacity: int = 10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.capacity = capacity
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.stats = {
+            'enqueued': 0,
+            'backpressure_flushes': 0,
+            'dropped': 0,
+            'flushed': 0,
+            'flush_count': 0,
+            'flush_errors': 0,
+            'last_flush_ms': 0.0,
+            'max_queue_depth': 0
+        }
+
+        self._ensure_schema()
+        self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+        self._thread.start()
+
+    def _ensure_schema(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(ACTIVITY_LOG_SCHEMA)
+            for index_sql in ACTIVITY_LOG_INDEXES:
+                conn.execute(index_sql)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def log(self, action: str, entity_type: str, entity_id: str = None, user_id: str = None,
+            details: str = None, project_id: str = None, ip_address: str = None,
+            user_agent: str = None) -> bool:
+        """Queue an event; returns False if the logger is closed"""
+        event = (user_id, action, entity_type, entity_id, details, ip_address,
+                 user_agent, datetime.now().isoformat(), project_id)
+        with self._cond:
+            if self._closed:
+                return False
+            full = len(self._buffer) >= self.capacity
+        if full:
+            self.stats['backpressure_flushes'] += 1
+            self.flush()
+        with self._cond:
+            self._buffer.append(event)
+            self.stats['enqueued'] += 1
+            depth = len(self._buffer)
+            if depth > self.stats['max_queue_depth']:
+                self.stats['max_queue_depth'] = depth
+            if depth >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def flush(self) -> int:
+        """Write all buffered events in one transaction; returns rows written"""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._buffer)
+                self._buffer.clear()
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=30)
+                try:
+                    with conn:
+                        conn.executemany(_INSERT_SQL, batch)
+                finally:
+                    conn.close()
+            except Exception as e:
+                # Put the batch back in front so it is retried on the next flush;
+                # only events beyond capacity are dropped
+                with self._cond:
+                    room = max(0, self.capacity - len(self._buffer))
+                    keep = batch[len(batch) - room:] if room < len(batch) else batch
+                    self.stats['dropped'] += len(batch) - len(keep)
+                    self._buffer.extendleft(reversed(keep))
+                    self.stats['flush_errors'] += 1
+                logger.error(f"❌ Event log flush failed: {e}")
+                return 0
+
+            self.stats['flushed'] += len(batch)
+            self.stats['flush_count'] += 1
+            self.stats['last_flush_ms'] = (time.perf_counter() - start) * 1000
+            return len(batch)
+
+    def metrics(self) -> Dict:
+        """Backpressure and throughput metrics"""
+        with self._cond:
+            depth = len(self._buffer)
+            metrics = dict(self.stats)
+        metrics.update({
+            'queue_depth': depth,
+            'capacity': self.capacity,
+            'fill_ratio': depth / self.capacity if self.capacity else 0.0,
+            'running': self._thread.is_alive()
+        })
+        return metrics
+
+    def close(self, timeout: float = 10.0):
+        """Stop the flusher and write everything still buffered"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                break
+
+
+_loggers: Dict[str, EventLogger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_event_logger(db_path: str) -> EventLogger:
+    """Shared EventLogger for a database path"""
+    with _loggers_lock:
+        event_logger = _loggers.get(db_path)
+        if event_logger is None or event_logger._closed:
+            event_logger = EventLogger(db_path)
+            _loggers[db_path] = event_logger
+        return event_logger
+
+
+def shutdown_event_loggers(timeout: Optional[float] = 10.0):
+    """Flush and close every shared EventLogger"""
+    with _loggers_lock:
+        event_loggers = list(_loggers.values())
+        _loggers.clear()
+    for event_logger in event_loggers:
+        try:
+            event_logger.close(timeout)
+        except Exception as e:
+            logger.error(f"❌ Error closing event logger for {event_logger.db_path}: {e}")
+
+
+atexit.register(shutdown_event_loggers)
@@ -1,16 +1,41 @@
 """
 Excel Structure Analyzer Module
 Analyzes Excel files to help debug import issues and understand structure
+
+fingerprint_file reads only the package parts (workbook, styles, shared
+strings header and a streamed pass over each sheet) to classify a file in
+milliseconds; analyze_file does the full openpyxl walk on demand.
 """
-from pathlib import Path
+import re
+import time
+import zipfile
+from collections import Counter
+from pathlib import Path, PurePosixPath
 from typing import Any, Dict, List
+from xml.etree import ElementTree
 
 import openpyxl
+from openpyxl.utils.cell import range_boundaries
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_FORMULA_RE = re.compile(rb'<f[\s>/]')
+_CELL_STYLE_RE = re.compile(rb'<c\b[^>]*?\ss="(\d+)"')
+_DIMENSION_RE = re.compile(rb'<dimension\s+ref="([^"]+)"')
+_MERGE_COUNT_RE = re.compile(rb'<mergeCells\s+count="(\d+)"')
+_SST_COUNT_RE = re.compile(rb'uniqueCount="(\d+)"')
+SCAN_CHUNK = 1 << 20
 
 
 class ExcelAnalyzer:
     """Analyzes Excel file structure for debugging and validation"""
     
+    # Fill colours marking template inputs (yellow) and outputs (green)
+    YELLOW_FILLS = ['FFFFFF00', 'FFFF00', 'FFFF0000']
+    GREEN_FILLS = ['FF90EE90', '90EE90', 'FF00FF00']
+    
     def __init__(self):
         self.analysis_results = {}
     
@@ -39,10 +64,13 @@ class ExcelAnalyzer:
                 'summary': {}
             }
             
-            # Check for named ranges
-            if hasattr(wb, 'defined_names') and wb.defined_names.definedName:
-                analysis['has_named_ranges'] = True
-                analysis['named_ranges'] = [nr.name for nr in wb.defined_names.definedName]
+            # Check for named ranges (openpyxl >= 3.1 keeps them in a dict)
+            if hasattr(wb, 'defined_names'):
+                defined = getattr(wb.defined_names, 'definedName', None)
+                names = [nr.name for nr in defined] if defined is not None else list(wb.defined_names)
+                if names:
+                    analysis['has_named_ranges'] = True
+                    analysis['named_ranges'] = names
             
             # Analyze each sheet
             for sheet_name in wb.sheetnames:
@@ -109,13 +137,13 @@ class ExcelAnalyzer:
                 if cell.fill and cell.fill.start_color:
                     color = cell.fill.start_color.rgb
                     if color and color != '00000000':
-                        if color in ['FFFFFF00', 'FFFF00', 'FFFF0000']:  # Yellow
+                        if color in self.YELLOW_FILLS:
                             analysis['colored_cells'].append({
                                 'cell': f"{cell.column_letter}{cell.row}",
                                 'color': 'yellow',
                                 'value': str(cell.value)[:30] if cell.value else ''
                             })
-                        elif color in ['FF90EE90', '90EE90', 'FF00FF00']:  # Green
+                        elif color in self.GREEN_FILLS:
                             analysis['colored_cells'].append({
                                 'cell': f"{cell.column_letter}{cell.row}",
                                 'color': 'green',
@@ -149,9 +177,22 @@ class ExcelAnalyzer:
         total_formulas = sum(s['formula_count'] for s in analysis['sheets'].values())
         total_colored = sum(len(s['colored_cells']) for s in analysis['sheets'].values())
         
-        # Detect likely sheet types
+        return {
+            'total_data_rows': total_data_rows,
+            'total_formulas': total_formulas,
+            'total_colored_cells': total_colored,
+            'sheet_types': self._sheet_types(analysis['sheet_names']),
+            'is_template': total_colored > 0,
+            'is_estimate': any('meas' in s.lower() or 'abs' in s.lower() 
+                              for s in analysis['sheet_names']),
+            'complexity': self._complexity(total_formulas)
+        }
+    
+    @staticmethod
+    def _sheet_types(sheet_names: List[str]) -> Dict[str, str]:
+        """Detect likely sheet types from sheet names"""
         sheet_types = {}
-        for name, sheet in analysis['sheets'].items():
+        for name in sheet_names:
             if 'meas' in name.lower() or 'measurement' in name.lower():
                 sheet_types[name] = 'Measurement Sheet'
             elif 'abs' in name.lower() or 'abstract' in name.lower():
@@ -162,17 +203,11 @@ class ExcelAnalyzer:
                 sheet_types[name] = 'General Abstract'
             else:
                 sheet_types[name] = 'Data Sheet'
-        
-        return {
-            'total_data_rows': total_data_rows,
-            'total_formulas': total_formulas,
-            'total_colored_cells': total_colored,
-            'sheet_types': sheet_types,
-            'is_template': total_colored > 0,
-            'is_estimate': any('meas' in s.lower() or 'abs' in s.lower() 
-                              for s in analysis['sheet_names']),
-            'complexity': 'High' if total_formulas > 100 else 'Medium' if total_formulas > 20 else 'Low'
-        }
+        return sheet_types
+    
+    @staticmethod
+    def _complexity(total_formulas: int) -> str:
+        return 'High' if total_formulas > 100 else 'Medium' if total_formulas > 20 else 'Low'
     
     def get_import_recommendations(self, analysis: Dict) -> List[str]:
         """Generate recommendations for importing the file"""
@@ -220,3 +255,209 @@ class ExcelAnalyzer:
             recommendations.append("💡 Use 'Auto-detect' import mode")
         
         return recommendations
+
+    def get_import_mode(self, analysis: Dict) -> str:
+        """Import mode suggested by get_import_recommendations, as a single label"""
+        summary = analysis.get('summary', {})
+        if analysis.get('error'):
+            return 'Error'
+        if summary.get('is_template'):
+            return 'Dynamic Template'
+        if summary.get('is_estimate'):
+            return 'Standard Estimate'
+        return 'Auto-detect'
+    
+    def fingerprint_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        Quick structural fingerprint read straight from the .xlsx package
+        
+        Reads workbook.xml, the style fill table, the sharedStrings header and
+        streams each worksheet once for its <dimension>, <f> elements and cells
+        using yellow/green fills. No cell objects are created.
+        
+        Args:
+            file_path: Path to Excel file
+            
+        Returns:
+            Dictionary with the same summary keys as analyze_file (except
+            total_data_rows) plus the suggested 'import_mode'
+        """
+        start = time.perf_counter()
+        try:
+            with zipfile.ZipFile(file_path) as zf:
+                sheet_parts, named_ranges = self._workbook_parts(zf)
+                colored_styles = self._colored_styles(zf)
+                shared_strings = self._shared_string_count(zf)
+                
+                sheets = {}
+                for sheet_name, part in sheet_parts.items():
+                    sheets[sheet_name] = self._fingerprint_sheet(zf, part, sheet_name, colored_styles)
+            
+            analysis = {
+                'mode': 'fingerprint',
+                'file_name': Path(file_path).name,
+                'file_size': Path(file_path).stat().st_size,
+                'total_sheets': len(sheet_parts),
+                'sheet_names': list(sheet_parts),
+                'sheets': sheets,
+                'has_formulas': any(s['has_formulas'] for s in sheets.values()),
+                'has_named_ranges': bool(named_ranges),
+                'named_ranges': named_ranges,
+                'has_data_validation': any(s['has_data_validation'] for s in sheets.values()),
+                'shared_strings': shared_strings,
+            }
+            
+            total_formulas = sum(s['formula_count'] for s in sheets.values())
+            total_colored = sum(s['yellow_cells'] + s['green_cells'] for s in sheets.values())
+            analysis['summary'] = {
+                'total_formulas': total_formulas,
+                'total_colored_cells': total_colored,
+                'sheet_types': self._sheet_types(analysis['sheet_names']),
+                'is_template': total_colored > 0,
+                'is_estimate': any('meas' in s.lower() or 'abs' in s.lower()
+                                  for s in analysis['sheet_names']),
+                'complexity': self._complexity(total_formulas)
+            }
+            analysis['import_mode'] = self.get_import_mode(analysis)
+            
+        except Exception as e:
+            analysis = {
+                'mode': 'fingerprint',
+                'error': str(e),
+                'file_name': Path(file_path).name
+            }
+        
+        analysis['seconds'] = time.perf_counter() - start
+        return analysis
+    
+    def triage(self, file_paths: List[str], full: bool = False) -> List[Dict[str, Any]]:
+        """
+        Classify many files; full=True adds the complete analysis for each
+        
+        Returns:
+            One row per file: name, import mode, sheets, formulas, colored cells
+        """
+        rows = []
+        for file_path in file_paths:
+            analysis = self.analyze_file(file_path) if full else self.fingerprint_file(file_path)
+            summary = analysis.get('summary', {})
+            rows.append({
+                'file': str(file_path),
+                'import_mode': self.get_import_mode(analysis),
+                'sheets': analysis.get('total_sheets', 0),
+                'formulas': summary.get('total_formulas', 0),
+                'colored_cells': summary.get('total_colored_cells', 0),
+                'complexity': summary.get('complexity', ''),
+                'error': analysis.get('error', '')
+            })
+        return rows
+    
+    @staticmethod
+    def _workbook_parts(zf: zipfile.ZipFile):
+        """Sheet name -> worksheet part, and defined names, from workbook.xml"""
+        workbook = ElementTree.fromstring(zf.read('xl/workbook.xml'))
+        rels = ElementTree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target')
+                   for rel in rels.iter(f'{{{PACKAGE_REL_NS}}}Relationship')}
+        
+        parts = {}
+        for sheet in workbook.iter(f'{{{MAIN_NS}}}sheet'):
+            target = targets.get(sheet.get(f'{{{REL_NS}}}id'), '')
+            part = target.lstrip('/') if target.startswith('/') else str(PurePosixPath('xl') / target)
+            parts[sheet.get('name')] = part
+        
+        named_ranges = [dn.get('name') for dn in workbook.iter(f'{{{MAIN_NS}}}definedName')]
+        return parts, named_ranges
+    
+    def _colored_styles(self, zf: zipfile.ZipFile) -> Dict[int, str]:
+        """Cell style (xf) index -> 'yellow' / 'green' for template fills"""
+        if 'xl/styles.xml' not in zf.namelist():
+            return {}
+        styles = ElementTree.fromstring(zf.read('xl/styles.xml'))
+        
+        fill_colors = []
+        fills = styles.find(f'{{{MAIN_NS}}}fills')
+        for fill in (fills if fills is not None else []):
+            fg = fill.find(f'{{{MAIN_NS}}}patternFill/{{{MAIN_NS}}}fgColor')
+            rgb = (fg.get('rgb') or '').upper() if fg is not None else ''
+            if rgb in self.YELLOW_FILLS:
+                fill_colors.append('yellow')
+            elif rgb in self.GREEN_FILLS:
+                fill_colors.append('green')
+            else:
+                fill_colors.append(None)
+        
+        colored = {}
+        cell_xfs = styles.find(f'{{{MAIN_NS}}}cellXfs')
+        for index, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            fill_id = int(xf.get('fillId', 0))
+            if fill_id < len(fill_colors) and fill_colors[fill_id]:
+                colored[index] = fill_colors[fill_id]
+        return colored
+    
+    @staticmethod
+    def _shared_string_count(zf: zipfile.ZipFile) -> int:
+        if 'xl/sharedStrings.xml' not in zf.namelist():
+            return 0
+        with zf.open('xl/sharedStrings.xml') as f:
+            match = _SST_COUNT_RE.search(f.read(512))
+        return int(match.group(1)) if match else 0
+    
+    @staticmethod
+    def _fingerprint_sheet(zf: zipfile.ZipFile, part: str, sheet_name: str,
+                           colored_styles: Dict[int, str]) -> Dict[str, Any]:
+        """Stream one worksheet part, counting formulas and template-coloured cells"""
+        analysis = {
+            'name': sheet_name,
+            'dimensions': 'unknown',
+            'max_row': None,
+            'max_column': None,
+            'has_formulas': False,
+            'has_data_validation': False,
+            'formula_count': 0,
+            'merged_cells': 0,
+            'yellow_cells': 0,
+            'green_cells': 0
+        }
+        if part not in zf.namelist() or 'worksheets/' not in part:
+            return analysis  # chart sheets and missing parts have no cells
+        
+        styles = Counter()
+        head = True
+        tail = b''
+        with zf.open(part) as f:
+            while True:
+                chunk = f.read(SCAN_CHUNK)
+                data = tail + chunk
+                # Keep a trailing partial tag for the next chunk
+                cut = data.rfind(b'<') if chunk else len(data)
+                block, tail = (data[:cut], data[cut:]) if cut > 0 else (data, b'')
+                
+                if head:
+                    dimension = _DIMENSION_RE.search(block)
+                    if dimension:
+                        ref = dimension.group(1).decode()
+                        min_col, min_row, max_col, max_row = range_boundaries(
+                            ref if ':' in ref else f"{ref}:{ref}")
+                        analysis['max_row'], analysis['max_column'] = max_row, max_col
+                        analysis['dimensions'] = f"{max_row} rows × {max_col} columns"
+                    head = False
+                
+                analysis['formula_count'] += len(_FORMULA_RE.findall(block))
+                if colored_styles:
+                    styles.update(_CELL_STYLE_RE.findall(block))
+                if b'<dataValidation ' in block:
+                    analysis['has_data_validation'] = True
+                merged = _MERGE_COUNT_RE.search(block)
+                if merged:
+                    analysis['merged_cells'] = int(merged.group(1))
+                
+                if not chunk:
+                    break
+        
+        analysis['has_formulas'] = analysis['formula_count'] > 0
+        for style, count in styles.items():
+            color = colored_styles.get(int(style))
+            if color:
+                analysis[f'{color}_cells'] += count
+        return analysis
@@ -0,0 +1,571 @@
+"""
+Excel Formulas Module
+In-process evaluation of the Excel formula subset used in estimate templates
+
+Supports arithmetic (+ - * / ^ %), comparisons, '&', SUM, ROUND, IF, MIN, MAX,
+PRODUCT and a few related functions, same-sheet and cross-sheet references,
+ranges and named ranges. Formulas are parsed once into small ASTs, compiled
+to closures and evaluated in dependency order; every value may be a scalar
+or a NumPy array, so thousands of input sets evaluate in one pass.
+"""
+
+import math
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache, reduce
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from openpyxl.utils.cell import get_column_letter, range_boundaries
+
+from modules.formula_engine import FormulaError
+
+MAX_RANGE_CELLS = 100_000
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<sheetref>(?:'(?:[^']|'')+'|[A-Za-z_][\w.]*)!\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?)(?![\w(])
+  | (?P<func>[A-Za-z_][\w.]*)(?=\s*\()
+  | (?P<bool>TRUE|FALSE)(?![\w(])
+  | (?P<ref>\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?)(?![\w(])
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_\\][\w.]*)
+  | (?P<op><=|>=|<>|[-+*/^&=<>%(),])
+""", re.VERBOSE | re.IGNORECASE)
+
+_COMPARISONS = ('=', '<>', '<', '>', '<=', '>=')
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise FormulaError(f"Unsupported syntax at '{text[pos:pos + 10]}' in ={text}")
+        pos = match.end()
+        if match.lastgroup != 'ws':
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+    return tokens
+
+
+def _split_ref(text: str, sheet: Optional[str]) -> Tuple[Optional[str], str]:
+    """('Sheet', 'A1:B2') from "'Sheet'!$A$1:$B$2" or a bare reference"""
+    if '!' in text:
+        sheet, text = text.rsplit('!', 1)
+        if sheet.startswith("'"):
+            sheet = sheet[1:-1].replace("''", "'")
+    return sheet, text.replace('$', '').upper()
+
+
+class _Parser:
+    """Recursive descent parser producing tuple ASTs"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value: Optional[str] = None) -> Tuple[str, str]:
+        kind, token = self.peek()
+        if kind is None or (value is not None and token != value):
+            raise FormulaError(f"Expected '{value or 'value'}' in ={self.text}")
+        self.pos += 1
+        return kind, token
+
+    def parse(self):
+        node = self.comparison()
+        if self.pos != len(self.tokens):
+            raise FormulaError(f"Unexpected '{self.peek()[1]}' in ={self.text}")
+        return node
+
+    def _binary(self, operators, operand):
+        node = operand()
+        while self.peek()[0] == 'op' and self.peek()[1] in operators:
+            op = self.take()[1]
+            node = ('binop', op, node, operand())
+        return node
+
+    def comparison(self):
+        return self._binary(_COMPARISONS, self.concat)
+
+    def concat(self):
+        return self._binary(('&',), self.additive)
+
+    def additive(self):
+        return self._binary(('+', '-'), self.multiplicative)
+
+    def multiplicative(self):
+        return self._binary(('*', '/'), self.power)
+
+    def power(self):
+        # Excel evaluates 2^3^2 left to right
+        return self._binary(('^',), self.percent)
+
+    def percent(self):
+        node = self.unary()
+        while self.peek() == ('op', '%'):
+            self.take()
+            node = ('binop', '/', node, ('const', 100.0))
+        return node
+
+    def unary(self):
+        # Negation binds tighter than '^' in Excel: -2^2 = 4
+        if self.peek() == ('op', '-'):
+            self.take()
+            return ('neg', self.unary())
+        if self.peek() == ('op', '+'):
+            self.take()
+            return self.unary()
+        return self.primary()
+
+    def primary(self):
+        kind, token = self.take()
+        if kind == 'number':
+            return ('const', float(token))
+        if kind == 'string':
+            return ('const', token[1:-1].replace('""', '"'))
+        if kind == 'bool':
+            return ('const', token.upper() == 'TRUE')
+        if kind in ('ref', 'sheetref'):
+            sheet, ref = _split_ref(token, None)
+            return ('range' if ':' in ref else 'ref', sheet, ref)
+        if kind == 'name':
+            return ('name', token)
+        if kind == 'func':
+            name = token.upper()
+            if name.startswith('_XLFN.'):
+                name = name[len('_XLFN.'):]
+            self.take('(')
+            args = []
+            if self.peek() != ('op', ')'):
+                args.append(self.comparison())
+                while self.peek() == ('op', ','):
+                    self.take()
+                    args.append(self.comparison())
+            self.take(')')
+            return ('call', name, tuple(args))
+        if (kind, token) == ('op', '('):
+            node = self.comparison()
+            self.take(')')
+            return node
+        raise FormulaError(f"Unexpected '{token}' in ={self.text}")
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(text: str):
+    """AST of an Excel formula (leading '=' optional); cached by formula text"""
+    text = str(text).strip()
+    if text.startswith('='):
+        text = text[1:]
+    if not text:
+        raise FormulaError("Empty formula")
+    return _Parser(text).parse()
+
+
+# ---------------------------------------------------------------------------
+# Value helpers: every value is a scalar (float, str, bool, None) or an ndarray
+# ---------------------------------------------------------------------------
+
+def _num(value):
+    """Numeric view of a value; blanks are 0, numeric text is converted"""
+    if value is None:
+        return 0.0
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return np.array([_num(v) for v in value], dtype=np.float64)
+        return value.astype(np.float64, copy=False)
+    if isinstance(value, (bool, np.bool_)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            raise FormulaError(f"#VALUE! (text '{value}' used as a number)")
+    return value
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, np.ndarray):
+        return np.array([_text(v) for v in value], dtype=object)
+    if isinstance(value, (bool, np.bool_)):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _is_text(value) -> bool:
+    if isinstance(value, np.ndarray):
+        return value.dtype == object and any(isinstance(v, str) for v in value)
+    return isinstance(value, str)
+
+
+def _excel_round(value, digits, mode='half'):
+    """ROUND/ROUNDUP/ROUNDDOWN: away from zero at .5, not banker's rounding"""
+    x = _num(value)
+    factor = np.power(10.0, np.trunc(_num(digits)))
+    scaled = np.round(np.abs(x) * factor, 9)
+    if mode == 'half':
+        scaled = np.floor(scaled + 0.5)
+    elif mode == 'up':
+        scaled = np.ceil(scaled)
+    else:
+        scaled = np.floor(scaled)
+    return np.sign(x) * scaled / factor
+
+
+def _flatten(args, skip_text=True) -> List:
+    """Function arguments with ranges expanded; blanks (and text in ranges) dropped"""
+    values = []
+    for arg in args:
+        if isinstance(arg, list):
+            values.extend(v for v in arg if v is not None and not (skip_text and isinstance(v, str)))
+        elif arg is not None:
+            values.append(arg)
+    return [_num(v) for v in values]
+
+
+def _if(condition, when_true=False, when_false=False):
+    if np.ndim(condition) == 0:
+        return when_true if bool(_num(condition)) else when_false
+    if _is_text(when_true) or _is_text(when_false):
+        return np.where(_num(condition) != 0, np.asarray(when_true, dtype=object),
+                        np.asarray(when_false, dtype=object))
+    return np.where(_num(condition) != 0, _num(when_true), _num(when_false))
+
+
+def _min(*args):
+    values = _flatten(args)
+    return reduce(np.minimum, values) if values else 0.0
+
+
+def _max(*args):
+    values = _flatten(args)
+    return reduce(np.maximum, values) if values else 0.0
+
+
+def _average(*args):
+    values = _flatten(args)
+    if not values:
+        raise FormulaError("#DIV/0! (AVERAGE of no values)")
+    return reduce(np.add, values) / len(values)
+
+
+FUNCTIONS: Dict[str, Callable] = {
+    'SUM': lambda *args: reduce(np.add, _flatten(args), 0.0),
+    'PRODUCT': lambda *args: reduce(np.multiply, _flatten(args), 1.0),
+    'MIN': _min,
+    'MAX': _max,
+    'AVERAGE': _average,
+    'ROUND': lambda value, digits=0: _excel_round(value, digits, 'half'),
+    'ROUNDUP': lambda value, digits=0: _excel_round(value, digits, 'up'),
+    'ROUNDDOWN': lambda value, digits=0: _excel_round(value, digits, 'down'),
+    'ABS': lambda value: np.abs(_num(value)),
+    'SQRT': lambda value: np.sqrt(_num(value)),
+    'INT': lambda value: np.floor(_num(value)),
+    'IF': _if,
+    'AND': lambda *args: reduce(np.logical_and, [v != 0 for v in _flatten(args)]),
+    'OR': lambda *args: reduce(np.logical_or, [v != 0 for v in _flatten(args)]),
+    'NOT': lambda value: _num(value) == 0,
+    'PI': lambda: math.pi,
+}
+
+_ARITHMETIC = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+    '^': np.power,
+}
+
+_COMPARE = {
+    '=': np.equal,
+    '<>': np.not_equal,
+    '<': np.less,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+}
+
+
+def _binop(op: str, left, right):
+    if op == '&':
+        left, right = _text(left), _text(right)
+        if isinstance(left, np.ndarray) or isinstance(right, np.ndarray):
+            return np.add(np.asarray(left, dtype=object), np.asarray(right, dtype=object))
+        return left + right
+    if op in _COMPARE:
+        if _is_text(left) or _is_text(right):
+            # Text comparison is case-insensitive in Excel
+            left, right = _lower(left), _lower(right)
+            return _COMPARE[op](np.asarray(left, dtype=object), np.asarray(right, dtype=object))
+        return _COMPARE[op](_num(left), _num(right))
+    return _ARITHMETIC[op](_num(left), _num(right))
+
+
+def _lower(value):
+    text = _text(value)
+    if isinstance(text, np.ndarray):
+        return np.array([t.lower() for t in text], dtype=object)
+    return text.lower()
+
+
+# ---------------------------------------------------------------------------
+# Workbook model and evaluator
+# ---------------------------------------------------------------------------
+
+def cell_key(sheet: str, ref: str) -> str:
+    return f"{sheet}!{ref.replace('$', '').upper()}"
+
+
+def _range_keys(sheet: str, ref: str) -> List[str]:
+    min_col, min_row, max_col, max_row = range_boundaries(ref)
+    if (max_col - min_col + 1) * (max_row - min_row + 1) > MAX_RANGE_CELLS:
+        raise FormulaError(f"Range too large: {sheet}!{ref}")
+    return [f"{sheet}!{get_column_letter(col)}{row}"
+            for row in range(min_row, max_row + 1) for col in range(min_col, max_col + 1)]
+
+
+class WorkbookModel:
+    """Constants and formulas of every non-empty cell, keyed 'Sheet!A1'"""
+
+    def __init__(self, cells: Dict[str, Any], formulas: Dict[str, str],
+                 named_ranges: Optional[Dict[str, str]] = None):
+        self.cells = cells
+        self.formulas = formulas
+        self.named_ranges = {name.upper(): target for name, target in (named_ranges or {}).items()}
+
+    @classmethod
+    def from_workbook(cls, wb) -> 'WorkbookModel':
+        from openpyxl.utils.datetime import to_excel
+        from openpyxl.worksheet.formula import ArrayFormula
+
+        cells, formulas, named_ranges = {}, {}, {}
+        defined = getattr(wb.defined_names, 'definedName', None)
+        for named_range in defined if defined is not None else wb.defined_names.values():
+            named_ranges[named_range.name] = str(named_range.value)
+        for sheet in wb.worksheets:
+            for row in sheet.iter_rows():
+                for cell in row:
+                    value = cell.value
+                    if value is None:
+                        continue
+                    key = f"{sheet.title}!{cell.coordinate}"
+                    if isinstance(value, ArrayFormula):
+                        formulas[key] = value.text
+                    elif cell.data_type == 'f':
+                        formulas[key] = str(value)
+                    elif cell.is_date:
+                        cells[key] = float(to_excel(value))
+                    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                        cells[key] = float(value)
+                    else:
+                        cells[key] = value
+        return cls(cells, formulas, named_ranges)
+
+    @classmethod
+    def from_file(cls, file_path: str) -> 'WorkbookModel':
+        import openpyxl
+
+        wb = openpyxl.load_workbook(file_path, data_only=False)
+        try:
+            return cls.from_workbook(wb)
+        finally:
+            wb.close()
+
+
+class TemplateEvaluator:
+    """Evaluates formula cells of a workbook model for scalar or array inputs"""
+
+    def __init__(self, model: WorkbookModel):
+        self.model = model
+        self._compiled: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+        self._orders: Dict[Tuple, List[str]] = {}
+
+    def _resolve_name(self, name: str, sheet: str):
+        target = self.model.named_ranges.get(name.upper())
+        if target is None:
+            raise FormulaError(f"#NAME? ({name} in {sheet})")
+        node = parse_formula(target)
+        if node[0] not in ('ref', 'range'):
+            raise FormulaError(f"Named range {name} does not refer to cells")
+        return node
+
+    def _compile_node(self, node, sheet: str, deps: List[str]) -> Callable:
+        kind = node[0]
+        if kind == 'const':
+            value = node[1]
+            return lambda env: value
+        if kind == 'name':
+            return self._compile_node(self._resolve_name(node[1], sheet), sheet, deps)
+        if kind == 'ref':
+            key = cell_key(node[1] or sheet, node[2])
+            deps.append(key)
+            return lambda env: env.get(key)
+        if kind == 'range':
+            keys = _range_keys(node[1] or sheet, node[2])
+            deps.extend(keys)
+            return lambda env: [env.get(k) for k in keys]
+        if kind == 'neg':
+            operand = self._compile_node(node[1], sheet, deps)
+            return lambda env: np.negative(_num(operand(env)))
+        if kind == 'binop':
+            op = node[1]
+            left = self._compile_node(node[2], sheet, deps)
+            right = self._compile_node(node[3], sheet, deps)
+            return lambda env: _binop(op, left(env), right(env))
+        if kind == 'call':
+            name = node[1]
+            if name not in FUNCTIONS:
+                raise FormulaError(f"Unsupported function: {name}")
+            func = FUNCTIONS[name]
+            args = [self._compile_node(arg, sheet, deps) for arg in node[2]]
+            if name == 'IF' and args:
+                # Only evaluate the branch that is needed when the condition is a scalar
+                def call_if(env):
+                    condition = args[0](env)
+                    if np.ndim(condition) == 0 and not isinstance(condition, list):
+                        branch = 1 if bool(_num(condition)) else 2
+                        return args[branch](env) if branch < len(args) else False
+                    return func(condition, *[arg(env) for arg in args[1:]])
+                return call_if
+            return lambda env: func(*[arg(env) for arg in args])
+        raise FormulaError(f"Unsupported expression: {kind}")
+
+    def compiled(self, key: str) -> Tuple[Callable, Tuple[str, ...]]:
+        """Compiled closure and precedent cells of a formula cell (cached)"""
+        if key not in self._compiled:
+            sheet = key.rsplit('!', 1)[0]
+            text = self.model.formulas[key]
+            deps: List[str] = []
+            try:
+                func = self._compile_node(parse_formula(text), sheet, deps)
+            except FormulaError as e:
+                raise FormulaError(f"{key}: {e}")
+            self._compiled[key] = (func, tuple(dict.fromkeys(deps)))
+        return self._compiled[key]
+
+    def order(self, targets: Iterable[str], inputs: Iterable[str] = ()) -> List[str]:
+        """Formula cells needed for targets, precedents first (inputs are leaves)"""
+        targets, inputs = tuple(targets), frozenset(inputs)
+        cache_key = (targets, inputs)
+        if cache_key in self._orders:
+            return self._orders[cache_key]
+
+        order, state = [], {}
+        for target in targets:
+            stack = [(target, False)]
+            while stack:
+                key, expanded = stack.pop()
+                if key in inputs or key not in self.model.formulas:
+                    continue
+                if expanded:
+                    state[key] = 'done'
+                    order.append(key)
+                    continue
+                if state.get(key) == 'done':
+                    continue
+                if state.get(key) == 'visiting':
+                    raise FormulaError(f"Circular reference at {key}")
+                state[key] = 'visiting'
+                stack.append((key, True))
+                for dep in self.compiled(key)[1]:
+                    if state.get(dep) == 'visiting' and dep not in inputs and dep in self.model.formulas:
+                        raise FormulaError(f"Circular reference at {dep}")
+                    if state.get(dep) != 'done':
+                        stack.append((dep, False))
+
+        self._orders[cache_key] = order
+        return order
+
+    def evaluate(self, inputs: Mapping[str, Any], targets: Iterable[str]) -> Dict[str, Any]:
+        """
+        Values of the target cells
+
+        Args:
+            inputs: {'Sheet!A1': scalar or array} overriding template values
+            targets: Cells to compute, e.g. the template's output fields
+
+        Returns:
+            {target: value}; scalars for scalar inputs, arrays otherwise
+        """
+        targets = [key.replace('$', '') for key in targets]
+        env = dict(self.model.cells)
+        env.update(inputs)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            for key in self.order(targets, inputs.keys()):
+                func = self.compiled(key)[0]
+                try:
+                    env[key] = func(env)
+                except FormulaError as e:
+                    raise FormulaError(f"{key}: {e}")
+                except (TypeError, ValueError) as e:
+                    raise FormulaError(f"{key}: #VALUE! ({e})")
+        return {key: env.get(key) for key in targets}
+
+    def evaluate_batch(self, columns: Mapping[str, Sequence], targets: Iterable[str],
+                       size: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Evaluate many input sets at once
+
+        Args:
+            columns: {'Sheet!A1': sequence of values, one per input set}
+            targets: Cells to compute
+            size: Number of input sets (defaults to the column length)
+
+        Returns:
+            {target: ndarray with one value per input set}
+        """
+        inputs = {}
+        for key, values in columns.items():
+            array = np.asarray(values)
+            if array.dtype.kind not in 'biuf':
+                array = np.asarray(values, dtype=object)
+            inputs[key] = array
+            size = len(array) if size is None else size
+        size = size or 1
+
+        results = self.evaluate(inputs, targets)
+        return {key: np.broadcast_to(_num(value) if not _is_text(value) else np.asarray(value, dtype=object),
+                                     (size,)).copy()
+                for key, value in results.items()}
+
+
+TEMPLATE_EVALUATOR_CACHE_SIZE = 32
+_template_evaluators: "OrderedDict[str, TemplateEvaluator]" = OrderedDict()
+_template_evaluators_lock = threading.Lock()
+
+
+def get_template_evaluator(template_id: str, file_path: str) -> TemplateEvaluator:
+    """Evaluator for a template, cached per template so formulas are parsed once.
+
+    The cache is keyed on ``template_id`` (the workbook's content hash) alone:
+    ``file_path`` is only read on a miss, so a re-upload of the same template
+    to a new temp file reuses the parsed evaluator.
+    """
+    with _template_evaluators_lock:
+        evaluator = _template_evaluators.get(template_id)
+        if evaluator is not None:
+            _template_evaluators.move_to_end(template_id)
+            return evaluator
+
+    evaluator = TemplateEvaluator(WorkbookModel.from_file(file_path))
+    with _template_evaluators_lock:
+        evaluator = _template_evaluators.setdefault(template_id, evaluator)
+        _template_evaluators.move_to_end(template_id)
+        while len(_template_evaluators) > TEMPLATE_EVALUATOR_CACHE_SIZE:
+            _template_evaluators.popitem(last=False)
+    return evaluator
+
+
+def clear_template_evaluators():
+    """Drop every cached template evaluator"""
+    with _template_evaluators_lock:
+        _template_evaluators.clear()
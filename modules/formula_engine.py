@@ -0,0 +1,191 @@
+"""
+Formula Engine Module
+Safe, compiled evaluation of measurement template formulas on scalars or NumPy arrays
+"""
+
+import ast
+import math
+from dataclasses import dataclass
+from functools import lru_cache, reduce
+from typing import Callable, Dict, Mapping, Tuple
+
+import numpy as np
+
+
+class FormulaError(ValueError):
+    """Formula could not be parsed, validated or evaluated"""
+
+
+def _min(*args):
+    return reduce(np.minimum, args)
+
+
+def _max(*args):
+    return reduce(np.maximum, args)
+
+
+# Functions usable in formulas, as name(...) or math.name(...)
+FUNCTIONS: Dict[str, Callable] = {
+    'sqrt': np.sqrt,
+    'abs': np.abs,
+    'round': np.round,
+    'floor': np.floor,
+    'ceil': np.ceil,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'radians': np.radians,
+    'degrees': np.degrees,
+    'pow': np.power,
+    'min': _min,
+    'max': _max,
+    'where': np.where,
+}
+
+CONSTANTS: Dict[str, float] = {
+    'pi': math.pi,
+    'e': math.e,
+}
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+_COMPARE_OPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+class _Validator(ast.NodeTransformer):
+    """Check every node against the allowlist and map math.x / constants"""
+
+    def __init__(self):
+        self.variables = []
+
+    def generic_visit(self, node):
+        raise FormulaError(f"Unsupported syntax: {type(node).__name__}")
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BIN_OPS):
+            raise FormulaError(f"Unsupported operator: {type(node.op).__name__}")
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise FormulaError(f"Unsupported operator: {type(node.op).__name__}")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        if not all(isinstance(op, _COMPARE_OPS) for op in node.ops):
+            raise FormulaError("Unsupported comparison")
+        node.left = self.visit(node.left)
+        node.comparators = [self.visit(c) for c in node.comparators]
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FormulaError(f"Unsupported constant: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id.startswith('_'):
+            raise FormulaError(f"Invalid name: {node.id}")
+        if node.id in CONSTANTS:
+            return ast.copy_location(ast.Constant(CONSTANTS[node.id]), node)
+        if node.id in FUNCTIONS:
+            raise FormulaError(f"Function used without call: {node.id}")
+        if node.id not in self.variables:
+            self.variables.append(node.id)
+        return node
+
+    def visit_Attribute(self, node):
+        # math.pi / math.sqrt(...) as used by older templates
+        if isinstance(node.value, ast.Name) and node.value.id == 'math' and node.attr in CONSTANTS:
+            return ast.copy_location(ast.Constant(CONSTANTS[node.attr]), node)
+        raise FormulaError(f"Unsupported attribute: {ast.unparse(node)}")
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == 'math':
+            name = func.attr
+        elif isinstance(func, ast.Name):
+            name = func.id
+        else:
+            raise FormulaError("Unsupported function call")
+        if name not in FUNCTIONS:
+            raise FormulaError(f"Unknown function: {name}")
+        if node.keywords:
+            raise FormulaError(f"Keyword arguments are not supported: {name}")
+        call = ast.Call(ast.Name(f'_f_{name}', ast.Load()), [self.visit(a) for a in node.args], [])
+        return ast.copy_location(call, node)
+
+
+@dataclass(frozen=True)
+class CompiledFormula:
+    """A validated formula compiled to a Python callable over its variables"""
+    text: str
+    variables: Tuple[str, ...]
+    func: Callable
+
+    def evaluate(self, values: Mapping):
+        """
+        Evaluate with {variable: scalar or array}
+
+        Scalars in, float out; arrays (or DataFrame columns) in, ndarray out.
+        """
+        missing = [v for v in self.variables if v not in values]
+        if missing:
+            raise FormulaError(f"Missing inputs for formula '{self.text}': {', '.join(missing)}")
+        args = []
+        for name in self.variables:
+            value = values[name]
+            args.append(value if np.isscalar(value) else np.asarray(value, dtype=np.float64))
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = self.func(*args)
+        except Exception as e:
+            raise FormulaError(f"Formula evaluation error: {e}")
+        return float(result) if np.ndim(result) == 0 else np.asarray(result, dtype=np.float64)
+
+    def __call__(self, **values):
+        return self.evaluate(values)
+
+
+@lru_cache(maxsize=1024)
+def compile_formula(text: str) -> CompiledFormula:
+    """Parse, validate and compile a formula once; cached by formula text"""
+    if not text or not str(text).strip():
+        raise FormulaError("Empty formula")
+    # '^' is power in spreadsheet-style templates; it cannot occur inside a
+    # name or number, so rewriting it before parsing keeps power precedence
+    source = str(text).strip().replace('^', '**')
+    try:
+        tree = ast.parse(source, mode='eval')
+    except SyntaxError as e:
+        raise FormulaError(f"Invalid formula '{text}': {e.msg}")
+
+    validator = _Validator()
+    tree = validator.visit(tree)
+    variables = tuple(validator.variables)
+
+    lambda_tree = ast.Expression(ast.Lambda(
+        args=ast.arguments(posonlyargs=[], args=[ast.arg(v) for v in variables], vararg=None,
+                           kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[]),
+        body=tree.body,
+    ))
+    ast.fix_missing_locations(lambda_tree)
+    scope = {'__builtins__': {}}
+    scope.update({f'_f_{name}': func for name, func in FUNCTIONS.items()})
+    func = eval(compile(lambda_tree, f'<formula {text}>', 'eval'), scope)
+    return CompiledFormula(str(text), variables, func)
+
+
+def evaluate_formula(text: str, values: Mapping):
+    """Compile (cached) and evaluate a formula in one step"""
+    return compile_formula(text).evaluate(values)
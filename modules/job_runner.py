@@ -0,0 +1,525 @@
+"""
+Job Runner Module
+Local background jobs (imports, exports, rate matching, repricing) backed by
+a SQLite job table, so long work outlives the Streamlit script run and the
+browser tab that started it
+"""
+
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    job_type TEXT NOT NULL,
+    title TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    payload TEXT,
+    inputs_path TEXT,
+    progress REAL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    artifact_path TEXT,
+    error TEXT,
+    attempts INTEGER DEFAULT 0,
+    max_retries INTEGER DEFAULT 0,
+    cancel_requested INTEGER DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, updated_at);
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+JOB_COLUMNS = ('id', 'user_id', 'job_type', 'title', 'status', 'progress', 'message', 'result',
+               'artifact_path', 'error', 'attempts', 'max_retries', 'cancel_requested',
+               'created_at', 'started_at', 'finished_at', 'updated_at')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when the user has asked to cancel it"""
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class JobContext:
+    """
+    Handle passed to a job function
+
+    Holds only paths and the job id so it can be pickled into a worker
+    process; progress and cancellation go through the job table.
+    """
+
+    def __init__(self, db_path: str, job_id: str, artifact_dir: str, inputs_path: Optional[str] = None):
+        self.db_path = db_path
+        self.job_id = job_id
+        self.artifact_dir = artifact_dir
+        self.inputs_path = inputs_path
+
+    def cancelled(self) -> bool:
+        with _connect(self.db_path) as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def progress(self, fraction: float, message: str = ''):
+        """Record progress (0..1); raises JobCancelled if cancellation was requested"""
+        with _connect(self.db_path) as conn:
+            conn.execute("UPDATE jobs SET progress = ?, message = ?, updated_at = ? WHERE id = ?",
+                         (max(0.0, min(1.0, float(fraction))), message, time.time(), self.job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)).fetchone()
+        if row and row[0]:
+            raise JobCancelled(message or 'Cancelled')
+
+    def inputs(self) -> Any:
+        """Objects staged with the job at submit time (DataFrames etc.)"""
+        if not self.inputs_path:
+            return None
+        with open(self.inputs_path, 'rb') as f:
+            return pickle.load(f)
+
+    def artifact(self, file_name: str) -> str:
+        """Path for a result file owned by this job"""
+        folder = Path(self.artifact_dir) / self.job_id
+        folder.mkdir(parents=True, exist_ok=True)
+        return str(folder / file_name)
+
+
+def _run_job(func: Callable, ctx: JobContext, payload: Dict) -> Dict:
+    """Worker entry point (top level so process pools can pickle it)"""
+    result = func(ctx, payload)
+    if result is None:
+        return {}
+    if not isinstance(result, dict):
+        raise TypeError(f"Job handler returned {type(result).__name__}, expected a dict")
+    return result
+
+
+class JobRunner:
+    """
+    Dispatches queued jobs from the job table to thread and process pools
+
+    A dispatcher thread claims queued jobs oldest first, skipping users who
+    already have per_user_limit jobs running. Failed jobs are re-queued until
+    max_retries is used up. Jobs left 'running' by a previous server process
+    are re-queued when the runner starts, so one runner should own a database.
+    """
+
+    def __init__(self, db_path: str = "jobs.db", artifact_dir: str = "job_artifacts",
+                 thread_workers: int = 4, process_workers: Optional[int] = None,
+                 per_user_limit: int = 2, poll_interval: float = 0.5, autostart: bool = True):
+        self.db_path = str(db_path)
+        self.artifact_dir = str(artifact_dir)
+        Path(self.artifact_dir).mkdir(parents=True, exist_ok=True)
+        self.per_user_limit = per_user_limit
+        self.poll_interval = poll_interval
+        self.capacity = {'thread': thread_workers, 'process': process_workers or os.cpu_count() or 1}
+        self.handlers: Dict[str, tuple] = {}
+        self._executors: Dict[str, Executor] = {}
+        self._in_flight = {'thread': 0, 'process': 0}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._dispatcher: Optional[threading.Thread] = None
+
+        with _connect(self.db_path) as conn:
+            conn.executescript(JOB_SCHEMA)
+        self._recover()
+        for job_type, (func, executor) in BUILTIN_JOBS.items():
+            self.register(job_type, func, executor)
+        if autostart:
+            self.start()
+
+    # ------------------------------------------------------------------
+    # Setup
+    # ------------------------------------------------------------------
+
+    def register(self, job_type: str, func: Callable, executor: str = 'thread'):
+        """
+        Register func(ctx, payload) -> result dict for a job type
+
+        executor is 'thread' for I/O bound work or 'process' for CPU bound
+        work (func must then be a picklable top-level function). A result
+        key 'artifact_path' is stored as the job's downloadable artifact.
+        """
+        if executor not in self.capacity:
+            raise ValueError(f"Unknown executor: {executor}")
+        self.handlers[job_type] = (func, executor)
+
+    def _executor(self, kind: str) -> Executor:
+        if kind not in self._executors:
+            if kind == 'process':
+                self._executors[kind] = ProcessPoolExecutor(max_workers=self.capacity['process'])
+            else:
+                self._executors[kind] = ThreadPoolExecutor(max_workers=self.capacity['thread'],
+                                                           thread_name_prefix='job')
+        return self._executors[kind]
+
+    def _discard_executor(self, kind: str, executor: Executor):
+        """Drop a broken pool so the next job gets a fresh one"""
+        with self._lock:
+            if self._executors.get(kind) is not executor:
+                return
+            del self._executors[kind]
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"⚠️ {kind} pool broke (worker died); starting a new one")
+
+    def _recover(self):
+        """Re-queue jobs that were running when the previous process stopped"""
+        now = time.time()
+        with _connect(self.db_path) as conn:
+            conn.execute("UPDATE jobs SET status = ?, message = 'Cancelled', finished_at = ?, updated_at = ? "
+                         "WHERE status = ? AND cancel_requested = 1", (CANCELLED, now, now, RUNNING))
+            orphaned = conn.execute("UPDATE jobs SET status = ?, message = 'Re-queued after restart', "
+                                    "updated_at = ? WHERE status = ?", (QUEUED, now, RUNNING)).rowcount
+        if orphaned:
+            logger.info(f"🔄 Re-queued {orphaned} interrupted job(s)")
+
+    def start(self):
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+        self._stop.clear()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name='job-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def shutdown(self, wait: bool = True):
+        self._stop.set()
+        self._wake.set()
+        if self._dispatcher:
+            self._dispatcher.join()
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        self._executors.clear()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, user_id: str, job_type: str, payload: Optional[Dict] = None, inputs: Any = None,
+               title: str = '', max_retries: int = 0) -> str:
+        """
+        Queue a job and return its id
+
+        payload must be JSON serializable; larger objects (DataFrames,
+        workbooks) go in inputs, which is pickled next to the artifacts.
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = uuid.uuid4().hex
+        inputs_path = None
+        if inputs is not None:
+            inputs_path = str(Path(self.artifact_dir) / f"{job_id}.inputs.pkl")
+            with open(inputs_path, 'wb') as f:
+                pickle.dump(inputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with _connect(self.db_path) as conn:
+            conn.execute("""
+                INSERT INTO jobs (id, user_id, job_type, title, status, payload, inputs_path,
+                                  message, max_retries, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'Queued', ?, ?, ?)
+            """, (job_id, user_id, job_type, title or job_type.title(), QUEUED,
+                  json.dumps(payload or {}, default=str), inputs_path, max_retries, now, now))
+        self._wake.set()
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job now, or ask a running one to stop at its next progress report"""
+        now = time.time()
+        with _connect(self.db_path) as conn:
+            queued = conn.execute("UPDATE jobs SET status = ?, cancel_requested = 1, message = 'Cancelled', "
+                                  "finished_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                                  (CANCELLED, now, now, job_id, QUEUED)).rowcount
+            running = conn.execute("UPDATE jobs SET cancel_requested = 1, message = 'Cancelling...', "
+                                   "updated_at = ? WHERE id = ? AND status = ?",
+                                   (now, job_id, RUNNING)).rowcount
+        return bool(queued or running)
+
+    def retry(self, job_id: str) -> bool:
+        """Put a failed or cancelled job back on the queue"""
+        with _connect(self.db_path) as conn:
+            changed = conn.execute(f"""
+                UPDATE jobs SET status = ?, progress = 0, message = 'Queued', error = NULL,
+                       attempts = 0, cancel_requested = 0, finished_at = NULL, updated_at = ?
+                WHERE id = ? AND status IN ({FAILED!r}, {CANCELLED!r})
+            """, (QUEUED, time.time(), job_id)).rowcount
+        self._wake.set()
+        return bool(changed)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with _connect(self.db_path) as conn:
+            row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._as_dict(row) if row else None
+
+    def jobs_for_user(self, user_id: str, limit: int = 50) -> List[Dict]:
+        """Most recently updated jobs of a user (one indexed query, cheap to poll)"""
+        with _connect(self.db_path) as conn:
+            rows = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE user_id = ? "
+                                "ORDER BY updated_at DESC LIMIT ?", (user_id, limit)).fetchall()
+        return [self._as_dict(row) for row in rows]
+
+    def last_update(self, user_id: str) -> float:
+        """Latest change time of a user's jobs; pollers redraw only when it moves"""
+        with _connect(self.db_path) as conn:
+            return conn.execute("SELECT COALESCE(MAX(updated_at), 0) FROM jobs WHERE user_id = ?",
+                                (user_id,)).fetchone()[0]
+
+    def wait(self, job_id: str, timeout: float = 60.0) -> Optional[Dict]:
+        """Block until a job finishes (CLI and tests); returns the job row"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return job
+            time.sleep(min(self.poll_interval, 0.1))
+        return self.get(job_id)
+
+    @staticmethod
+    def _as_dict(row) -> Dict:
+        job = dict(zip(JOB_COLUMNS, row))
+        job['result'] = json.loads(job['result']) if job['result'] else {}
+        return job
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                self._dispatch_once()
+            except Exception as e:
+                logger.error(f"❌ Job dispatcher error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _dispatch_once(self) -> int:
+        """Claim as many queued jobs as free workers and per-user limits allow"""
+        started = 0
+        with _connect(self.db_path) as conn:
+            running = dict(conn.execute("SELECT user_id, COUNT(*) FROM jobs WHERE status = ? GROUP BY user_id",
+                                        (RUNNING,)).fetchall())
+            queued = conn.execute("SELECT id, user_id, job_type, payload, inputs_path FROM jobs "
+                                  "WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        for job_id, user_id, job_type, payload, inputs_path in queued:
+            if running.get(user_id, 0) >= self.per_user_limit or job_type not in self.handlers:
+                continue
+            func, kind = self.handlers[job_type]
+            with self._lock:
+                if self._in_flight[kind] >= self.capacity[kind]:
+                    continue
+            if not self._claim(job_id):
+                continue
+            running[user_id] = running.get(user_id, 0) + 1
+            with self._lock:
+                self._in_flight[kind] += 1
+            ctx = JobContext(self.db_path, job_id, self.artifact_dir, inputs_path)
+            args = (_run_job, func, ctx, json.loads(payload or '{}'))
+            try:
+                executor = self._executor(kind)
+                try:
+                    future = executor.submit(*args)
+                except BrokenProcessPool:
+                    self._discard_executor(kind, executor)
+                    executor = self._executor(kind)
+                    future = executor.submit(*args)
+            except Exception as e:
+                self._job_done(job_id, kind, error=e)
+                continue
+            future.add_done_callback(lambda f, job_id=job_id, kind=kind, executor=executor:
+                                     self._on_future(job_id, kind, f, executor))
+            started += 1
+        return started
+
+    def _claim(self, job_id: str) -> bool:
+        now = time.time()
+        with _connect(self.db_path) as conn:
+            return conn.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, "
+                                "message = 'Running', updated_at = ? WHERE id = ? AND status = ?",
+                                (RUNNING, now, now, job_id, QUEUED)).rowcount == 1
+
+    def _on_future(self, job_id: str, kind: str, future, executor: Optional[Executor] = None):
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            # Every job in flight on the pool sees this, not only the one that killed it
+            if executor is not None:
+                self._discard_executor(kind, executor)
+            self._job_done(job_id, kind, error=e)
+        except BaseException as e:
+            self._job_done(job_id, kind, error=e)
+        else:
+            self._job_done(job_id, kind, result=result)
+
+    def _job_done(self, job_id: str, kind: str, result: Optional[Dict] = None, error: BaseException = None):
+        with self._lock:
+            self._in_flight[kind] -= 1
+        now = time.time()
+        with _connect(self.db_path) as conn:
+            attempts, max_retries, cancel_requested = conn.execute(
+                "SELECT attempts, max_retries, cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if error is None:
+                conn.execute("UPDATE jobs SET status = ?, progress = 1, message = 'Done', result = ?, "
+                             "artifact_path = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                             (SUCCEEDED, json.dumps(result, default=str), result.get('artifact_path'),
+                              now, now, job_id))
+            elif isinstance(error, JobCancelled) or cancel_requested:
+                conn.execute("UPDATE jobs SET status = ?, message = 'Cancelled', finished_at = ?, "
+                             "updated_at = ? WHERE id = ?", (CANCELLED, now, now, job_id))
+            elif attempts <= max_retries or (isinstance(error, BrokenProcessPool) and attempts <= max_retries + 1):
+                # A dead worker gets one extra attempt on a fresh pool
+                conn.execute("UPDATE jobs SET status = ?, progress = 0, message = ?, error = ?, updated_at = ? "
+                             "WHERE id = ?", (QUEUED, f"Retrying ({attempts}/{max_retries})",
+                                              str(error), now, job_id))
+            else:
+                details = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+                conn.execute("UPDATE jobs SET status = ?, message = ?, error = ?, finished_at = ?, "
+                             "updated_at = ? WHERE id = ?", (FAILED, str(error)[:200], details, now, now, job_id))
+                logger.error(f"❌ Job {job_id} failed: {error}")
+        self._wake.set()
+
+
+# -----------------------------------------------------------------------------
+# Built-in job types
+# -----------------------------------------------------------------------------
+
+def import_job(ctx: JobContext, payload: Dict) -> Dict:
+    """Read every sheet of an Excel file into a Parquet project folder artifact
+
+    Sheets whose name mentions 'abs' are abstracts, the rest measurements (the
+    same split as the CLI import). The folder is loaded back with
+    columnar_store.import_project and applied to a project from the UI.
+    """
+    from .columnar_store import export_project
+
+    file_path = payload['file_path']
+    xl = pd.ExcelFile(file_path)
+    sheets = {}
+    for idx, sheet_name in enumerate(xl.sheet_names):
+        ctx.progress(idx / len(xl.sheet_names), f"Reading {sheet_name}")
+        sheets[sheet_name] = xl.parse(sheet_name)
+    abstracts = {name: df for name, df in sheets.items() if 'abs' in name.lower()}
+    measurements = {name: df for name, df in sheets.items() if name not in abstracts}
+    ctx.progress(0.95, "Saving sheets")
+    artifact = ctx.artifact(Path(file_path).stem)
+    export_project(artifact, {'name': Path(file_path).stem, 'source_file': Path(file_path).name},
+                   measurements, abstracts)
+    return {'file_name': Path(file_path).name, 'sheets_imported': len(sheets),
+            'measurement_sheets': len(measurements), 'abstract_sheets': len(abstracts),
+            'rows_imported': sum(len(df) for df in sheets.values()), 'artifact_path': artifact,
+            'project_id': payload.get('project_id')}
+
+
+def export_job(ctx: JobContext, payload: Dict) -> Dict:
+    """Write staged sheets to an .xlsx workbook or a streamed PDF report"""
+    inputs = ctx.inputs() or {}
+    file_name = payload.get('file_name', 'export.' + payload.get('format', 'xlsx'))
+    output_path = ctx.artifact(file_name)
+    ctx.progress(0.05, f"Writing {file_name}")
+    if payload.get('format', 'xlsx') == 'pdf':
+        from .pdf_report import build_streaming, report_document, measurements_story, abstracts_story
+
+        def story():
+            yield from measurements_story(inputs.get('measurements', {}))
+            ctx.progress(0.5, "Measurements written")
+            yield from abstracts_story(inputs.get('abstracts', {}))
+
+        build_streaming(report_document(output_path), story())
+    else:
+        from .workbook_writer import save_estimate_workbook
+        save_estimate_workbook(output_path, inputs.get('sheets', {}), inputs.get('project_info', {}),
+                               inputs.get('modifications', []))
+    return {'file_name': file_name, 'size': Path(output_path).stat().st_size, 'artifact_path': output_path}
+
+
+MATCH_COLUMNS = ['description', 'code', 'matched', 'rate', 'unit', 'confidence']
+
+
+def best_matches(database, descriptions: List[str], threshold: int = 70,
+                 progress: Optional[Callable[[int], None]] = None) -> pd.DataFrame:
+    """Best SSR/BSR match per description (blank columns where nothing clears threshold)"""
+    rows = []
+    for idx, description in enumerate(descriptions):
+        if progress and idx % 10 == 0:
+            progress(idx)
+        best = database.search_both(str(description), threshold)['best_match'] or {}
+        rows.append({'description': description, 'code': best.get('code'), 'matched': best.get('description'),
+                     'rate': best.get('rate'), 'unit': best.get('unit'), 'confidence': best.get('confidence')})
+    return pd.DataFrame(rows, columns=MATCH_COLUMNS)
+
+
+def match_job(ctx: JobContext, payload: Dict) -> Dict:
+    """Fuzzy-match descriptions against SSR/BSR; best matches saved as CSV"""
+    from ssr_bsr_integration import SSRBSRDatabase
+
+    descriptions = payload.get('descriptions') or ctx.inputs() or []
+    database = SSRBSRDatabase(payload.get('db_path', 'construction_estimates.db'))
+    matches = best_matches(database, descriptions, payload.get('threshold', 70),
+                           lambda idx: ctx.progress(idx / max(len(descriptions), 1),
+                                                    f"Matched {idx}/{len(descriptions)}"))
+    artifact = ctx.artifact('matches.csv')
+    matches.to_csv(artifact, index=False)
+    return {'items': len(matches), 'matched': int(matches['code'].notna().sum()), 'artifact_path': artifact}
+
+
+def reprice_job(ctx: JobContext, payload: Dict) -> Dict:
+    """Roll SSR rates up the item tree and write them back to the database"""
+    from .rate_rollup import RateRollupEngine
+
+    db_path = payload.get('db_path', 'construction_estimates.db')
+    ctx.progress(0.1, "Loading rate book")
+    engine = RateRollupEngine.from_db(db_path)
+    ctx.progress(0.4, f"Computing {len(engine.nodes)} rates")
+    engine.compute_all()
+    ctx.progress(0.8, "Saving rates")
+    updated = engine.write_back(db_path)
+    return {'items_updated': updated, 'timings': engine.timings}
+
+
+BUILTIN_JOBS = {
+    'import': (import_job, 'process'),
+    'export': (export_job, 'process'),
+    'match': (match_job, 'process'),
+    'reprice': (reprice_job, 'thread'),
+}
+
+_runners: Dict[str, JobRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def get_job_runner(db_path: str = "jobs.db", **kwargs) -> JobRunner:
+    """Process-wide runner for a job database (survives Streamlit reruns and reloads)"""
+    key = str(Path(db_path).resolve())
+    with _runners_lock:
+        if key not in _runners:
+            _runners[key] = JobRunner(db_path, **kwargs)
+        return _runners[key]
+
+
+def format_job_time(timestamp: Optional[float]) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%H:%M:%S') if timestamp else ''
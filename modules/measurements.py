@@ -0,0 +1,92 @@
+"""
+Measurements Module
+Vectorized Nos x Length x Breadth x Height quantity kernel shared by every
+measurement entry point
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _column(values, n: int, default: float) -> np.ndarray:
+    """Float array of length n; missing/blank values become default"""
+    if values is None:
+        return np.full(n, default)
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Blank strings or text from spreadsheets
+        arr = pd.to_numeric(pd.Series(np.asarray(values, dtype=object).ravel()),
+                            errors='coerce').to_numpy(dtype=np.float64)
+    arr = np.broadcast_to(arr.reshape(-1) if arr.ndim else arr, (n,))
+    return np.where(np.isnan(arr), default, arr)
+
+
+def nlbh_quantities(nos, length=None, breadth=None, height=None,
+                    diameter=None, deduction=None) -> np.ndarray:
+    """
+    Quantities for many measurement rows in one pass
+
+    Each dimension is used only if it and every dimension before it is
+    non-zero (nos x L x B x H, falling back to nos x L x B, nos x L, nos).
+    Rows with a diameter are circular: pi/4 x D^2 takes the place of L x B
+    and the height fallback still applies. Deduction rows come out negative.
+    Any argument may be a scalar, list, array or Series; missing values count
+    as blank (nos defaults to 1).
+    """
+    n = max(np.size(v) for v in (nos, length, breadth, height, diameter, deduction) if v is not None)
+    nos = _column(nos, n, 1.0)
+    length = _column(length, n, 0.0)
+    breadth = _column(breadth, n, 0.0)
+    height = _column(height, n, 0.0)
+    diameter = _column(diameter, n, 0.0)
+
+    circular = diameter != 0
+    has_length = (length != 0) & ~circular
+    has_breadth = has_length & (breadth != 0)
+    has_height = (has_breadth | circular) & (height != 0)
+
+    quantity = nos * np.where(circular, np.pi / 4 * diameter ** 2, 1.0)
+    quantity *= np.where(has_length, length, 1.0)
+    quantity *= np.where(has_breadth, breadth, 1.0)
+    quantity *= np.where(has_height, height, 1.0)
+
+    if deduction is not None:
+        is_deduction = np.broadcast_to(np.asarray(deduction, dtype=bool), (n,))
+        quantity = np.where(is_deduction, -np.abs(quantity), quantity)
+    return quantity
+
+
+def nlbh_quantity(nos=1, length=0, breadth=0, height=0, diameter=0, deduction=False) -> float:
+    """Quantity for a single measurement row"""
+    return float(nlbh_quantities(nos, length, breadth, height, diameter, deduction)[0])
+
+
+def measurement_totals(rows) -> np.ndarray:
+    """
+    Quantities for a DataFrame (or list of dicts) with nos/length/breadth/height
+    and optional diameter/deduction columns
+    """
+    frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    if frame.empty:
+        return np.zeros(0)
+
+    def col(name) -> Optional[pd.Series]:
+        return frame[name] if name in frame.columns else None
+
+    deduction = col('deduction')
+    if deduction is not None:
+        deduction = deduction.fillna(False).astype(bool)
+    return nlbh_quantities(col('nos'), col('length'), col('breadth'), col('height'),
+                           col('diameter'), deduction)
+
+
+def priced_measurements(rows) -> pd.DataFrame:
+    """Measurement rows with 'total' and 'amount' (total x rate) filled in"""
+    frame = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    frame['total'] = measurement_totals(frame)
+    rate = _column(frame['rate'] if 'rate' in frame.columns else None, len(frame), 0.0)
+    frame['amount'] = frame['total'] * rate
+    return frame
@@ -0,0 +1,377 @@
+"""
+PDF Report Module
+Bounded-memory ReportLab rendering of measurement and abstract sheets: columns
+are formatted vectorized, tables are split into page-sized LongTable chunks
+and the story is produced lazily from generators. Large reports can also be
+rendered section by section in a process pool and merged
+"""
+
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import (LongTable, Paragraph, SimpleDocTemplate,
+                                    Spacer, TableStyle)
+    from reportlab.pdfgen import canvas
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Data rows per LongTable; one chunk fits an A4 page at font size 8-9
+ROWS_PER_CHUNK = 40
+# Rows formatted per vectorized pass; bounds the formatted strings held at once
+BLOCK_ROWS = 4000
+
+MEASUREMENT_HEADER = ['S.No.', 'Description', 'Qty', 'L', 'B', 'H', 'Unit', 'Total']
+ABSTRACT_HEADER = ['S.No.', 'Description', 'Unit', 'Quantity', 'Rate', 'Amount']
+
+if REPORTLAB_AVAILABLE:
+    MEASUREMENT_WIDTHS = [0.5*inch, 2.5*inch, 0.5*inch, 0.5*inch, 0.5*inch, 0.5*inch, 0.5*inch, 0.8*inch]
+    ABSTRACT_WIDTHS = [0.5*inch, 2.5*inch, 0.8*inch, 0.8*inch, 1*inch, 1.2*inch]
+
+    # Table styles are built once and shared by every chunk
+    MEASUREMENT_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ])
+    _ABSTRACT_COMMANDS = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('ALIGN', (4, 1), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]
+    ABSTRACT_STYLE = TableStyle(_ABSTRACT_COMMANDS + [('ALIGN', (1, 1), (1, -1), 'LEFT')])
+    # Last chunk of a sheet carries the TOTAL row
+    ABSTRACT_TOTAL_STYLE = TableStyle(_ABSTRACT_COMMANDS + [
+        ('ALIGN', (1, 1), (1, -2), 'LEFT'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+    ])
+
+
+def _text(df: pd.DataFrame, name: str, width: int = None) -> np.ndarray:
+    """Column as strings, truncated to width characters with '...'"""
+    if name not in df.columns:
+        return np.full(len(df), '', dtype=object)
+    values = df[name].fillna('').astype(str)
+    if width is not None:
+        values = values.where(values.str.len() <= width, values.str[:width] + '...')
+    return values.to_numpy(dtype=object)
+
+
+def _fixed(df: pd.DataFrame, name: str, decimals: int, prefix: str = '') -> np.ndarray:
+    """Numeric column formatted to fixed decimals; blanks stay blank"""
+    if name not in df.columns:
+        values = np.zeros(len(df))
+    else:
+        values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+    formatted = np.char.mod(f'{prefix}%.{decimals}f', values).astype(object)
+    formatted[np.isnan(values)] = ''
+    return formatted
+
+
+def _serials(df: pd.DataFrame, start: int, column: str = None) -> np.ndarray:
+    """S.No. values: the given column if present, else 1-based row numbers"""
+    if column and column in df.columns:
+        return _text(df, column)
+    return np.char.mod('%d', np.arange(start + 1, start + len(df) + 1)).astype(object)
+
+
+def measurement_rows(df: pd.DataFrame, start: int = 0) -> List[list]:
+    """Formatted measurement table rows for a block of a sheet"""
+    columns = [
+        _serials(df, start, 'item_no'),
+        _text(df, 'description', 50),
+        _fixed(df, 'quantity', 2),
+        _fixed(df, 'length', 2),
+        _fixed(df, 'breadth', 2),
+        _fixed(df, 'height', 2),
+        _text(df, 'unit'),
+        _fixed(df, 'total', 3),
+    ]
+    return np.column_stack(columns).tolist() if len(df) else []
+
+
+def abstract_rows(df: pd.DataFrame, start: int = 0) -> List[list]:
+    """Formatted abstract table rows for a block of a sheet"""
+    columns = [
+        _serials(df, start),
+        _text(df, 'description', 40),
+        _text(df, 'unit'),
+        _fixed(df, 'quantity', 2),
+        _fixed(df, 'rate', 2, '₹'),
+        _fixed(df, 'amount', 2, '₹'),
+    ]
+    return np.column_stack(columns).tolist() if len(df) else []
+
+
+def iter_row_chunks(df: pd.DataFrame, formatter: Callable, rows_per_chunk: int = ROWS_PER_CHUNK,
+                    block_rows: int = BLOCK_ROWS) -> Iterator[List[list]]:
+    """Formatted rows in chunks of rows_per_chunk, formatting block_rows at a time"""
+    block_rows = max(block_rows - block_rows % rows_per_chunk, rows_per_chunk)
+    for start in range(0, len(df), block_rows):
+        rows = formatter(df.iloc[start:start + block_rows], start)
+        for offset in range(0, len(rows), rows_per_chunk):
+            yield rows[offset:offset + rows_per_chunk]
+
+
+def iter_measurement_tables(df: pd.DataFrame, rows_per_chunk: int = ROWS_PER_CHUNK):
+    """Page-sized LongTables for one measurement sheet, header repeated on each"""
+    for rows in iter_row_chunks(df, measurement_rows, rows_per_chunk):
+        yield LongTable([MEASUREMENT_HEADER] + rows, colWidths=MEASUREMENT_WIDTHS,
+                        style=MEASUREMENT_STYLE, repeatRows=1)
+
+
+def iter_abstract_tables(df: pd.DataFrame, rows_per_chunk: int = ROWS_PER_CHUNK):
+    """Page-sized LongTables for one abstract sheet; the last one ends with the TOTAL row"""
+    total = pd.to_numeric(df['amount'], errors='coerce').sum() if 'amount' in df.columns else 0.0
+    total_row = ['', 'TOTAL', '', '', '', f"₹{total:,.2f}"]
+    chunks = iter_row_chunks(df, abstract_rows, rows_per_chunk)
+    current = next(chunks, [])
+    for upcoming in chunks:
+        yield LongTable([ABSTRACT_HEADER] + current, colWidths=ABSTRACT_WIDTHS,
+                        style=ABSTRACT_STYLE, repeatRows=1)
+        current = upcoming
+    yield LongTable([ABSTRACT_HEADER] + current + [total_row], colWidths=ABSTRACT_WIDTHS,
+                    style=ABSTRACT_TOTAL_STYLE, repeatRows=1)
+
+
+def sheet_story(kind: str, sheet_name: str, df: pd.DataFrame, styles=None,
+                rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator:
+    """Heading and table chunks for one measurement or abstract sheet"""
+    styles = styles or getSampleStyleSheet()
+    tables = iter_measurement_tables if kind == 'measurements' else iter_abstract_tables
+    yield Paragraph(f"Sheet: {sheet_name}", styles['Heading2'])
+    yield from tables(df, rows_per_chunk)
+    yield Spacer(1, 0.3*inch)
+
+
+SECTION_TITLES = {'measurements': "DETAILED MEASUREMENTS", 'abstracts': "ABSTRACT OF COSTS"}
+
+
+def section_story(kind: str, sheets: Dict[str, pd.DataFrame], styles=None,
+                  rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator:
+    """Flowables for a whole measurements/abstracts section, produced lazily"""
+    styles = styles or getSampleStyleSheet()
+    yield Paragraph(SECTION_TITLES[kind], styles['Heading1'])
+    yield Spacer(1, 0.2*inch)
+    for sheet_name, df in sheets.items():
+        if df.empty:
+            continue
+        yield from sheet_story(kind, sheet_name, df, styles, rows_per_chunk)
+
+
+def measurements_story(measurements: Dict[str, pd.DataFrame], styles=None,
+                       rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator:
+    """Flowables for the DETAILED MEASUREMENTS section, produced lazily"""
+    return section_story('measurements', measurements, styles, rows_per_chunk)
+
+
+def abstracts_story(abstracts: Dict[str, pd.DataFrame], styles=None,
+                    rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator:
+    """Flowables for the ABSTRACT OF COSTS section, produced lazily"""
+    return section_story('abstracts', abstracts, styles, rows_per_chunk)
+
+
+class FlowableStream(list):
+    """
+    Story list that pulls flowables from an iterable on demand
+
+    ReportLab's build loop consumes flowables[0] and pushes split remainders
+    back to the front, so only a small lookahead window is ever materialized.
+    """
+
+    def __init__(self, flowables: Iterable, lookahead: int = 8):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+        self._fill()
+
+    def _fill(self):
+        while list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                break
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+def report_document(output, invariant: bool = False) -> 'SimpleDocTemplate':
+    """A4 document with the margins used by the comprehensive report"""
+    return SimpleDocTemplate(output, pagesize=A4,
+                             rightMargin=72, leftMargin=72,
+                             topMargin=72, bottomMargin=18,
+                             invariant=1 if invariant else None)
+
+
+def build_streaming(doc, story: Iterable):
+    """Build a document from a (possibly lazy) iterable of flowables"""
+    doc.build(FlowableStream(story))
+
+
+# -----------------------------------------------------------------------------
+# Parallel section rendering
+# -----------------------------------------------------------------------------
+
+def render_part(story: Iterable) -> bytes:
+    """Render flowables to a standalone, reproducible PDF"""
+    buffer = io.BytesIO()
+    build_streaming(report_document(buffer, invariant=True), story)
+    return buffer.getvalue()
+
+
+def _render_sheet_part(spec: Tuple) -> bytes:
+    """Worker: render one sheet (with its section heading if it opens one)"""
+    kind, sheet_name, df, opens_section, rows_per_chunk = spec
+    styles = getSampleStyleSheet()
+
+    def story():
+        if opens_section:
+            yield Paragraph(SECTION_TITLES[kind], styles['Heading1'])
+            yield Spacer(1, 0.2*inch)
+        yield from sheet_story(kind, sheet_name, df, styles, rows_per_chunk)
+
+    return render_part(story())
+
+
+def sheet_part_specs(measurements: Dict[str, pd.DataFrame], abstracts: Dict[str, pd.DataFrame],
+                     rows_per_chunk: int = ROWS_PER_CHUNK) -> List[Tuple]:
+    """One independent render job per non-empty sheet, in report order"""
+    specs = []
+    for kind, sheets in (('measurements', measurements), ('abstracts', abstracts)):
+        non_empty = [(name, df) for name, df in sheets.items() if not df.empty]
+        for position, (sheet_name, df) in enumerate(non_empty):
+            specs.append((kind, sheet_name, df, position == 0, rows_per_chunk))
+    return specs
+
+
+def _page_count(pdf: bytes) -> int:
+    return len(PdfReader(io.BytesIO(pdf)).pages)
+
+
+def toc_story(entries: List[Tuple[str, int, int]], styles=None) -> List:
+    """Table of contents from (title, level, page) entries"""
+    styles = styles or getSampleStyleSheet()
+    rows = [[('    ' * level) + title, str(page)] for title, level, page in entries]
+    table = LongTable(rows or [['', '']], colWidths=[5.5*inch, 0.8*inch], repeatRows=0, style=TableStyle([
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+    ]))
+    return [Paragraph("TABLE OF CONTENTS", styles['Heading1']), Spacer(1, 0.2*inch), table]
+
+
+def page_number_overlay(page_sizes: List[Tuple[float, float]]) -> bytes:
+    """One page per report page carrying only its 'Page X of N' footer"""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, invariant=1)
+    total = len(page_sizes)
+    for number, (width, height) in enumerate(page_sizes, 1):
+        c.setPageSize((width, height))
+        c.setFont('Helvetica', 8)
+        c.drawRightString(width - 72, 6, f"Page {number} of {total}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def render_parallel_report(output_path: str, title_story: Iterable, front_story: Iterable,
+                           measurements: Dict[str, pd.DataFrame], abstracts: Dict[str, pd.DataFrame],
+                           workers: int = None, rows_per_chunk: int = ROWS_PER_CHUNK) -> int:
+    """
+    Render sheet sections in a process pool and merge them in report order
+
+    Layout: title page(s), table of contents, front matter (summary and cost
+    analysis), then one part per measurement sheet and per abstract sheet.
+    Page numbers and the table of contents are filled in after the parts'
+    page counts are known. Every part is rendered in ReportLab's invariant
+    mode, so the same inputs give the same bytes whatever the worker count.
+    Returns the number of pages written.
+    """
+    if not PYPDF_AVAILABLE:
+        raise RuntimeError("pypdf is required for parallel PDF rendering")
+
+    specs = sheet_part_specs(measurements, abstracts, rows_per_chunk)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(specs) < 2:
+        sheet_parts = [_render_sheet_part(spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map keeps submission order, so the merge order is fixed
+            sheet_parts = list(pool.map(_render_sheet_part, specs))
+
+    title_pdf = render_part(title_story)
+    front_pdf = render_part(front_story)
+
+    body = [("Project Summary", 0, front_pdf)]
+    for spec, pdf in zip(specs, sheet_parts):
+        kind, sheet_name, _, opens_section, _ = spec
+        if opens_section:
+            body.append((SECTION_TITLES[kind].title(), 0, None))
+        body.append((sheet_name, 1, pdf))
+
+    def entries(first_page):
+        page, listed = first_page, []
+        for title, level, pdf in body:
+            listed.append((title, level, page))
+            if pdf is not None:
+                page += _page_count(pdf)
+        return listed
+
+    title_pages = _page_count(title_pdf)
+    # Page numbers have the same line count whatever their value, so a draft
+    # TOC gives the final TOC length
+    toc_pages = _page_count(render_part(toc_story(entries(0))))
+    toc_entries = entries(title_pages + toc_pages + 1)
+    toc_pdf = render_part(toc_story(toc_entries))
+
+    writer = PdfWriter()
+    for pdf in [title_pdf, toc_pdf] + [pdf for _, _, pdf in body if pdf is not None]:
+        writer.append(PdfReader(io.BytesIO(pdf)))
+
+    overlay = PdfReader(io.BytesIO(page_number_overlay(
+        [(float(page.mediabox.width), float(page.mediabox.height)) for page in writer.pages])))
+    for page, stamp in zip(writer.pages, overlay.pages):
+        page.merge_page(stamp)
+
+    parents = {}
+    for title, level, page in toc_entries:
+        parent = parents.get(level - 1) if level else None
+        parents[level] = writer.add_outline_item(title, page - 1, parent=parent)
+
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+    return len(writer.pages)
@@ -4,19 +4,30 @@ Implements memory optimization, caching, and performance improvements
 """
 
 import gc
+import json
 import logging
+import os
 import re
+import shutil
 import sqlite3
+import tempfile
+import threading
 import time
 from datetime import datetime
 from functools import wraps
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 import psutil
 import streamlit as st
 
+from modules.db_maintenance import (DEFAULT_BACKUP_PAGES, DEFAULT_BACKUP_SLEEP,
+                                    MaintenanceLog, MaintenanceRun,
+                                    apply_page_delta, online_backup,
+                                    page_hashes, read_page_size,
+                                    run_pragma_task, write_page_delta)
+
 logger = logging.getLogger(__name__)
 
 class PerformanceOptimizer:
@@ -351,62 +362,178 @@ class DataValidator:
         
         return len(errors) == 0, errors
 
+def _serialized(method):
+    """Run a BackupManager method under the manager's lock"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class BackupManager:
-    """Automated backup system for data protection"""
+    """Generation-based online backups with page-level incrementals.
+
+    Each generation is a directory holding one full ``base.db`` taken with the
+    sqlite3 online backup API plus a chain of ``.delta`` files that contain only
+    the pages changed since the previous restore point.
+    """
     
-    def __init__(self, backup_dir: str = "backups"):
+    def __init__(self, backup_dir: str = "backups", max_generations: int = 3,
+                 max_incrementals: int = 24, pages_per_step: int = DEFAULT_BACKUP_PAGES,
+                 step_sleep: float = DEFAULT_BACKUP_SLEEP):
         self.backup_dir = Path(backup_dir)
         self.backup_dir.mkdir(exist_ok=True)
-        self.max_backups = 10  # Keep last 10 backups
+        self.max_generations = max_generations  # Keep last N full backups with their deltas
+        self.max_incrementals = max_incrementals  # Start a new generation after N deltas
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.run_log = MaintenanceLog(self.backup_dir / "maintenance_log.jsonl")
+        # Backups read and rewrite generation manifests, so one runs at a time
+        self._lock = threading.RLock()
     
+    @_serialized
     def create_backup(self, db_path: str) -> str:
-        """Create timestamped database backup"""
+        """Start a new backup generation with a full online copy"""
+        start = time.perf_counter()
         try:
-            import shutil
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            gen_dir = self.backup_dir / f"gen_{timestamp}"
+            gen_dir.mkdir()
+            backup_path = gen_dir / "base.db"
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"backup_{timestamp}.db"
-            backup_path = self.backup_dir / backup_filename
-            
-            shutil.copy2(db_path, backup_path)
+            bytes_written = online_backup(db_path, str(backup_path),
+                                          self.pages_per_step, self.step_sleep)
+            page_size, hashes = page_hashes(str(backup_path))
+            self._write_manifest(gen_dir, {
+                'source': str(Path(db_path).resolve()),
+                'page_size': page_size,
+                'hashes': hashes,
+                'points': [{'file': backup_path.name, 'kind': 'full',
+                            'created_date': datetime.now().isoformat(),
+                            'bytes_written': bytes_written}]
+            })
             
             # Clean up old backups
             self._cleanup_old_backups()
             
+            self.run_log.record(MaintenanceRun(
+                task='full_backup', db_path=db_path,
+                duration_s=time.perf_counter() - start, bytes_written=bytes_written))
             logger.info(f"✅ Database backup created: {backup_path}")
             return str(backup_path)
             
         except Exception as e:
+            self.run_log.record(MaintenanceRun(
+                task='full_backup', db_path=db_path, status='error', detail=str(e),
+                duration_s=time.perf_counter() - start))
             logger.error(f"❌ Backup creation failed: {e}")
             raise
     
+    @_serialized
+    def create_incremental_backup(self, db_path: str) -> str:
+        """Store only the pages changed since the last restore point"""
+        gen_dir = self._current_generation(db_path)
+        if gen_dir is None:
+            return self.create_backup(db_path)
+        
+        manifest = self._read_manifest(gen_dir)
+        if len(manifest['points']) > self.max_incrementals:
+            return self.create_backup(db_path)
+        
+        start = time.perf_counter()
+        snapshot = gen_dir / f".snapshot_{os.getpid()}_{threading.get_ident()}.db"
+        try:
+            online_backup(db_path, str(snapshot), self.pages_per_step, self.step_sleep)
+            if read_page_size(str(snapshot)) != manifest['page_size']:
+                snapshot.unlink()
+                return self.create_backup(db_path)
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            delta_path = gen_dir / f"inc_{timestamp}.delta"
+            bytes_written, hashes, changed = write_page_delta(
+                str(snapshot), manifest['hashes'], str(delta_path))
+            
+            manifest['hashes'] = hashes
+            manifest['points'].append({'file': delta_path.name, 'kind': 'incremental',
+                                       'created_date': datetime.now().isoformat(),
+                                       'bytes_written': bytes_written,
+                                       'changed_pages': changed})
+            self._write_manifest(gen_dir, manifest)
+            
+            self.run_log.record(MaintenanceRun(
+                task='incremental_backup', db_path=db_path,
+                duration_s=time.perf_counter() - start, bytes_written=bytes_written,
+                detail=f"{changed} of {len(hashes)} pages changed"))
+            logger.info(f"✅ Incremental backup created: {delta_path} ({changed} pages)")
+            return str(delta_path)
+            
+        except Exception as e:
+            self.run_log.record(MaintenanceRun(
+                task='incremental_backup', db_path=db_path, status='error', detail=str(e),
+                duration_s=time.perf_counter() - start))
+            logger.error(f"❌ Incremental backup failed: {e}")
+            raise
+        finally:
+            if snapshot.exists():
+                snapshot.unlink()
+    
+    def run_task(self, db_path: str, task: str) -> MaintenanceRun:
+        """Run a backup or maintenance task by name and record it"""
+        if task in ('full_backup', 'incremental_backup'):
+            with self._lock:
+                if task == 'full_backup':
+                    self.create_backup(db_path)
+                else:
+                    self.create_incremental_backup(db_path)
+                return MaintenanceRun(**self.run_log.recent(1)[0])
+        
+        run = run_pragma_task(db_path, task)
+        self.run_log.record(run)
+        logger.info(f"Maintenance {task}: {run.status} in {run.duration_s:.3f}s")
+        return run
+    
+    def recent_runs(self, limit: int = 50) -> List[Dict]:
+        """Most recent backup/maintenance runs, newest first"""
+        return self.run_log.recent(limit)
+    
     def _cleanup_old_backups(self):
-        """Remove old backup files to save space"""
+        """Remove whole generations (base plus deltas) beyond the retention limit"""
         try:
-            backup_files = sorted(self.backup_dir.glob("backup_*.db"), 
-                                key=lambda x: x.stat().st_mtime, reverse=True)
+            generations = sorted(self.backup_dir.glob("gen_*"), reverse=True)
             
-            # Remove excess backups
-            for old_backup in backup_files[self.max_backups:]:
-                old_backup.unlink()
-                logger.info(f"Removed old backup: {old_backup}")
+            # Remove excess generations
+            for old_generation in generations[self.max_generations:]:
+                shutil.rmtree(old_generation)
+                logger.info(f"Removed old backup generation: {old_generation}")
                 
         except Exception as e:
             logger.error(f"Error cleaning up backups: {e}")
     
+    @_serialized
     def restore_backup(self, backup_path: str, target_path: str) -> bool:
-        """Restore database from backup"""
+        """Restore database from a full or incremental restore point"""
         try:
-            import shutil
-            
-            if not Path(backup_path).exists():
+            backup_file = Path(backup_path)
+            if not backup_file.exists():
                 raise FileNotFoundError(f"Backup file not found: {backup_path}")
             
-            # Create backup of current database before restore
-            current_backup = self.create_backup(target_path)
+            gen_dir = backup_file.parent
+            manifest = self._read_manifest(gen_dir)
             
-            # Restore from backup
-            shutil.copy2(backup_path, target_path)
+            # Rebuild the restore point from the base and its delta chain
+            with tempfile.TemporaryDirectory() as tmp:
+                restored = Path(tmp) / "restore.db"
+                shutil.copyfile(gen_dir / "base.db", restored)
+                chain = [point['file'] for point in manifest['points']]
+                for delta_file in chain[1:chain.index(backup_file.name) + 1]:
+                    apply_page_delta(str(restored), str(gen_dir / delta_file))
+                
+                # Create backup of current database before restore
+                self.create_backup(target_path)
+                
+                # Restore from backup
+                online_backup(str(restored), target_path, self.pages_per_step, self.step_sleep)
             
             logger.info(f"✅ Database restored from: {backup_path}")
             return True
@@ -416,23 +543,49 @@ class BackupManager:
             return False
     
     def list_backups(self) -> List[Dict]:
-        """List available backups with metadata"""
+        """List available restore points with metadata"""
         backups = []
         
         try:
-            for backup_file in sorted(self.backup_dir.glob("backup_*.db"), 
-                                    key=lambda x: x.stat().st_mtime, reverse=True):
-                stat = backup_file.stat()
-                
-                backups.append({
-                    'filename': backup_file.name,
-                    'path': str(backup_file),
-                    'size_mb': stat.st_size / 1024 / 1024,
-                    'created_date': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    'age_hours': (time.time() - stat.st_mtime) / 3600
-                })
+            for gen_dir in sorted(self.backup_dir.glob("gen_*"), reverse=True):
+                manifest = self._read_manifest(gen_dir)
+                for point in reversed(manifest['points']):
+                    point_file = gen_dir / point['file']
+                    stat = point_file.stat()
+                    
+                    backups.append({
+                        'filename': f"{gen_dir.name}/{point['file']}",
+                        'path': str(point_file),
+                        'kind': point['kind'],
+                        'size_mb': stat.st_size / 1024 / 1024,
+                        'created_date': point['created_date'],
+                        'age_hours': (time.time() - stat.st_mtime) / 3600
+                    })
                 
         except Exception as e:
             logger.error(f"Error listing backups: {e}")
         
-        return backups
\ No newline at end of file
+        return backups
+    
+    def _current_generation(self, db_path: str) -> Optional[Path]:
+        """Newest generation that was taken from ``db_path``"""
+        source = str(Path(db_path).resolve())
+        for gen_dir in sorted(self.backup_dir.glob("gen_*"), reverse=True):
+            try:
+                if self._read_manifest(gen_dir)['source'] == source:
+                    return gen_dir
+            except Exception:
+                continue
+        return None
+    
+    @staticmethod
+    def _read_manifest(gen_dir: Path) -> Dict:
+        with open(gen_dir / "manifest.json", encoding='utf-8') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _write_manifest(gen_dir: Path, manifest: Dict):
+        tmp_path = gen_dir / "manifest.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, gen_dir / "manifest.json")
@@ -0,0 +1,280 @@
+"""
+Rate Roll-up Module
+Hierarchical SSR rate analysis: derived item rates are computed bottom-up from
+their components, and only the affected subtrees are recomputed when basic
+rates change
+"""
+
+import json
+import logging
+import math
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateNode:
+    """One SSR item in the roll-up tree"""
+    code: str
+    parent_code: Optional[str] = None
+    material_cost: float = 0.0
+    labor_cost: float = 0.0
+    equipment_cost: float = 0.0
+    overhead_percentage: float = 0.0
+    profit_percentage: float = 0.0
+    base_rate: float = 0.0
+    coefficient: float = 1.0
+    children: List[str] = field(default_factory=list)
+    depth: int = 0
+    # Memoized results
+    subtotal: float = 0.0
+    rate: float = 0.0
+
+    @property
+    def own_cost(self) -> float:
+        return (self.material_cost or 0.0) + (self.labor_cost or 0.0) + (self.equipment_cost or 0.0)
+
+
+def _coefficient(metadata) -> float:
+    """Component quantity per unit of its parent, from the metadata JSON"""
+    if not metadata:
+        return 1.0
+    try:
+        return float(json.loads(metadata).get('coefficient', 1.0))
+    except (ValueError, TypeError, AttributeError):
+        return 1.0
+
+
+def _number(value) -> float:
+    return 0.0 if value is None or pd.isna(value) else float(value)
+
+
+class RateRollupEngine:
+    """
+    Bottom-up rate analysis over the parent_code hierarchy of ssr_items.
+
+    A leaf's rate is its material + labour + equipment cost (or its stored
+    rate when those are empty). A derived item's subtotal is its own costs
+    plus each child's rate times the child's coefficient; its rate is the
+    subtotal with overhead and profit percentages applied.
+    """
+
+    def __init__(self, items: pd.DataFrame):
+        self.nodes: Dict[str, RateNode] = {}
+        self.timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        for row in items.to_dict('records'):
+            code = str(row['code'])
+            parent = row.get('parent_code')
+            self.nodes[code] = RateNode(
+                code=code,
+                parent_code=str(parent) if parent is not None and not pd.isna(parent) and str(parent) else None,
+                material_cost=_number(row.get('material_cost')),
+                labor_cost=_number(row.get('labor_cost')),
+                equipment_cost=_number(row.get('equipment_cost')),
+                overhead_percentage=_number(row.get('overhead_percentage')),
+                profit_percentage=_number(row.get('profit_percentage')),
+                base_rate=_number(row.get('rate')),
+                coefficient=_coefficient(row.get('metadata')),
+            )
+
+        for node in self.nodes.values():
+            if node.parent_code not in self.nodes or node.parent_code == node.code:
+                node.parent_code = None
+            else:
+                self.nodes[node.parent_code].children.append(node.code)
+
+        self._order = self._bottom_up_order()
+        self.timings['build_s'] = time.perf_counter() - start
+
+    @classmethod
+    def from_db(cls, db_path: str) -> 'RateRollupEngine':
+        """Load the active SSR book from a database"""
+        conn = sqlite3.connect(db_path)
+        try:
+            items = pd.read_sql_query("""
+                SELECT code, parent_code, rate, material_cost, labor_cost, equipment_cost,
+                       overhead_percentage, profit_percentage, metadata
+                FROM ssr_items
+                WHERE status = 'active'
+            """, conn)
+        finally:
+            conn.close()
+        return cls(items)
+
+    def _bottom_up_order(self) -> List[str]:
+        """Codes ordered children-before-parents; raises on cycles"""
+        roots = [code for code, node in self.nodes.items() if node.parent_code is None]
+        order = []
+        stack = [(code, 0) for code in roots]
+        while stack:
+            code, depth = stack.pop()
+            node = self.nodes[code]
+            node.depth = depth
+            order.append(code)
+            stack.extend((child, depth + 1) for child in node.children)
+        if len(order) != len(self.nodes):
+            cyclic = sorted(set(self.nodes) - set(order))[:10]
+            raise ValueError(f"Cycle in SSR parent_code hierarchy involving: {cyclic}")
+        order.reverse()
+        return order
+
+    def _compute(self, node: RateNode):
+        if node.children:
+            node.subtotal = node.own_cost + sum(
+                self.nodes[c].rate * self.nodes[c].coefficient for c in node.children
+            )
+            node.rate = node.subtotal * (1 + node.overhead_percentage / 100) * (1 + node.profit_percentage / 100)
+        elif node.own_cost:
+            node.subtotal = node.own_cost
+            node.rate = node.subtotal * (1 + node.overhead_percentage / 100) * (1 + node.profit_percentage / 100)
+        else:
+            node.subtotal = node.rate = node.base_rate
+
+    def compute_all(self) -> Dict[str, float]:
+        """Full bottom-up roll-up; returns {code: rate}"""
+        start = time.perf_counter()
+        for code in self._order:
+            self._compute(self.nodes[code])
+        self.timings['full_rollup_s'] = time.perf_counter() - start
+        return self.rates()
+
+    def update_basic_rates(self, changes: Dict[str, Dict[str, float]]) -> List[str]:
+        """
+        Apply changed inputs and recompute only the affected subtrees
+
+        changes: {code: {'rate'|'material_cost'|'labor_cost'|'equipment_cost'|
+                         'overhead_percentage'|'profit_percentage'|'coefficient': value}}
+        Returns the codes whose rolled-up rate changed, deepest first.
+        """
+        start = time.perf_counter()
+        dirty = set()
+        for code, values in changes.items():
+            node = self.nodes.get(code)
+            if node is None:
+                logger.warning(f"⚠️ Unknown SSR code in rate update: {code}")
+                continue
+            for name, value in values.items():
+                setattr(node, 'base_rate' if name == 'rate' else name, float(value))
+            # The item and every ancestor up to its root
+            while node is not None and node.code not in dirty:
+                dirty.add(node.code)
+                node = self.nodes.get(node.parent_code) if node.parent_code else None
+
+        changed = []
+        for code in sorted(dirty, key=lambda c: -self.nodes[c].depth):
+            node = self.nodes[code]
+            previous = node.rate
+            self._compute(node)
+            if node.rate != previous:
+                changed.append(code)
+        self.timings['incremental_s'] = time.perf_counter() - start
+        self.timings['incremental_nodes'] = len(dirty)
+        return changed
+
+    def rates(self, codes: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        codes = self.nodes if codes is None else codes
+        return {code: self.nodes[code].rate for code in codes}
+
+    def changed_codes(self) -> List[str]:
+        """Derived items whose rolled-up rate differs from the rate they were loaded with"""
+        return [code for code in self._order
+                if self.nodes[code].children
+                and not math.isclose(self.nodes[code].rate, self.nodes[code].base_rate,
+                                     rel_tol=1e-9, abs_tol=1e-9)]
+
+    def write_back(self, db_path: str, codes: Optional[Iterable[str]] = None) -> int:
+        """
+        Write rolled-up rates and levels to ssr_items in one transaction
+
+        By default only derived items whose rate changed are written, so leaf
+        rates (including manual corrections) are never overwritten. Returns
+        the number of rows written.
+        """
+        start = time.perf_counter()
+        codes = self.changed_codes() if codes is None else list(codes)
+        now = datetime.now().isoformat()
+        rows = [(self.nodes[c].rate, self.nodes[c].depth, now, c) for c in codes]
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE ssr_items SET rate = ?, level = ?, updated_at = ? WHERE code = ?", rows
+                )
+        finally:
+            conn.close()
+        for code in codes:
+            self.nodes[code].base_rate = self.nodes[code].rate
+        self.timings['write_back_s'] = time.perf_counter() - start
+        self.timings['written'] = len(rows)
+        return len(rows)
+
+
+def synthetic_book(n_items: int = 10000, fanout: int = 5, basic_share: float = 0.6) -> pd.DataFrame:
+    """SSR-like book: basic material/labour rates at the leaves, derived items above"""
+    n_basic = int(n_items * basic_share)
+    n_derived = n_items - n_basic
+    rows = []
+    for i in range(n_items):
+        basic = i < n_basic
+        if basic:
+            # Basic rates spread evenly over the derived items
+            parent = n_basic + i * n_derived // n_basic
+        else:
+            # Derived items form a fanout-ary tree with R{n_basic} at the top
+            position = i - n_basic
+            parent = n_basic + (position - 1) // fanout if position else None
+        rows.append({
+            'code': f"R{i}",
+            'parent_code': f"R{parent}" if parent is not None else None,
+            'rate': 100.0 + i % 500 if basic else 0.0,
+            'material_cost': 0.0,
+            'labor_cost': 0.0 if basic else 50.0,
+            'equipment_cost': 0.0 if basic else 10.0,
+            'overhead_percentage': 0.0 if basic else 10.0,
+            'profit_percentage': 0.0 if basic else 10.0,
+            'metadata': json.dumps({'coefficient': 0.1 + (i % 10) / 10}) if parent is not None else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def timing_report(n_items: int = 10000, changed: int = 50, db_path: Optional[str] = None) -> Dict[str, float]:
+    """Time build, full roll-up, an incremental update and the bulk write-back"""
+    book = synthetic_book(n_items)
+    engine = RateRollupEngine(book)
+    engine.compute_all()
+
+    basic = [c for c, node in engine.nodes.items() if not node.children][:changed]
+    engine.update_basic_rates({code: {'rate': engine.nodes[code].base_rate * 1.05} for code in basic})
+
+    if db_path:
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                conn.execute("""CREATE TABLE IF NOT EXISTS ssr_items (
+                    code TEXT UNIQUE, rate REAL, level INTEGER, updated_at TEXT)""")
+                conn.executemany("INSERT OR IGNORE INTO ssr_items (code) VALUES (?)",
+                                 [(c,) for c in engine.nodes])
+        finally:
+            conn.close()
+        engine.write_back(db_path)
+
+    return dict(engine.timings, items=n_items, changed_basic_rates=len(basic))
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = timing_report(db_path=os.path.join(tmp, 'ssr_rollup.db'))
+    for key, value in report.items():
+        print(f"{key:>22}: {value:.4f}" if isinstance(value, float) else f"{key:>22}: {value}")
@@ -12,6 +12,7 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
+from modules.event_logger import get_event_logger
 
 logger = logging.getLogger(__name__)
 
@@ -384,20 +385,14 @@ class SecurityManager:
             ip_address: Client IP address
         """
         try:
-            conn = sqlite3.connect(self.database.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO activity_log (id, user_id, action, entity_type, entity_id, 
-                                        details, ip_address, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                secrets.token_urlsafe(16), user_id, action, 'security', resource,
-                details, ip_address, datetime.now().isoformat()
-            ))
-            
-            conn.commit()
-            conn.close()
+            get_event_logger(self.database.db_path).log(
+                action=action,
+                entity_type='security',
+                entity_id=resource,
+                user_id=user_id,
+                details=details,
+                ip_address=ip_address
+            )
             
         except Exception as e:
             logger.error(f"Audit logging error: {e}")
@@ -0,0 +1,87 @@
+"""
+Workbook Writer Module
+Streaming (constant-memory) .xlsx output for estimates made of many DataFrame sheets
+"""
+
+from typing import Dict, Iterable, List, Mapping
+
+import pandas as pd
+import xlsxwriter
+
+# Format definitions; each is added to a workbook once and reused for every cell
+HEADER_FORMAT = {'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#366092',
+                 'align': 'center', 'valign': 'vcenter'}
+TITLE_FORMAT = {'bold': True, 'font_size': 14}
+SECTION_FORMAT = {'bold': True, 'font_size': 12}
+LABEL_FORMAT = {'bold': True}
+
+
+def column_widths(df: pd.DataFrame, max_width: int = 50) -> List[int]:
+    """Widths from the longest header/cell text per column, computed column-wise"""
+    widths = []
+    for position, name in enumerate(df.columns):
+        lengths = df.iloc[:, position].dropna().astype(str).str.len()
+        longest = max(len(str(name)), int(lengths.max()) if len(lengths) else 0)
+        widths.append(min(longest + 2, max_width))
+    return widths
+
+
+def _rows(df: pd.DataFrame) -> Iterable[tuple]:
+    """Data rows as plain Python values, blanks (NaN/NaT) as None"""
+    values = df.astype(object).where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def write_sheet(workbook, sheet_name: str, df: pd.DataFrame, header_format):
+    """Stream one DataFrame as a sheet with a styled header row"""
+    ws = workbook.add_worksheet(sheet_name)
+    # Column widths must be set before rows are flushed
+    for position, width in enumerate(column_widths(df)):
+        ws.set_column(position, position, width)
+    ws.write_row(0, 0, [str(name) for name in df.columns], header_format)
+    write_row = ws.write_row
+    for row, values in enumerate(_rows(df), start=1):
+        write_row(row, 0, values)
+    return ws
+
+
+def write_metadata_sheet(workbook, project_info: Mapping, modifications: Iterable[Dict]):
+    """Project information followed by the modifications log"""
+    ws = workbook.add_worksheet("Metadata")
+    label = workbook.add_format(LABEL_FORMAT)
+    ws.write(0, 0, "Project Information", workbook.add_format(TITLE_FORMAT))
+    row = 2
+    for key, value in project_info.items():
+        ws.write(row, 0, key, label)
+        ws.write(row, 1, value)
+        row += 1
+    row += 2
+    ws.write(row, 0, "Modifications Log", workbook.add_format(SECTION_FORMAT))
+    for mod in modifications:
+        row += 1
+        ws.write_string(row, 0, f"{mod['type'].upper()}: {mod.get('sheet', '')} - {mod.get('timestamp', '')}")
+    return ws
+
+
+def save_estimate_workbook(output_path: str, sheets: Mapping[str, pd.DataFrame],
+                           project_info: Mapping, modifications: Iterable[Dict] = ()):
+    """Stream a Metadata sheet and every estimate sheet to a new .xlsx file
+
+    A source "Metadata" sheet (any case), e.g. when cloning an earlier clone,
+    is replaced by the new one rather than written twice.
+    """
+    workbook = xlsxwriter.Workbook(output_path, {
+        'constant_memory': True,
+        'strings_to_urls': False,
+        'nan_inf_to_errors': True,
+        'default_date_format': 'yyyy-mm-dd',
+    })
+    try:
+        write_metadata_sheet(workbook, project_info, modifications)
+        header_format = workbook.add_format(HEADER_FORMAT)
+        for sheet_name, df in sheets.items():
+            if str(sheet_name).strip().lower() == 'metadata':
+                continue
+            write_sheet(workbook, sheet_name, df, header_format)
+    finally:
+        workbook.close()
@@ -3,17 +3,33 @@ Project Archive Manager
 Manages historical estimates organized by project type (Buildings, Bridges, etc.)
 """
 
+import io
 import json
+import logging
+import re
 import shutil
 import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
-import streamlit as st
 from openpyxl import load_workbook
 
+from modules.columnar_store import PYARROW_AVAILABLE, export_archive_dataset
+
+logger = logging.getLogger(__name__)
+
+# Header keywords used to locate BOQ/abstract columns in archived sheets
+HEADER_KEYWORDS = {
+    'description': ('particular', 'description', 'item of work', 'name of item'),
+    'code': ('ssr', 'bsr', 'code', 'item no', 's.no', 's.n', 'sr.no', 'sl.no'),
+    'quantity': ('quantity', 'qty'),
+    'unit': ('unit',),
+    'rate': ('rate',),
+    'amount': ('amount',),
+}
+HEADER_SCAN_ROWS = 15
 
 class ProjectArchiveManager:
     """Manages archived project estimates organized by category"""
@@ -67,6 +83,56 @@ class ProjectArchiveManager:
             )
         """)
         
+        # One row per priced line found inside an archived workbook
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archived_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id TEXT NOT NULL,
+                sheet_name TEXT,
+                row_no INTEGER,
+                item_code TEXT,
+                description TEXT,
+                unit TEXT,
+                quantity REAL,
+                rate REAL,
+                amount REAL,
+                FOREIGN KEY (project_id) REFERENCES archived_projects(id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archived_index_state (
+                project_id TEXT PRIMARY KEY,
+                item_count INTEGER,
+                indexed_date TEXT
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_items_project ON archived_items(project_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_items_code ON archived_items(item_code)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_items_rate ON archived_items(rate)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_projects_category ON archived_projects(category, status)")
+        
+        # Full-text indexes (external content, kept in sync on archive)
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS archived_items_fts USING fts5(
+                    description, item_code, sheet_name,
+                    content='archived_items', content_rowid='id',
+                    tokenize='porter unicode61'
+                )
+            """)
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS archived_projects_fts USING fts5(
+                    project_name, location, client_name, notes, tags,
+                    content='archived_projects', content_rowid='rowid',
+                    tokenize='porter unicode61'
+                )
+            """)
+            self.fts_enabled = True
+            self._create_fts_triggers(cursor)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 not available, falling back to LIKE search: {e}")
+            self.fts_enabled = False
+        
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS archive_tags (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -79,6 +145,53 @@ class ProjectArchiveManager:
         conn.commit()
         conn.close()
     
+    @staticmethod
+    def _create_fts_triggers(cursor):
+        """Keep the external-content FTS tables in sync with their source tables
+        
+        Databases created before the triggers existed get a one-time rebuild so
+        rows archived earlier become searchable.
+        """
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'archived_%_fts_%'")
+        had_triggers = cursor.fetchone()[0] == 6
+        
+        cursor.executescript("""
+            CREATE TRIGGER IF NOT EXISTS archived_items_fts_ai AFTER INSERT ON archived_items BEGIN
+                INSERT INTO archived_items_fts(rowid, description, item_code, sheet_name)
+                VALUES (new.id, new.description, new.item_code, new.sheet_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS archived_items_fts_ad AFTER DELETE ON archived_items BEGIN
+                INSERT INTO archived_items_fts(archived_items_fts, rowid, description, item_code, sheet_name)
+                VALUES ('delete', old.id, old.description, old.item_code, old.sheet_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS archived_items_fts_au AFTER UPDATE ON archived_items BEGIN
+                INSERT INTO archived_items_fts(archived_items_fts, rowid, description, item_code, sheet_name)
+                VALUES ('delete', old.id, old.description, old.item_code, old.sheet_name);
+                INSERT INTO archived_items_fts(rowid, description, item_code, sheet_name)
+                VALUES (new.id, new.description, new.item_code, new.sheet_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS archived_projects_fts_ai AFTER INSERT ON archived_projects BEGIN
+                INSERT INTO archived_projects_fts(rowid, project_name, location, client_name, notes, tags)
+                VALUES (new.rowid, new.project_name, new.location, new.client_name, new.notes, new.tags);
+            END;
+            CREATE TRIGGER IF NOT EXISTS archived_projects_fts_ad AFTER DELETE ON archived_projects BEGIN
+                INSERT INTO archived_projects_fts(archived_projects_fts, rowid, project_name, location,
+                                                  client_name, notes, tags)
+                VALUES ('delete', old.rowid, old.project_name, old.location, old.client_name, old.notes, old.tags);
+            END;
+            CREATE TRIGGER IF NOT EXISTS archived_projects_fts_au AFTER UPDATE ON archived_projects BEGIN
+                INSERT INTO archived_projects_fts(archived_projects_fts, rowid, project_name, location,
+                                                  client_name, notes, tags)
+                VALUES ('delete', old.rowid, old.project_name, old.location, old.client_name, old.notes, old.tags);
+                INSERT INTO archived_projects_fts(rowid, project_name, location, client_name, notes, tags)
+                VALUES (new.rowid, new.project_name, new.location, new.client_name, new.notes, new.tags);
+            END;
+        """)
+        
+        if not had_triggers:
+            cursor.execute("INSERT INTO archived_items_fts(archived_items_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO archived_projects_fts(archived_projects_fts) VALUES ('rebuild')")
+    
     def archive_project(self, file_path: str, category: str, metadata: Dict) -> Dict:
         """Archive a project estimate file"""
         try:
@@ -91,8 +204,8 @@ class ProjectArchiveManager:
             if source_path.suffix.lower() not in ['.xls', '.xlsx']:
                 return {"success": False, "error": "Only XLS/XLSX files supported"}
             
-            # Generate unique ID
-            project_id = f"{category}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            # Generate unique ID (microseconds keep bulk imports from colliding)
+            project_id = f"{category}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
             
             # Create destination path
             category_folder = self.archive_root / category
@@ -102,8 +215,9 @@ class ProjectArchiveManager:
             # Copy file
             shutil.copy2(source_path, dest_path)
             
-            # Extract file metadata
+            # Extract file metadata and priced line items in one pass
             file_metadata = self._extract_file_metadata(dest_path)
+            items = file_metadata.pop('items')
             
             # Save to database
             conn = sqlite3.connect(self.db_path)
@@ -135,43 +249,259 @@ class ProjectArchiveManager:
                 json.dumps(metadata.get('tags', []))
             ))
             
+            self._index_project(cursor, project_id, items)
+            
             conn.commit()
             conn.close()
             
             return {
                 "success": True,
                 "project_id": project_id,
-                "file_path": str(dest_path)
+                "file_path": str(dest_path),
+                "indexed_items": len(items)
             }
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
     def _extract_file_metadata(self, file_path: Path) -> Dict:
-        """Extract metadata from Excel file"""
+        """Extract metadata and priced line items from Excel file"""
+        items = []
         try:
-            wb = load_workbook(file_path, read_only=True, data_only=True)
+            sheets = self._iter_sheet_rows(file_path)
             
-            sheet_count = len(wb.sheetnames)
+            sheet_count = 0
             row_count = 0
             
-            for sheet in wb.worksheets:
-                row_count += sheet.max_row
-            
-            wb.close()
+            for sheet_name, rows in sheets:
+                sheet_count += 1
+                rows = list(rows)
+                row_count += len(rows)
+                items.extend(self._extract_sheet_items(sheet_name, rows))
             
             return {
                 'file_size': file_path.stat().st_size,
                 'sheet_count': sheet_count,
-                'row_count': row_count
+                'row_count': row_count,
+                'items': items
             }
-        except:
+        except Exception as e:
+            logger.warning(f"Could not read contents of {file_path.name}: {e}")
             return {
                 'file_size': file_path.stat().st_size,
                 'sheet_count': 0,
-                'row_count': 0
+                'row_count': 0,
+                'items': items
             }
     
+    @staticmethod
+    def _iter_sheet_rows(file_path: Path):
+        """Yield (sheet_name, row tuples) for XLSX (openpyxl) or XLS (pandas/xlrd)"""
+        if file_path.suffix.lower() == '.xlsx':
+            wb = load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                for sheet in wb.worksheets:
+                    yield sheet.title, sheet.iter_rows(values_only=True)
+            finally:
+                wb.close()
+        else:
+            sheets = pd.read_excel(file_path, sheet_name=None, header=None)
+            for sheet_name, df in sheets.items():
+                df = df.astype(object).where(df.notna(), None)
+                yield sheet_name, df.itertuples(index=False, name=None)
+    
+    @staticmethod
+    def _find_header(rows: List[Tuple]) -> Tuple[int, Dict[str, int]]:
+        """Locate the header row and map column roles to indices"""
+        for row_idx, row in enumerate(rows[:HEADER_SCAN_ROWS]):
+            columns = {}
+            for col_idx, value in enumerate(row):
+                if not isinstance(value, str):
+                    continue
+                label = value.strip().lower()
+                for role, keywords in HEADER_KEYWORDS.items():
+                    if role not in columns and any(label.startswith(k) or k in label for k in keywords):
+                        columns[role] = col_idx
+                        break
+            if 'description' in columns and ('rate' in columns or 'quantity' in columns):
+                return row_idx, columns
+        return -1, {}
+    
+    @staticmethod
+    def _to_number(value) -> Optional[float]:
+        if isinstance(value, bool) or value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return float(str(value).replace(',', '').strip())
+        except ValueError:
+            return None
+    
+    def _extract_sheet_items(self, sheet_name: str, rows: List[Tuple]) -> List[Tuple]:
+        """Extract (sheet, row, code, description, unit, qty, rate, amount) tuples"""
+        header_idx, columns = self._find_header(rows)
+        if header_idx < 0:
+            return []
+        
+        def cell(row, role):
+            col = columns.get(role)
+            return row[col] if col is not None and col < len(row) else None
+        
+        items = []
+        parent_description = ""
+        for row_no, row in enumerate(rows[header_idx + 1:], start=header_idx + 2):
+            description = cell(row, 'description')
+            if not isinstance(description, str) or not description.strip():
+                continue
+            description = " ".join(description.split())
+            
+            quantity = self._to_number(cell(row, 'quantity'))
+            rate = self._to_number(cell(row, 'rate'))
+            amount = self._to_number(cell(row, 'amount'))
+            if rate is None and quantity is None:
+                # Heading rows carry the main description for "(a)", "(b)" sub-items
+                parent_description = description
+                continue
+            if parent_description and re.match(r'^\(?[a-z0-9]{1,3}[).]', description, re.IGNORECASE):
+                description = f"{parent_description} {description}"
+            
+            # The unit usually sits in the unlabelled column right after quantity
+            unit = None
+            if 'quantity' in columns and columns['quantity'] + 1 < len(row):
+                candidate = row[columns['quantity'] + 1]
+                if isinstance(candidate, str) and len(candidate.strip()) <= 12:
+                    unit = candidate.strip()
+            if unit is None and isinstance(cell(row, 'unit'), str):
+                unit = cell(row, 'unit').strip()
+            
+            code = cell(row, 'code')
+            items.append((
+                sheet_name, row_no,
+                str(code).strip() if code is not None else None,
+                description, unit, quantity, rate, amount
+            ))
+        return items
+    
+    def _index_project(self, cursor, project_id: str, items: List[Tuple]):
+        """Write a project's line items (FTS entries follow via triggers)"""
+        cursor.executemany("""
+            INSERT INTO archived_items
+            (project_id, sheet_name, row_no, item_code, description, unit, quantity, rate, amount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(project_id,) + item for item in items])
+        
+        cursor.execute("""
+            INSERT OR REPLACE INTO archived_index_state (project_id, item_count, indexed_date)
+            VALUES (?, ?, ?)
+        """, (project_id, len(items), datetime.now().isoformat()))
+    
+    def build_content_index(self, rebuild: bool = False, jobs: int = 1) -> Dict:
+        """
+        Index contents of archived files that have not been indexed yet
+        
+        With jobs > 1 the workbooks are parsed in a process pool; rows are
+        still written from this process in one transaction.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        if rebuild:
+            cursor.execute("DELETE FROM archived_items")
+            cursor.execute("DELETE FROM archived_index_state")
+            if self.fts_enabled:
+                cursor.execute("INSERT INTO archived_items_fts(archived_items_fts) VALUES ('rebuild')")
+                cursor.execute("INSERT INTO archived_projects_fts(archived_projects_fts) VALUES ('rebuild')")
+        
+        cursor.execute("""
+            SELECT id, file_path FROM archived_projects
+            WHERE status = 'active' AND id NOT IN (SELECT project_id FROM archived_index_state)
+        """)
+        pending = cursor.fetchall()
+        
+        results = {'indexed_projects': 0, 'indexed_items': 0, 'failed': []}
+        found = []
+        for project_id, file_path in pending:
+            if Path(file_path).exists():
+                found.append((project_id, Path(file_path)))
+            else:
+                results['failed'].append({'file': file_path, 'error': 'File not found'})
+        
+        paths = [path for _, path in found]
+        if jobs > 1 and len(paths) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                extracted = list(pool.map(self._extract_file_metadata, paths))
+        else:
+            extracted = map(self._extract_file_metadata, paths)
+        
+        for (project_id, _), metadata in zip(found, extracted):
+            items = metadata['items']
+            self._index_project(cursor, project_id, items)
+            results['indexed_projects'] += 1
+            results['indexed_items'] += len(items)
+        
+        conn.commit()
+        conn.close()
+        return results
+    
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Turn free text into an FTS5 AND-query of quoted prefix tokens"""
+        tokens = re.findall(r'\w+', text)
+        return " ".join(f'"{token}"*' for token in tokens)
+    
+    def search_contents(self, text: Optional[str] = None, min_rate: Optional[float] = None,
+                        max_rate: Optional[float] = None, unit: Optional[str] = None,
+                        category: Optional[str] = None, limit: int = 200) -> pd.DataFrame:
+        """Search line items inside archived estimates.
+        
+        Example: ``search_contents("RCC M25 slab", min_rate=7000, unit="cum")``
+        """
+        query = """
+            SELECT p.id AS project_id, p.project_name, p.category, p.location,
+                   i.sheet_name, i.row_no, i.item_code, i.description,
+                   i.unit, i.quantity, i.rate, i.amount
+            FROM archived_items i
+            JOIN archived_projects p ON p.id = i.project_id
+            WHERE p.status = 'active'
+        """
+        params = []
+        
+        if text and self._fts_query(text):
+            if self.fts_enabled:
+                query += " AND i.id IN (SELECT rowid FROM archived_items_fts WHERE archived_items_fts MATCH ?)"
+                params.append(self._fts_query(text))
+            else:
+                for token in re.findall(r'\w+', text):
+                    query += " AND i.description LIKE ?"
+                    params.append(f"%{token}%")
+        
+        if min_rate is not None:
+            query += " AND i.rate >= ?"
+            params.append(min_rate)
+        
+        if max_rate is not None:
+            query += " AND i.rate <= ?"
+            params.append(max_rate)
+        
+        if unit:
+            query += " AND LOWER(i.unit) LIKE ?"
+            params.append(f"%{unit.lower().strip('. ')}%")
+        
+        if category:
+            query += " AND p.category = ?"
+            params.append(category)
+        
+        query += " ORDER BY i.rate DESC LIMIT ?"
+        params.append(limit)
+        
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        
+        return df
+    
     def get_archived_projects(self, category: Optional[str] = None, 
                              search_term: Optional[str] = None) -> pd.DataFrame:
         """Get list of archived projects"""
@@ -184,7 +514,15 @@ class ProjectArchiveManager:
             query += " AND category = ?"
             params.append(category)
         
-        if search_term:
+        if search_term and self.fts_enabled and self._fts_query(search_term):
+            # Match project metadata or anything inside the archived workbook
+            fts_query = self._fts_query(search_term)
+            query += """ AND (rowid IN (SELECT rowid FROM archived_projects_fts WHERE archived_projects_fts MATCH ?)
+                          OR id IN (SELECT i.project_id FROM archived_items i
+                                    WHERE i.id IN (SELECT rowid FROM archived_items_fts
+                                                   WHERE archived_items_fts MATCH ?)))"""
+            params.extend([fts_query, fts_query])
+        elif search_term:
             query += " AND (project_name LIKE ? OR location LIKE ? OR client_name LIKE ?)"
             search_pattern = f"%{search_term}%"
             params.extend([search_pattern, search_pattern, search_pattern])
@@ -303,10 +641,18 @@ class ProjectArchiveManager:
         ]
         
         return df[export_columns] if not df.empty else pd.DataFrame()
+    
+    def export_dataset(self, output_dir: str, category: Optional[str] = None) -> Dict:
+        """Write indexed line items of the archive (or one category) as a partitioned Parquet dataset"""
+        self.build_content_index()
+        return export_archive_dataset(str(self.db_path), output_dir, category)
 
 
 def render_archive_ui():
     """Render the archive management UI in Streamlit"""
+    # Imported here so scripts and the CLI can use the manager without the UI stack
+    import streamlit as st
+    
     st.title("📚 Project Archive Manager")
     
     # Initialize archive manager
@@ -538,6 +884,40 @@ def render_archive_ui():
                             st.warning("Delete functionality - to be implemented")
         else:
             st.info("No projects found. Start by importing your existing estimates!")
+        
+        # Item-level search inside archived workbooks
+        st.subheader("🔎 Search Inside Estimates")
+        
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        
+        with col1:
+            item_text = st.text_input("Item description / code", placeholder="RCC M25 slab")
+        
+        with col2:
+            min_rate = st.number_input("Min Rate (₹)", min_value=0.0, value=0.0, step=100.0)
+        
+        with col3:
+            max_rate = st.number_input("Max Rate (₹, 0 = any)", min_value=0.0, value=0.0, step=100.0)
+        
+        with col4:
+            item_unit = st.text_input("Unit", placeholder="cum")
+        
+        if item_text or min_rate or max_rate or item_unit:
+            items_df = archive_mgr.search_contents(
+                item_text or None,
+                min_rate=min_rate or None,
+                max_rate=max_rate or None,
+                unit=item_unit or None,
+                category=category_filter
+            )
+            st.write(f"**Found {len(items_df)} matching items**")
+            st.dataframe(items_df, use_container_width=True)
+        
+        if st.button("🗂️ Index Unindexed Archives"):
+            with st.spinner("Indexing archived workbooks..."):
+                index_results = archive_mgr.build_content_index()
+            st.success(f"✅ Indexed {index_results['indexed_items']} items from "
+                       f"{index_results['indexed_projects']} projects")
     
     # Tab 4: Export
     with tab4:
@@ -571,6 +951,16 @@ def render_archive_ui():
                 st.success(f"✅ Export ready! {len(export_df)} projects")
             else:
                 st.info("No projects to export")
+        
+        st.subheader("🧱 Parquet Dataset for BI")
+        st.caption("All indexed line items, partitioned by category (category=<name>/items-0.parquet)")
+        dataset_dir = st.text_input("Dataset Folder", value=str(archive_mgr.archive_root / "parquet_dataset"))
+        
+        if st.button("Write Parquet Dataset", disabled=not PYARROW_AVAILABLE):
+            category_filter = None if export_category == "All" else export_category
+            with st.spinner("Writing dataset..."):
+                result = archive_mgr.export_dataset(dataset_dir, category_filter)
+            st.success(f"✅ {result['rows']} items from {result['projects']} projects written to {result['path']}")
 
 
 if __name__ == "__main__":
@@ -9,6 +9,7 @@ from datetime import datetime
 import streamlit as st
 
 from item_code_manager import ItemCodeManager, MultiRowMeasurementManager
+from modules.measurements import nlbh_quantity
 
 
 def show_reusable_items_manager():
@@ -243,14 +244,7 @@ def show_reusable_items_manager():
                         )
                     
                     # Calculate total
-                    if length and breadth and height:
-                        total = nos * length * breadth * height
-                    elif length and breadth:
-                        total = nos * length * breadth
-                    elif length:
-                        total = nos * length
-                    else:
-                        total = nos
+                    total = nlbh_quantity(nos, length, breadth, height)
                     
                     amount = total * item['standard_rate']
                     
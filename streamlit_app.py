@@ -50,11 +50,12 @@ import sqlite3
 import tempfile
 import time
 import uuid
+import zipfile
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import openpyxl
@@ -64,7 +65,20 @@ import plotly.graph_objects as go
 import streamlit as st
 from openpyxl import load_workbook
 
+from modules.aggregates import AggregateStore, TrackedSheets
+from modules.artifact_cache import ArtifactCache
+from modules.columnar_store import PYARROW_AVAILABLE, export_project, import_project
+from modules.db_maintenance import (MaintenanceScheduler,
+                                    enable_incremental_vacuum)
 from modules.enhanced_search import AdvancedSearch, SmartFilter
+from modules.event_logger import get_event_logger
+from modules.formula_engine import FormulaError, compile_formula
+from modules.job_runner import FINISHED_STATUSES, format_job_time, get_job_runner
+from modules.measurements import nlbh_quantity
+from modules.pdf_report import (PYPDF_AVAILABLE, abstracts_story,
+                                build_streaming, measurements_story,
+                                render_parallel_report, report_document)
+from modules.rate_rollup import RateRollupEngine
 # Import performance and security modules
 from modules.performance_optimizer import (BackupManager, DataValidator,
                                            PerformanceOptimizer)
@@ -110,14 +124,48 @@ logger.info("Application started")
 MAX_FILE_SIZE_MB = 5
 MAX_ROWS = 10000
 
+# Bridge/building estimating engine shares its rate book registry with this app
+ENGINE_SRC_DIR = Path(__file__).parent / "estimate" / "src"
+
+
+@st.cache_resource
+def get_engine_rate_registry():
+    """Engine rate book registry, loaded once per server process"""
+    import sys
+    if str(ENGINE_SRC_DIR) not in sys.path:
+        sys.path.append(str(ENGINE_SRC_DIR))
+    from engine.ratebook import get_registry
+    return get_registry()
+
+
+@st.cache_resource
+def get_background_jobs():
+    """Background job runner shared by all sessions of this server process"""
+    return get_job_runner("jobs.db", artifact_dir="job_artifacts", per_user_limit=2)
+
+
+@st.cache_resource
+def get_backup_manager():
+    """Backup manager shared by all sessions, so backups of the same folder never overlap"""
+    return BackupManager()
+
+
+@st.cache_resource
+def get_maintenance_scheduler():
+    """Single maintenance thread per server process; sessions register their databases"""
+    scheduler = MaintenanceScheduler(get_backup_manager())
+    scheduler.start()
+    return scheduler
+
 # Page configuration
 st.set_page_config(
     page_title="Ultimate Construction Estimation System",
     page_icon="🏗️",
     layout="wide",
     initial_sidebar_state="expanded"
-)# ===
-==========================================================================
+)
+
+# =============================================================================
 # DATA MODELS
 # =============================================================================
 
@@ -256,6 +304,9 @@ class SmartIntegratedDatabase:
     def init_database(self):
         """Initialize smart integrated database with ALL advanced tables from subfolders"""
         try:
+            # Lets the scheduled incremental_vacuum task reclaim free pages
+            enable_incremental_vacuum(self.db_path)
+            
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -719,18 +770,16 @@ class SmartIntegratedDatabase:
             return []
     
     def log_activity(self, user_id: str, project_id: str, action: str, details: str):
-        """Log user activity"""
+        """Log user activity (buffered, written in batches by the event logger)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO activity_logs (id, user_id, project_id, action, details, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (str(uuid.uuid4()), user_id, project_id, action, details, datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
+            get_event_logger(self.db_path).log(
+                action=action,
+                entity_type='project',
+                entity_id=project_id,
+                user_id=user_id,
+                details=details,
+                project_id=project_id
+            )
             
         except Exception as e:
             logger.error(f"❌ Error logging activity: {e}")
@@ -1349,8 +1398,9 @@ class FormulaPreservationEngine:
         # Simple regex to find cell references (A1, B2, etc.)
         cell_pattern = r'[A-Z]+\d+'
         dependencies = re.findall(cell_pattern, formula)
-        return list(set(dependencies))  # Remove duplicates# ====
-=========================================================================
+        return list(set(dependencies))  # Remove duplicates
+
+# =============================================================================
 # ULTIMATE PDF GENERATOR
 # =============================================================================
 
@@ -1362,34 +1412,33 @@ class UltimatePDFGenerator:
         self.styles = getSampleStyleSheet() if REPORTLAB_AVAILABLE else None
     
     def generate_comprehensive_report(self, project_data: Dict, measurements: Dict, 
-                                    abstracts: Dict, output_path: str) -> bool:
-        """Generate comprehensive project report"""
+                                    abstracts: Dict, output_path: str,
+                                    parallel: bool = False, workers: Optional[int] = None) -> bool:
+        """Generate comprehensive project report
+        
+        With parallel=True each measurement/abstract sheet is rendered in a
+        process pool and the parts are merged with a table of contents and
+        page numbers (requires pypdf).
+        """
         if not self.available:
             return False
         
         try:
-            doc = SimpleDocTemplate(output_path, pagesize=A4, 
-                                  rightMargin=72, leftMargin=72, 
-                                  topMargin=72, bottomMargin=18)
-            elements = []
-            
-            # Title page
-            elements.extend(self._create_title_page(project_data))
-            
-            # Project summary
-            elements.extend(self._create_project_summary(project_data))
-            
-            # Cost analysis with charts
-            elements.extend(self._create_cost_analysis(abstracts))
-            
-            # Detailed measurements
-            elements.extend(self._create_measurements_section(measurements))
+            if parallel and PYPDF_AVAILABLE:
+                pages = render_parallel_report(
+                    output_path,
+                    self._create_title_page(project_data),
+                    list(self._create_project_summary(project_data)) + list(self._create_cost_analysis(abstracts)),
+                    dict(measurements), dict(abstracts), workers=workers
+                )
+                logger.info(f"✅ Comprehensive PDF generated in parallel: {output_path} ({pages} pages)")
+                return True
             
-            # Abstract of costs
-            elements.extend(self._create_abstracts_section(abstracts))
+            doc = report_document(output_path)
             
-            # Build PDF
-            doc.build(elements)
+            # Sections are produced lazily; measurement and abstract tables
+            # are formatted and chunked only as the build reaches them
+            build_streaming(doc, self._report_story(project_data, measurements, abstracts))
             
             logger.info(f"✅ Comprehensive PDF generated: {output_path}")
             return True
@@ -1398,6 +1447,23 @@ class UltimatePDFGenerator:
             logger.error(f"❌ PDF generation failed: {e}")
             return False
     
+    def _report_story(self, project_data: Dict, measurements: Dict, abstracts: Dict) -> Iterator:
+        """Flowables of the comprehensive report, in order"""
+        # Title page
+        yield from self._create_title_page(project_data)
+        
+        # Project summary
+        yield from self._create_project_summary(project_data)
+        
+        # Cost analysis with charts
+        yield from self._create_cost_analysis(abstracts)
+        
+        # Detailed measurements
+        yield from self._create_measurements_section(measurements)
+        
+        # Abstract of costs
+        yield from self._create_abstracts_section(abstracts)
+    
     def _create_title_page(self, project_data: Dict) -> List:
         """Create professional title page"""
         elements = []
@@ -1490,9 +1556,13 @@ class UltimatePDFGenerator:
             cost_data = []
             total_cost = 0
             
+            store = getattr(abstracts, 'store', None)
             for sheet_name, df in abstracts.items():
                 if not df.empty:
-                    sheet_total = df['amount'].sum()
+                    if store is not None:
+                        sheet_total = store.sheet('abstracts', sheet_name)['amount']
+                    else:
+                        sheet_total = df['amount'].sum()
                     cost_data.append([sheet_name, f"₹{sheet_total:,.2f}"])
                     total_cost += sheet_total
             
@@ -1518,101 +1588,13 @@ class UltimatePDFGenerator:
         elements.append(Spacer(1, 0.5*inch))
         return elements
     
-    def _create_measurements_section(self, measurements: Dict) -> List:
-        """Create detailed measurements section"""
-        elements = []
-        
-        elements.append(Paragraph("DETAILED MEASUREMENTS", self.styles['Heading1']))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        for sheet_name, df in measurements.items():
-            if df.empty:
-                continue
-            
-            elements.append(Paragraph(f"Sheet: {sheet_name}", self.styles['Heading2']))
-            
-            # Create measurements table
-            table_data = [['S.No.', 'Description', 'Qty', 'L', 'B', 'H', 'Unit', 'Total']]
-            
-            for idx, row in df.iterrows():
-                table_data.append([
-                    str(row.get('item_no', idx + 1)),
-                    str(row.get('description', ''))[:50] + ('...' if len(str(row.get('description', ''))) > 50 else ''),
-                    f"{row.get('quantity', 0):.2f}",
-                    f"{row.get('length', 0):.2f}",
-                    f"{row.get('breadth', 0):.2f}",
-                    f"{row.get('height', 0):.2f}",
-                    str(row.get('unit', '')),
-                    f"{row.get('total', 0):.3f}"
-                ])
-            
-            measurements_table = Table(table_data, 
-                                     colWidths=[0.5*inch, 2.5*inch, 0.5*inch, 0.5*inch, 
-                                               0.5*inch, 0.5*inch, 0.5*inch, 0.8*inch])
-            measurements_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            
-            elements.append(measurements_table)
-            elements.append(Spacer(1, 0.3*inch))
-        
-        return elements
+    def _create_measurements_section(self, measurements: Dict) -> Iterator:
+        """Create detailed measurements section as page-sized table chunks"""
+        return measurements_story(measurements, self.styles)
     
-    def _create_abstracts_section(self, abstracts: Dict) -> List:
-        """Create abstract of costs section"""
-        elements = []
-        
-        elements.append(Paragraph("ABSTRACT OF COSTS", self.styles['Heading1']))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        for sheet_name, df in abstracts.items():
-            if df.empty:
-                continue
-            
-            elements.append(Paragraph(f"Sheet: {sheet_name}", self.styles['Heading2']))
-            
-            # Create abstract table
-            table_data = [['S.No.', 'Description', 'Unit', 'Quantity', 'Rate', 'Amount']]
-            
-            for idx, row in df.iterrows():
-                table_data.append([
-                    str(idx + 1),
-                    str(row.get('description', ''))[:40] + ('...' if len(str(row.get('description', ''))) > 40 else ''),
-                    str(row.get('unit', '')),
-                    f"{row.get('quantity', 0):.2f}",
-                    f"₹{row.get('rate', 0):.2f}",
-                    f"₹{row.get('amount', 0):.2f}"
-                ])
-            
-            # Add total row
-            total_amount = df['amount'].sum()
-            table_data.append(['', 'TOTAL', '', '', '', f"₹{total_amount:,.2f}"])
-            
-            abstract_table = Table(table_data, 
-                                 colWidths=[0.5*inch, 2.5*inch, 0.8*inch, 0.8*inch, 1*inch, 1.2*inch])
-            abstract_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (1, 1), (1, -2), 'LEFT'),
-                ('ALIGN', (4, 1), (-1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            
-            elements.append(abstract_table)
-            elements.append(Spacer(1, 0.3*inch))
-        
-        return elements
+    def _create_abstracts_section(self, abstracts: Dict) -> Iterator:
+        """Create abstract of costs section as page-sized table chunks"""
+        return abstracts_story(abstracts, self.styles)
 
 # =============================================================================
 # GESTIMATOR INTEGRATION
@@ -1676,7 +1658,6 @@ class GEstimatorIntegration:
             return {'error': 'Template not found'}
         
         try:
-            # Simple formula evaluation (in production, use a proper expression evaluator)
             result = self._evaluate_template_formula(template['formula'], inputs)
             
             return {
@@ -1691,36 +1672,19 @@ class GEstimatorIntegration:
         except Exception as e:
             return {'error': f'Template calculation failed: {str(e)}'}
     
+    def apply_template_rows(self, template_id: str, rows) -> np.ndarray:
+        """Apply a template to many measurement rows (DataFrame or dict of columns) at once"""
+        template = next((t for t in self.load_gestimator_templates() if t['id'] == template_id), None)
+        if not template:
+            raise ValueError(f"Template not found: {template_id}")
+        return compile_formula(template['formula']).evaluate(rows)
+    
     def _evaluate_template_formula(self, formula: str, inputs: Dict) -> float:
-        """Safely evaluate template formula"""
-        # Replace variables in formula with actual values
-        eval_formula = formula
-        for key, value in inputs.items():
-            eval_formula = eval_formula.replace(key, str(value))
-        
-        # Replace common mathematical operations
-        eval_formula = eval_formula.replace('^', '**')  # Power operator
-        
-        # Safe evaluation (in production, use a proper math expression evaluator)
+        """Safely evaluate template formula (parsed and compiled once per formula)"""
         try:
-            import math
-
-            # Add math functions to the evaluation context
-            safe_dict = {
-                '__builtins__': {},
-                'math': math,
-                'pi': math.pi,
-                'sqrt': math.sqrt,
-                'pow': pow,
-                'abs': abs,
-                'round': round
-            }
-            
-            result = eval(eval_formula, safe_dict)
-            return float(result)
-        
-        except Exception as e:
-            raise ValueError(f"Formula evaluation error: {str(e)}")
+            return float(compile_formula(formula).evaluate(inputs))
+        except FormulaError as e:
+            raise ValueError(str(e))
 
 # =============================================================================
 # SESSION STATE INITIALIZATION
@@ -1772,7 +1736,14 @@ def initialize_smart_integrated_session_state():
             st.session_state.security_manager = SecurityManager(st.session_state.database, security_config)
         
         if 'backup_manager' not in st.session_state:
-            st.session_state.backup_manager = BackupManager()
+            st.session_state.backup_manager = get_backup_manager()
+        
+        if 'artifact_cache' not in st.session_state:
+            # Generated reports are reused while project data and options are unchanged
+            st.session_state.artifact_cache = ArtifactCache("artifact_cache")
+        
+        # Incremental backups plus PRAGMA optimize/ANALYZE/incremental_vacuum in the background
+        get_maintenance_scheduler().add_database(st.session_state._database.db_path)
         
         if 'data_validator' not in st.session_state:
             st.session_state.data_validator = DataValidator()
@@ -1783,11 +1754,14 @@ def initialize_smart_integrated_session_state():
         if 'current_project' not in st.session_state:
             st.session_state.current_project = None
         
+        if 'aggregates' not in st.session_state:
+            st.session_state.aggregates = AggregateStore()
+        
         if 'measurements' not in st.session_state:
-            st.session_state.measurements = {}
+            st.session_state.measurements = TrackedSheets(st.session_state.aggregates, 'measurements')
         
         if 'abstracts' not in st.session_state:
-            st.session_state.abstracts = {}
+            st.session_state.abstracts = TrackedSheets(st.session_state.aggregates, 'abstracts')
         
         if 'ssr_items' not in st.session_state:
             st.session_state.ssr_items = st.session_state._database.load_enhanced_ssr_items()
@@ -1797,8 +1771,11 @@ def initialize_smart_integrated_session_state():
             st.session_state.import_history = deque(maxlen=100)  # Limit to 100 entries to prevent memory leak
         
         if 'user_session' not in st.session_state:
+            # Keep the id in the URL so background jobs are still listed after a reload
+            if 'uid' not in st.query_params:
+                st.query_params['uid'] = str(uuid.uuid4())
             st.session_state.user_session = {
-                'user_id': str(uuid.uuid4()),
+                'user_id': st.query_params['uid'],
                 'username': 'Guest User',
                 'role': 'user',
                 'login_time': datetime.now().isoformat()
@@ -1824,6 +1801,72 @@ def initialize_smart_integrated_session_state():
 # ENHANCED APPLICATION PAGES
 # =============================================================================
 
+def _project_sheets_dir(project_id: str) -> Path:
+    return Path(st.session_state._database.db_path).parent / "project_sheets" / str(project_id)
+
+
+def save_project_sheets(project_id: str):
+    """Keep a project's measurement and abstract sheets so reopening it restores them"""
+    sheets = {'measurements': dict(st.session_state.measurements),
+              'abstracts': dict(st.session_state.abstracts)}
+    st.session_state.setdefault('_project_sheets', {})[project_id] = sheets
+    if PYARROW_AVAILABLE and (sheets['measurements'] or sheets['abstracts']):
+        try:
+            export_project(_project_sheets_dir(project_id), {'id': project_id},
+                           sheets['measurements'], sheets['abstracts'])
+        except Exception as e:
+            logger.error(f"❌ Could not save sheets for project {project_id}: {e}")
+
+
+def load_project_sheets(project_id: str) -> Optional[Dict[str, Dict[str, pd.DataFrame]]]:
+    """Sheets saved for a project (this session first, then disk), or None"""
+    cached = st.session_state.get('_project_sheets', {}).get(project_id)
+    if cached is not None:
+        return cached
+    folder = _project_sheets_dir(project_id)
+    if PYARROW_AVAILABLE and folder.exists():
+        try:
+            loaded = import_project(str(folder))
+            return {'measurements': loaded['measurements'], 'abstracts': loaded['abstracts']}
+        except Exception as e:
+            logger.error(f"❌ Could not load sheets for project {project_id}: {e}")
+    return None
+
+
+def open_project_aggregates(project: Optional[Project]):
+    """Switch the session's sheets and running totals to a project.
+
+    The outgoing project's sheets are saved and the incoming project's are
+    restored; sheets loaded before any project was opened stay with the first
+    one. Totals are rebuilt from the sheets when there are any, otherwise the
+    project's saved totals are loaded. The store saves itself on every edit.
+    """
+    project_id = project.id if project else None
+    previous_id = st.session_state.get('_aggregates_project_id')
+    if previous_id == project_id:
+        return
+    if previous_id:
+        save_project_sheets(previous_id)
+
+    sheets = load_project_sheets(project_id) if project_id else None
+    if sheets is None:
+        sheets = ({'measurements': dict(st.session_state.measurements),
+                   'abstracts': dict(st.session_state.abstracts)}
+                  if previous_id is None else {'measurements': {}, 'abstracts': {}})
+
+    db_path = st.session_state._database.db_path
+    if project_id and not (sheets['measurements'] or sheets['abstracts']):
+        store = AggregateStore.load(db_path, project_id)
+    else:
+        store = AggregateStore()
+    if project_id:
+        store.attach(db_path, project_id)
+    st.session_state.aggregates = store
+    st.session_state.measurements = TrackedSheets(store, 'measurements', sheets['measurements'])
+    st.session_state.abstracts = TrackedSheets(store, 'abstracts', sheets['abstracts'])
+    st.session_state._aggregates_project_id = project_id
+
+
 def show_smart_integrated_dashboard():
     """Smart integrated dashboard with modern interface from new_guide_EstimateFinal"""
     st.title("🏗️ Smart Integrated Construction Dashboard")
@@ -1835,11 +1878,16 @@ def show_smart_integrated_dashboard():
         projects = st.session_state._database.load_projects()
         if projects:
             project_options = {f"{p.name} ({p.location})": p for p in projects}
-            selected_project_key = st.selectbox("📁 Select Project", list(project_options.keys()))
+            # Keep the open project selected when returning to the dashboard
+            current_id = getattr(st.session_state.current_project, 'id', None)
+            keys = list(project_options.keys())
+            selected_index = next((i for i, key in enumerate(keys) if project_options[key].id == current_id), 0)
+            selected_project_key = st.selectbox("📁 Select Project", keys, index=selected_index)
             st.session_state.current_project = project_options[selected_project_key]
         else:
             st.info("No projects found. Create a new project to get started.")
             st.session_state.current_project = None
+        open_project_aggregates(st.session_state.current_project)
     
     with col2:
         if st.button("➕ New Project", type="primary"):
@@ -1911,14 +1959,11 @@ def show_smart_integrated_dashboard():
         col1, col2, col3, col4, col5, col6 = st.columns(6)
         
         # Calculate metrics
-        total_measurements = sum(len(df) for df in st.session_state.measurements.values())
-        total_abstracts = sum(len(df) for df in st.session_state.abstracts.values())
-        total_cost = sum(df['amount'].sum() for df in st.session_state.abstracts.values() if not df.empty)
-        ssr_matches = sum(
-            (df['ssr_match_confidence'] > 0.6).sum() 
-            for df in st.session_state.measurements.values() 
-            if not df.empty and 'ssr_match_confidence' in df.columns
-        )
+        aggregates = st.session_state.aggregates
+        total_measurements = int(aggregates.total('measurements', 'count'))
+        total_abstracts = int(aggregates.total('abstracts', 'count'))
+        total_cost = aggregates.total('abstracts', 'amount')
+        ssr_matches = int(aggregates.total('measurements', 'matched'))
         
         with col1:
             st.metric("📏 Measurements", total_measurements)
@@ -2457,12 +2502,11 @@ def show_ultimate_excel_import():
                     enhanced_progress_callback
                 )
                 
-                # Update session state
-                for sheet_name, measurements_df in estimate_data['measurements'].items():
-                    st.session_state.measurements[sheet_name] = measurements_df
-                
-                for sheet_name, abstracts_df in estimate_data['abstracts'].items():
-                    st.session_state.abstracts[sheet_name] = abstracts_df
+                # Update session state (running totals are saved with the project)
+                open_project_aggregates(st.session_state.current_project)
+                st.session_state.measurements.update(estimate_data['measurements'])
+                st.session_state.abstracts.update(estimate_data['abstracts'])
+                save_project_sheets(st.session_state.current_project.id)
                 
                 # Add to history with enhanced details
                 import_record = {
@@ -2533,8 +2577,9 @@ def show_ultimate_excel_import():
             
             finally:
                 if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)de
-f show_gestimator_templates():
+                    os.unlink(tmp_path)
+
+def show_gestimator_templates():
     """GEstimator dynamic templates page"""
     st.title("📐 GEstimator Dynamic Templates")
     
@@ -2926,6 +2971,9 @@ def show_ultimate_pdf_generator():
         include_charts = st.checkbox("📊 Include Charts", value=True)
         include_branding = st.checkbox("🏢 Include Company Branding", value=False)
         detailed_breakdown = st.checkbox("🔍 Detailed Breakdown", value=True)
+        parallel_render = st.checkbox("⚡ Render Sheets in Parallel", value=False,
+                                      help="Render each sheet in a separate process and merge, "
+                                           "with a table of contents and page numbers")
     
     with col2:
         page_orientation = st.selectbox("📄 Page Orientation", ["Portrait", "Landscape"])
@@ -2948,23 +2996,50 @@ def show_ultimate_pdf_generator():
                     'total_area': project.total_area,
                     'floors': project.floors,
                     'description': project.description,
-                    'total_cost': sum(df['amount'].sum() for df in st.session_state.abstracts.values() if not df.empty)
+                    'total_cost': st.session_state.aggregates.total('abstracts', 'amount')
                 }
                 
                 # Generate filename
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 filename = f"{selected_report.replace(' ', '_')}_{project.name.replace(' ', '_')}_{timestamp}.pdf"
                 
-                # Generate PDF
-                success = st.session_state.pdf_generator.generate_comprehensive_report(
-                    project_data,
-                    st.session_state.measurements,
-                    st.session_state.abstracts,
-                    filename
+                # Generate PDF, or reuse the last one built from identical data and options
+                report_options = {
+                    'report_type': selected_report,
+                    'include_charts': include_charts,
+                    'include_branding': include_branding,
+                    'detailed_breakdown': detailed_breakdown,
+                    'page_orientation': page_orientation,
+                    'font_size': font_size,
+                    'color_scheme': color_scheme,
+                    'parallel': parallel_render,
+                    # The title page carries the generation date
+                    'date': datetime.now().strftime('%d/%m/%Y')
+                }
+                success, from_cache = st.session_state.artifact_cache.export(
+                    'comprehensive_pdf',
+                    {
+                        'project': project_data,
+                        'measurements': st.session_state.measurements,
+                        'abstracts': st.session_state.abstracts
+                    },
+                    filename,
+                    lambda path: st.session_state.pdf_generator.generate_comprehensive_report(
+                        project_data,
+                        st.session_state.measurements,
+                        st.session_state.abstracts,
+                        path,
+                        parallel=parallel_render
+                    ),
+                    options=report_options,
+                    scope=f"project:{project.name}"
                 )
                 
                 if success:
-                    st.success(f"✅ PDF report generated successfully!")
+                    if from_cache:
+                        st.success("⚡ PDF report served from cache (project data unchanged)")
+                    else:
+                        st.success(f"✅ PDF report generated successfully!")
                     
                     # Provide download
                     try:
@@ -3001,6 +3076,14 @@ def show_ultimate_pdf_generator():
             st.error(f"❌ Error generating PDF: {str(e)}")
             logger.error(f"PDF generation error: {e}", exc_info=True)
     
+    cache_stats = st.session_state.artifact_cache.stats()
+    cache_cols = st.columns(3)
+    cache_cols[0].metric("⚡ Report Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}",
+                         help=f"{int(cache_stats['hits'])} of {int(cache_stats['requests'])} requests")
+    cache_cols[1].metric("💾 Bytes Saved", f"{cache_stats['bytes_saved'] / 1024 / 1024:.1f} MB")
+    cache_cols[2].metric("🗄️ Cache Size",
+                         f"{cache_stats['size_bytes'] / 1024 / 1024:.1f} / {cache_stats['max_bytes'] / 1024 / 1024:.0f} MB")
+    
     # PDF generation history
     st.subheader("📚 Recent PDF Reports")
     
@@ -3235,18 +3318,21 @@ def main():
             "📊 Advanced Analytics",
             "👥 Collaboration Hub",
             "🔄 Version Control",
+            "⏳ Background Jobs",          # NEW: Long imports/exports off the script thread
             "⚙️ System Settings"
         ])
         
         # Quick stats
         if st.session_state.current_project:
             st.markdown("### 📊 Quick Stats")
-            total_cost = sum(df['amount'].sum() for df in st.session_state.abstracts.values() if not df.empty)
-            total_measurements = sum(len(df) for df in st.session_state.measurements.values())
+            total_cost = st.session_state.aggregates.total('abstracts', 'amount')
+            total_measurements = int(st.session_state.aggregates.total('measurements', 'count'))
             
             st.metric("💰 Total Cost", f"₹{total_cost:,.0f}")
             st.metric("📏 Measurements", total_measurements)
             st.metric("📥 Imports", len(st.session_state.import_history))
+        
+        render_job_status_badge()
     
     # Route to pages
     if page == "🏠 Smart Dashboard":
@@ -3287,6 +3373,8 @@ def main():
         show_collaboration_hub()
     elif page == "🔄 Version Control":
         show_version_control()
+    elif page == "⏳ Background Jobs":
+        show_background_jobs()
     elif page == "⚙️ System Settings":
         show_system_settings()
 
@@ -3323,30 +3411,22 @@ def show_enhanced_measurements():
     if selected_sheet:
         # Use lazy loading for measurements
         measurements_df = PerformanceOptimizer.load_measurements(selected_sheet)
+        sheet_totals = st.session_state.aggregates.sheet('measurements', selected_sheet)
         
-        # Modern metrics display
+        # Modern metrics display (maintained incrementally, not recomputed per rerun)
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("📏 Total Items", len(measurements_df))
+            st.metric("📏 Total Items", int(sheet_totals['count']))
         
         with col2:
-            total_qty = measurements_df['total'].sum() if 'total' in measurements_df.columns else 0
-            st.metric("📦 Total Quantity", f"{total_qty:.2f}")
+            st.metric("📦 Total Quantity", f"{sheet_totals['quantity']:.2f}")
         
         with col3:
-            if 'ssr_match_confidence' in measurements_df.columns:
-                matched_items = (measurements_df['ssr_match_confidence'] > 0.6).sum()
-                st.metric("🎯 SSR Matched", f"{matched_items}/{len(measurements_df)}")
-            else:
-                st.metric("🎯 SSR Matched", "0/0")
+            st.metric("🎯 SSR Matched", f"{int(sheet_totals['matched'])}/{int(sheet_totals['count'])}")
         
         with col4:
-            if 'amount' in measurements_df.columns:
-                total_amount = measurements_df['amount'].sum()
-                st.metric("💰 Total Amount", f"₹{total_amount:,.2f}")
-            else:
-                st.metric("💰 Total Amount", "₹0")
+            st.metric("💰 Total Amount", f"₹{sheet_totals['amount']:,.2f}")
         
         # Enhanced data display with modern styling
         st.subheader(f"📊 {selected_sheet} - Detailed View")
@@ -3495,14 +3575,7 @@ def show_enhanced_measurements():
                     new_remarks = st.text_input("Remarks", placeholder="Optional remarks")
                 
                 # Calculate quantity
-                if new_length > 0 and new_breadth > 0 and new_height > 0:
-                    calc_qty = new_nos * new_length * new_breadth * new_height
-                elif new_length > 0 and new_breadth > 0:
-                    calc_qty = new_nos * new_length * new_breadth
-                elif new_length > 0:
-                    calc_qty = new_nos * new_length
-                else:
-                    calc_qty = new_nos
+                calc_qty = nlbh_quantity(new_nos, new_length, new_breadth, new_height)
                 
                 st.info(f"Calculated Quantity: {calc_qty:.3f} {new_unit}")
                 st.info(f"Calculated Amount: ₹{calc_qty * new_rate:,.2f}")
@@ -3563,14 +3636,7 @@ def show_enhanced_measurements():
                             mod_remarks = st.text_input("Remarks", value=str(item.get('remarks', '')))
                         
                         # Calculate new quantity
-                        if mod_length > 0 and mod_breadth > 0 and mod_height > 0:
-                            calc_qty = mod_nos * mod_length * mod_breadth * mod_height
-                        elif mod_length > 0 and mod_breadth > 0:
-                            calc_qty = mod_nos * mod_length * mod_breadth
-                        elif mod_length > 0:
-                            calc_qty = mod_nos * mod_length
-                        else:
-                            calc_qty = mod_nos
+                        calc_qty = nlbh_quantity(mod_nos, mod_length, mod_breadth, mod_height)
                         
                         st.info(f"New Quantity: {calc_qty:.3f} {mod_unit} | New Amount: ₹{calc_qty * mod_rate:,.2f}")
                         
@@ -3706,24 +3772,23 @@ def show_smart_abstracts():
     
     if selected_sheet:
         abstracts_df = st.session_state.abstracts[selected_sheet]
+        sheet_totals = st.session_state.aggregates.sheet('abstracts', selected_sheet)
         
         # Enhanced metrics
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("📊 Total Items", len(abstracts_df))
+            st.metric("📊 Total Items", int(sheet_totals['count']))
         
         with col2:
-            total_qty = abstracts_df['quantity'].sum() if 'quantity' in abstracts_df.columns else 0
-            st.metric("📦 Total Quantity", f"{total_qty:.2f}")
+            st.metric("📦 Total Quantity", f"{sheet_totals['quantity']:.2f}")
         
         with col3:
-            avg_rate = abstracts_df['rate'].mean() if 'rate' in abstracts_df.columns else 0
+            avg_rate = sheet_totals['rate_sum'] / sheet_totals['count'] if sheet_totals['count'] else 0
             st.metric("📊 Average Rate", f"₹{avg_rate:.2f}")
         
         with col4:
-            total_amount = abstracts_df['amount'].sum() if 'amount' in abstracts_df.columns else 0
-            st.metric("💰 Sheet Total", f"₹{total_amount:,.2f}")
+            st.metric("💰 Sheet Total", f"₹{sheet_totals['amount']:,.2f}")
         
         # Enhanced visualization
         if len(abstracts_df) > 0:
@@ -3752,7 +3817,11 @@ def show_smart_abstracts():
                 if 'amount' in abstracts_df.columns:
                     # Group by category if available, otherwise by description
                     if 'category' in abstracts_df.columns:
-                        cost_by_category = abstracts_df.groupby('category')['amount'].sum().reset_index()
+                        cost_by_category = pd.DataFrame([
+                            {'category': category, 'amount': values['amount']}
+                            for category, values in st.session_state.aggregates.sheet_groups(
+                                'abstracts', selected_sheet, 'category').items()
+                        ])
                         fig_pie = px.pie(cost_by_category, values='amount', names='category', title="Cost by Category")
                     else:
                         # Use top 8 items for pie chart
@@ -4092,6 +4161,14 @@ def show_system_settings():
                 
                 for key, value in stats.items():
                     st.metric(key, value)
+            
+            # Activity/audit log pipeline backpressure
+            log_metrics = get_event_logger(st.session_state._database.db_path).metrics()
+            st.caption(
+                f"Event log: {log_metrics['queue_depth']}/{log_metrics['capacity']} queued, "
+                f"{log_metrics['flushed']} written in {log_metrics['flush_count']} batches, "
+                f"{log_metrics['backpressure_flushes']} backpressure stalls, last flush {log_metrics['last_flush_ms']:.1f} ms"
+            )
     
     with col3:
         if st.button("🧹 Optimize System"):
@@ -4107,6 +4184,45 @@ def show_system_settings():
             st.success("✅ System optimized!")
             st.rerun()
     
+    # Columnar project data for BI tools
+    st.subheader("🧱 Project Data (Parquet)")
+    
+    if not PYARROW_AVAILABLE:
+        st.info("Install pyarrow to enable Parquet export/import")
+    else:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button("🧱 Export Project as Parquet"):
+                project = st.session_state.current_project
+                project_info = asdict(project) if project else {}
+                with tempfile.TemporaryDirectory() as export_dir:
+                    paths = export_project(export_dir, project_info,
+                                           st.session_state.measurements, st.session_state.abstracts)
+                    buffer = io.BytesIO()
+                    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+                        for path in paths.values():
+                            archive.write(path, os.path.basename(path))
+                st.download_button("📥 Download Parquet (.zip)", buffer.getvalue(),
+                                   file_name=f"{(project.name if project else 'project').replace(' ', '_')}_parquet.zip",
+                                   mime="application/zip")
+        
+        with col2:
+            parquet_zip = st.file_uploader("📤 Load Project from Parquet (.zip)", type=['zip'])
+            if parquet_zip and st.button("📥 Load Parquet Project"):
+                with tempfile.TemporaryDirectory() as import_dir:
+                    with zipfile.ZipFile(parquet_zip) as archive:
+                        for name in archive.namelist():
+                            if name.endswith('.parquet') and '/' not in name:
+                                archive.extract(name, import_dir)
+                    loaded = import_project(import_dir)
+                st.session_state.measurements.clear()
+                st.session_state.measurements.update(loaded['measurements'])
+                st.session_state.abstracts.clear()
+                st.session_state.abstracts.update(loaded['abstracts'])
+                st.success(f"✅ Loaded {len(loaded['measurements'])} measurement and "
+                           f"{len(loaded['abstracts'])} abstract sheets")
+    
     # Backup management
     st.subheader("📂 Backup Management")
     
@@ -4120,6 +4236,7 @@ def show_system_settings():
             use_container_width=True,
             column_config={
                 'filename': st.column_config.TextColumn('Backup File'),
+                'kind': st.column_config.TextColumn('Type'),
                 'size_mb': st.column_config.NumberColumn('Size (MB)', format='%.2f'),
                 'created_date': st.column_config.DatetimeColumn('Created'),
                 'age_hours': st.column_config.NumberColumn('Age (Hours)', format='%.1f')
@@ -4148,6 +4265,77 @@ def show_system_settings():
                     st.error(f"❌ Restore error: {str(e)}")
     else:
         st.info("No backups available")
+    
+    # Scheduled maintenance
+    st.subheader("🛠️ Maintenance Runs")
+    
+    task_labels = {
+        'incremental_backup': "📦 Incremental Backup",
+        'optimize': "⚡ PRAGMA optimize",
+        'analyze': "📈 ANALYZE",
+        'incremental_vacuum': "🧽 Incremental Vacuum"
+    }
+    task_cols = st.columns(len(task_labels))
+    for col, (task, label) in zip(task_cols, task_labels.items()):
+        with col:
+            if st.button(label, key=f"maintenance_{task}"):
+                try:
+                    run = st.session_state.backup_manager.run_task(
+                        st.session_state._database.db_path, task)
+                    st.success(f"✅ {task} finished in {run.duration_s:.2f}s")
+                except Exception as e:
+                    st.error(f"❌ {task} failed: {str(e)}")
+    
+    runs = st.session_state.backup_manager.recent_runs()
+    if runs:
+        runs_df = pd.DataFrame(runs)[['started_at', 'task', 'status', 'duration_s', 'bytes_written', 'detail']]
+        runs_df['kb_written'] = runs_df['bytes_written'] / 1024
+        st.dataframe(
+            runs_df.drop(columns=['bytes_written']),
+            use_container_width=True,
+            column_config={
+                'started_at': st.column_config.DatetimeColumn('Started'),
+                'task': st.column_config.TextColumn('Task'),
+                'status': st.column_config.TextColumn('Status'),
+                'duration_s': st.column_config.NumberColumn('Duration (s)', format='%.3f'),
+                'kb_written': st.column_config.NumberColumn('Written (KB)', format='%.1f'),
+                'detail': st.column_config.TextColumn('Detail')
+            }
+        )
+    else:
+        st.info("No maintenance runs recorded yet")
+    
+    st.subheader("🧮 Aggregate Totals")
+    aggregates = st.session_state.aggregates
+    st.caption(
+        f"Syncs: {aggregates.stats['syncs']} · Rows applied: {aggregates.stats['rows_applied']} · "
+        f"Full rebuilds: {aggregates.stats['full_rebuilds']}"
+    )
+    if st.button("🔎 Audit Totals Against Full Recompute"):
+        mismatches = aggregates.audit({
+            'measurements': dict(st.session_state.measurements),
+            'abstracts': dict(st.session_state.abstracts)
+        })
+        if mismatches:
+            st.error(f"❌ {len(mismatches)} aggregate mismatches")
+            st.code("\n".join(mismatches[:20]))
+        else:
+            st.success("✅ All maintained totals match a full recompute")
+    
+    st.subheader("🧾 SSR Rate Roll-up")
+    st.caption("Recompute derived SSR rates from their component rates and save the ones that changed")
+    if st.button("🔁 Roll Up SSR Rates"):
+        try:
+            engine = RateRollupEngine.from_db(st.session_state._database.db_path)
+            engine.compute_all()
+            written = engine.write_back(st.session_state._database.db_path)
+            t = engine.timings
+            st.success(
+                f"✅ {written} derived SSR rates changed · build {t['build_s']:.3f}s · "
+                f"roll-up {t['full_rollup_s']:.3f}s · write {t['write_back_s']:.3f}s"
+            )
+        except Exception as e:
+            st.error(f"❌ Rate roll-up failed: {str(e)}")
 
 # =============================================================================
 # NEW: SSR/BSR RATE FINDER
@@ -4171,11 +4359,12 @@ def show_ssr_bsr_rate_finder():
     db = st.session_state.ssr_bsr_db
     
     # Tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "🔍 Search Rates",
         "📊 Rate Comparison",
         "📚 Browse SSR",
-        "📚 Browse BSR"
+        "📚 Browse BSR",
+        "📘 Engine Rate Books"
     ])
     
     # Tab 1: Search Rates
@@ -4381,6 +4570,28 @@ def show_ssr_bsr_rate_finder():
                 )
         else:
             st.info("No BSR data available")
+    
+    # Tab 5: Rate books used by the bridge/building engine
+    with tab5:
+        st.subheader("📘 Engine Rate Books")
+        
+        try:
+            registry = get_engine_rate_registry()
+            books = registry.list_books()
+        except Exception as e:
+            st.error(f"❌ Could not load rate books: {str(e)}")
+            books = []
+        
+        if books:
+            st.dataframe(pd.DataFrame(books), use_container_width=True)
+            
+            selected_key = st.selectbox("Rate Book", [b['key'] for b in books], key="engine_rate_book")
+            book = registry.books[selected_key]
+            book_df = book.as_frame().reset_index()
+            st.write(f"**{book.region} {book.source.upper()} {book.year}:** {len(book_df)} items")
+            st.dataframe(book_df, use_container_width=True)
+        else:
+            st.info("No engine rate books found")
 
 
 if __name__ == "__main__":
@@ -4393,8 +4604,7 @@ if __name__ == "__main__":
         st.error("Please check logs/app.log for details")
         raise
 
-# ==
-===========================================================================
+# =============================================================================
 # NEW FEATURES - Excel Analyzer, Batch Import, Template Designer
 # =============================================================================
 
@@ -4417,6 +4627,23 @@ def show_excel_analyzer():
             tmp.write(uploaded_file.getvalue())
             tmp_path = tmp.name
         
+        # Quick fingerprint straight from the package; full analysis on demand
+        fingerprint = analyzer.fingerprint_file(tmp_path)
+        if 'error' not in fingerprint:
+            st.info(f"⚡ Suggested import mode: **{fingerprint['import_mode']}** "
+                    f"({fingerprint['total_sheets']} sheets, {fingerprint['summary']['total_formulas']:,} formulas, "
+                    f"{fingerprint['summary']['total_colored_cells']:,} template cells; "
+                    f"fingerprint in {fingerprint['seconds'] * 1000:.0f} ms)")
+            if not st.checkbox("🔬 Run full analysis (sample data and cell details)"):
+                for rec in analyzer.get_import_recommendations(fingerprint):
+                    st.info(rec)
+                for sheet_name, sheet_data in fingerprint['sheets'].items():
+                    st.caption(f"📄 {sheet_name}: {sheet_data['dimensions']}, "
+                               f"{sheet_data['formula_count']:,} formulas, "
+                               f"🟡 {sheet_data['yellow_cells']} / 🟢 {sheet_data['green_cells']} cells")
+                Path(tmp_path).unlink()
+                return
+        
         with st.spinner("Analyzing file structure..."):
             analysis = analyzer.analyze_file(tmp_path)
         
@@ -4539,6 +4766,18 @@ def show_batch_import():
         with col2:
             skip_errors = st.checkbox("Skip files with errors", value=True)
         
+        if st.button("🕒 Run in Background",
+                     help="Queue one import job per file; import the results into the project "
+                          "from the Background Jobs page"):
+            user_id = st.session_state.user_session['user_id']
+            project = st.session_state.get('current_project')
+            for file_path in file_paths:
+                get_background_jobs().submit(user_id, 'import',
+                                             {'file_path': file_path, 'project_id': getattr(project, 'id', None)},
+                                             title=f"Import {os.path.basename(file_path)}",
+                                             max_retries=0 if skip_errors else 1)
+            st.success(f"✅ {len(file_paths)} import job(s) queued. See ⏳ Background Jobs.")
+        
         # Start import
         if st.button("🚀 Start Batch Import", type="primary"):
             progress_bar = st.progress(0)
@@ -4607,6 +4846,103 @@ def show_batch_import():
             st.success("Temporary files cleared")
 
 
+def render_job_status_badge():
+    """Sidebar line with the user's active background jobs"""
+    user_id = st.session_state.user_session['user_id']
+    active = [job for job in get_background_jobs().jobs_for_user(user_id, limit=20)
+              if job['status'] not in FINISHED_STATUSES]
+    if active:
+        st.info(f"⏳ {len(active)} background job(s) in progress")
+
+
+def apply_import_job(job: Dict):
+    """Load a finished background import's sheets into the open project"""
+    project = st.session_state.current_project
+    if job['result'].get('project_id') not in (None, project.id):
+        st.warning("⚠️ This file was queued for another project; importing it into the open one")
+    try:
+        loaded = import_project(job['artifact_path'])
+    except Exception as e:
+        st.error(f"❌ Could not load {job['title']}: {str(e)}")
+        return
+    open_project_aggregates(project)
+    st.session_state.measurements.update(loaded['measurements'])
+    st.session_state.abstracts.update(loaded['abstracts'])
+    save_project_sheets(project.id)
+    st.session_state.setdefault('_applied_import_jobs', set()).add(job['id'])
+    st.success(f"✅ {len(loaded['measurements'])} measurement and {len(loaded['abstracts'])} abstract "
+               f"sheet(s) imported into {project.name}")
+
+
+def render_job_panel(user_id: str, limit: int = 25):
+    """Job list with progress, cancel/retry and artifact downloads"""
+    runner = get_background_jobs()
+    jobs = runner.jobs_for_user(user_id, limit=limit)
+    if not jobs:
+        st.info("No background jobs yet. Start one from Batch Import or below.")
+        return
+
+    status_icons = {'queued': '🕒', 'running': '⚙️', 'succeeded': '✅', 'failed': '❌', 'cancelled': '⏹️'}
+    for job in jobs:
+        col1, col2, col3 = st.columns([4, 3, 2])
+        with col1:
+            st.markdown(f"{status_icons.get(job['status'], '•')} **{job['title']}** "
+                        f"<small>({job['job_type']}, started {format_job_time(job['started_at']) or '-'})</small>",
+                        unsafe_allow_html=True)
+        with col2:
+            st.progress(float(job['progress'] or 0), text=job['message'] or job['status'])
+        with col3:
+            if job['status'] not in FINISHED_STATUSES:
+                if st.button("⏹️ Cancel", key=f"cancel_{job['id']}"):
+                    runner.cancel(job['id'])
+                    st.rerun()
+            elif job['status'] in ('failed', 'cancelled'):
+                if st.button("🔁 Retry", key=f"retry_{job['id']}"):
+                    runner.retry(job['id'])
+                    st.rerun()
+            elif job['id'] in st.session_state.get('_applied_import_jobs', set()):
+                st.caption("✅ Imported into project")
+            elif job['job_type'] == 'import' and job['artifact_path'] and os.path.isdir(job['artifact_path']):
+                if st.button("📂 Import into Project", key=f"apply_{job['id']}",
+                             disabled=not st.session_state.get('current_project')):
+                    apply_import_job(job)
+            elif job['artifact_path'] and os.path.isfile(job['artifact_path']):
+                with open(job['artifact_path'], 'rb') as f:
+                    st.download_button("📥 Result", f.read(), file_name=os.path.basename(job['artifact_path']),
+                                       key=f"download_{job['id']}")
+        if job['status'] == 'failed' and job['error']:
+            with st.expander("Error details"):
+                st.code(job['error'])
+
+
+def show_background_jobs():
+    """Background job status page (polls the job table every few seconds)"""
+    st.title("⏳ Background Jobs")
+    st.markdown("Long imports, exports, rate matching and repricing run here without blocking the page. "
+                "Jobs keep running if you reload; bookmark this URL to return to them.")
+    user_id = st.session_state.user_session['user_id']
+    runner = get_background_jobs()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🧾 Reprice SSR Rate Book", use_container_width=True):
+            runner.submit(user_id, 'reprice', {'db_path': 'construction_estimates.db'},
+                          title="SSR rate roll-up", max_retries=1)
+            st.rerun()
+    with col2:
+        if st.session_state.get('abstracts') and st.button("📊 Export Abstracts to Excel", use_container_width=True):
+            runner.submit(user_id, 'export', {'format': 'xlsx', 'file_name': 'abstracts.xlsx'},
+                          inputs={'sheets': dict(st.session_state.abstracts), 'project_info': {}},
+                          title="Abstracts workbook")
+            st.rerun()
+
+    @st.fragment(run_every=2)
+    def job_panel():
+        render_job_panel(user_id)
+
+    job_panel()
+
+
 def show_template_designer():
     """Dynamic template designer with auto-detection"""
     st.title("🎨 Template Designer")
@@ -4655,7 +4991,12 @@ def show_template_designer():
             tmp_path = tmp.name
         
         with st.spinner("Analyzing template..."):
-            template_data = renderer.analyze_template(tmp_path)
+            try:
+                compiled = renderer.compile_template(tmp_path, st.session_state._database.db_path,
+                                                     name=uploaded_file.name)
+                template_data = compiled.summary()
+            except Exception as e:
+                template_data = {'error': str(e)}
         
         if 'error' in template_data:
             st.error(f"❌ Error: {template_data['error']}")
@@ -4673,11 +5014,10 @@ def show_template_designer():
             st.metric("🔢 Formulas", len(template_data['formulas']))
         
         # Show input fields
+        input_values = {}
         if template_data['input_fields']:
             st.subheader("🟡 Input Fields")
             
-            input_values = {}
-            
             for field in template_data['input_fields']:
                 col1, col2 = st.columns([2, 1])
                 
@@ -4707,15 +5047,26 @@ def show_template_designer():
         if template_data['output_fields']:
             st.subheader("🟢 Output Fields")
             
+            # Live outputs from the in-process formula evaluator
+            try:
+                live_outputs = {key: values[0] for key, values in
+                                renderer.compute_outputs(compiled, [input_values]).items()}
+            except ValueError as e:
+                live_outputs = {}
+                st.warning(f"⚠️ Outputs not calculated: {e}")
+            
             for field in template_data['output_fields']:
                 col1, col2 = st.columns([2, 1])
                 
                 with col1:
+                    live_value = live_outputs.get(f"{field['sheet_name']}!{field['cell_ref']}")
+                    if isinstance(live_value, (int, float)):
+                        live_value = f"{live_value:,.2f}"
                     st.text_input(
                         field['label'],
-                        value=str(field['value']) if field['value'] else 'Calculated',
+                        value=str(live_value) if live_value is not None else 'Calculated',
                         disabled=True,
-                        key=f"out_{field['cell_ref']}"
+                        key=f"out_{field['cell_ref']}_{live_value}"
                     )
                 
                 with col2:
@@ -4741,6 +5092,42 @@ def show_template_designer():
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
         
+        # Batch fill: one workbook per row, columns are cell refs (Sheet!A1) or input labels
+        with st.expander("📦 Batch Fill from CSV/Excel"):
+            inputs_file = st.file_uploader("Input sets (one row per estimate)", type=['csv', 'xlsx'],
+                                           key="template_batch_inputs")
+            if inputs_file and st.button("📦 Generate Batch"):
+                if inputs_file.name.endswith('.csv'):
+                    input_df = pd.read_csv(inputs_file)
+                else:
+                    input_df = pd.read_excel(inputs_file)
+                input_sets = input_df.astype(object).where(input_df.notna(), None).to_dict('records')
+                try:
+                    with st.spinner(f"Filling {len(input_sets)} workbooks..."):
+                        outputs = renderer.compute_outputs(compiled, input_sets)
+                        with tempfile.TemporaryDirectory() as out_dir:
+                            paths = renderer.fill_batch(compiled, input_sets, out_dir)
+                            zip_buffer = io.BytesIO()
+                            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                                for path in paths:
+                                    zf.write(path, Path(path).name)
+                    st.success(f"✅ Generated {len(paths)} workbooks")
+                    output_df = pd.DataFrame(outputs)
+                    labels = {f"{f['sheet_name']}!{f['cell_ref']}": f['label'] for f in compiled.output_fields}
+                    if len(set(labels.values())) == len(labels):
+                        output_df = output_df.rename(columns=labels)
+                    output_df.insert(0, 'File', [Path(path).name for path in paths])
+                    numeric = output_df.select_dtypes('number')
+                    if not numeric.empty:
+                        st.markdown("**Totals:** " + " | ".join(
+                            f"{name}: {total:,.2f}" for name, total in numeric.sum().items()))
+                    st.dataframe(output_df, use_container_width=True)
+                    st.download_button("📥 Download All (ZIP)", zip_buffer.getvalue(),
+                                       file_name=f"{Path(uploaded_file.name).stem}_batch.zip",
+                                       mime="application/zip")
+                except ValueError as e:
+                    st.error(f"❌ Error: {e}")
+        
         # Cleanup
         import os
         os.unlink(tmp_path)
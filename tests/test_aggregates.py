@@ -0,0 +1,63 @@
+"""Tests for incrementally maintained abstract and measurement totals"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.aggregates import AggregateStore, TrackedSheets
+
+
+def test_row_deltas_match_full_recompute(tmp_path):
+    store = AggregateStore()
+    abstracts = TrackedSheets(store, 'abstracts')
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'amount': rng.uniform(100, 1000, 500),
+        'quantity': rng.uniform(1, 10, 500),
+        'rate': rng.uniform(10, 100, 500),
+        'category': rng.choice(['Earthwork', 'Concrete', 'Masonry'], 500),
+        'ssr_code': rng.choice([f'1.{i}' for i in range(20)], 500),
+    })
+    abstracts['Civil'] = df
+
+    edited = df.drop(index=[3, 4]).copy()
+    edited.loc[10, 'amount'] = 5.0
+    edited.loc[11, 'category'] = 'Finishing'
+    edited = pd.concat([edited, pd.DataFrame([{'amount': 42.0, 'quantity': 1.0, 'category': 'Concrete'}])],
+                       ignore_index=True)
+    abstracts['Civil'] = edited
+
+    # Only the 2 deleted, 2 edited (out and in) and 1 added rows are applied
+    assert store.stats['rows_applied'] == len(df) + 7
+    assert store.audit({'abstracts': dict(abstracts)}) == []
+    assert np.isclose(store.total('abstracts'), edited['amount'].sum())
+    assert np.isclose(store.category('abstracts', 'Concrete')['amount'],
+                      edited.loc[edited['category'] == 'Concrete', 'amount'].sum())
+
+    store.save(str(tmp_path / "project.db"), "P1")
+    restored = AggregateStore.load(str(tmp_path / "project.db"), "P1")
+    assert np.isclose(restored.total('abstracts'), store.total('abstracts'))
+    assert restored.sheet('abstracts', 'Civil')['count'] == len(edited)
+
+
+def test_attached_store_saves_on_every_sheet_edit(tmp_path):
+    db_path = str(tmp_path / "project.db")
+    store = AggregateStore.load(db_path, "P1").attach(db_path, "P1")
+    abstracts = TrackedSheets(store, 'abstracts')
+    abstracts['Civil'] = pd.DataFrame({'amount': [100.0, 250.0], 'category': ['Concrete', 'Masonry']})
+    abstracts['Electrical'] = pd.DataFrame({'amount': [40.0], 'category': ['Wiring']})
+    assert np.isclose(AggregateStore.load(db_path, "P1").total('abstracts'), 390.0)
+
+    del abstracts['Electrical']
+    reopened = AggregateStore.load(db_path, "P1")
+    assert np.isclose(reopened.total('abstracts'), 350.0)
+    assert AggregateStore.load(db_path, "P2").total('abstracts') == 0
+
+    # Editing a sheet after reopening replaces its saved totals
+    reopened.attach(db_path, "P1")
+    TrackedSheets(reopened, 'abstracts')['Civil'] = pd.DataFrame({'amount': [10.0], 'category': ['Concrete']})
+    assert np.isclose(AggregateStore.load(db_path, "P1").total('abstracts'), 10.0)
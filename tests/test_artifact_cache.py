@@ -0,0 +1,58 @@
+"""Tests for the content-addressed report artifact cache"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add parent directory and the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.exporters import export_excel
+from modules.artifact_cache import ArtifactCache, stable_hash
+
+
+def test_repeat_exports_hit_and_data_changes_invalidate(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache', max_bytes=10_000)
+    builds = []
+
+    def build(path, payload):
+        builds.append(payload)
+        Path(path).write_bytes(payload)
+
+    sheets = {'Civil': pd.DataFrame({'amount': [1.0, 2.0]})}
+    inputs = {'project': {'name': 'School'}, 'abstracts': sheets}
+    out = tmp_path / 'report.pdf'
+
+    assert cache.export('pdf', inputs, out, lambda p: build(p, b'a' * 4000),
+                        {'orientation': 'Portrait'}, scope='School') == (True, False)
+    assert cache.export('pdf', {'project': {'name': 'School'}, 'abstracts': {'Civil': sheets['Civil'].copy()}},
+                        out, lambda p: build(p, b'x'), {'orientation': 'Portrait'}, scope='School') == (True, True)
+    assert out.read_bytes() == b'a' * 4000 and len(builds) == 1
+
+    # Different options are a separate artifact; changed data drops the stale ones
+    cache.export('pdf', inputs, out, lambda p: build(p, b'b' * 4000), {'orientation': 'Landscape'}, scope='School')
+    sheets['Civil'].loc[0, 'amount'] = 5.0
+    assert stable_hash(inputs) != stable_hash({'project': {'name': 'School'}, 'abstracts': {'Civil': pd.DataFrame({'amount': [1.0, 2.0]})}})
+    cache.export('pdf', inputs, out, lambda p: build(p, b'c' * 4000), {'orientation': 'Portrait'}, scope='School')
+    stats = cache.stats()
+    assert stats['entries'] == 1 and stats['invalidations'] == 2
+    assert stats['hits'] == 1 and stats['bytes_saved'] == 4000
+
+    # LRU eviction keeps the directory under max_bytes
+    for i in range(4):
+        cache.export('xlsx', {'i': i}, tmp_path / 'x.xlsx', lambda p: build(p, b'z' * 3000))
+    stats = cache.stats()
+    assert stats['size_bytes'] <= 10_000 and stats['evictions'] >= 1
+    # The oldest (the PDF) went first; files on disk match the index
+    assert len(list((tmp_path / 'cache').glob('*.xlsx'))) == stats['entries'] == 3
+    assert not list((tmp_path / 'cache').glob('*.pdf'))
+
+
+def test_engine_export_uses_cache(tmp_path):
+    cache = ArtifactCache(tmp_path / 'cache')
+    summary = {'net_cost': 100.0, 'overhead': 8.0, 'contingency': 10.0, 'gst': 18.0, 'grand_total': 136.0}
+    args = ({'CONC_M30': 2.0}, {'CONC_M30': 50.0}, None, summary)
+    assert export_excel(*args, str(tmp_path / 'a.xlsx'), cache=cache) is False
+    assert export_excel(*args, str(tmp_path / 'b.xlsx'), cache=cache) is True
+    assert (tmp_path / 'a.xlsx').read_bytes() == (tmp_path / 'b.xlsx').read_bytes()
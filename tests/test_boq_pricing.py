@@ -0,0 +1,49 @@
+"""Parity tests for dict-based and columnar BOQ pricing"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.boq import DICT_LOOKUP_MAX, ColumnarBOQ, RateIndex, price_boq, price_many
+from engine.costing import total_project_cost
+
+RATES = {'CONC_M30': 7425.0, 'REBAR_FE500': 67.0, 'FORMWORK': 850.0, 'EXCAV_SOFT': 155.0}
+
+
+@pytest.mark.parametrize('n_items', [6, DICT_LOOKUP_MAX + 50])
+def test_columnar_totals_match_dict_pricing_including_unknown_codes(n_items):
+    rng = np.random.default_rng(7)
+    rates = dict(RATES, **{f'SSR_{i}': float(rng.uniform(10, 5000)) for i in range(n_items)})
+    boq = {code: float(rng.uniform(0, 500)) for code in list(rates)[::2]}
+    boq.update({'NOT_IN_BOOK': 12.5, 'ALSO_MISSING': 3.0})
+    index = RateIndex.from_dict(rates)
+    columnar = ColumnarBOQ.from_dict(boq, index)
+
+    for params in ({}, {'overhead': 0.12, 'contingency': 0.05, 'gst': 0.0}):
+        expected = total_project_cost(boq, rates, **params)
+        via_columnar = total_project_cost(columnar, None, **params)
+        priced = price_boq(columnar, **params)
+        for key, value in expected.items():
+            assert via_columnar[key] == pytest.approx(value, rel=1e-12)
+            assert priced[key] == pytest.approx(value, rel=1e-12)
+
+    # Unknown codes price at zero, per item as well as in the totals
+    amounts = dict(zip(columnar.codes, columnar.amounts))
+    assert amounts['NOT_IN_BOOK'] == 0.0 and amounts['ALSO_MISSING'] == 0.0
+    assert 'NOT_IN_BOOK' not in index
+
+
+def test_price_many_matches_pricing_each_boq_alone():
+    index = RateIndex.from_dict(RATES)
+    boqs = [ColumnarBOQ.from_dict({'CONC_M30': 10.0, 'UNKNOWN': 4.0}, index),
+            ColumnarBOQ.from_arrays(['FORMWORK', 'FORMWORK', 'EXCAV_SOFT'], [2.0, 3.0, 40.0], index)]
+    dict_boqs = [{'CONC_M30': 10.0, 'UNKNOWN': 4.0}, {'FORMWORK': 5.0, 'EXCAV_SOFT': 40.0}]
+
+    for priced, boq in zip(price_many(boqs), dict_boqs):
+        expected = total_project_cost(boq, RATES)
+        assert priced['grand_total'] == pytest.approx(expected['grand_total'], rel=1e-12)
+        assert priced['net_cost'] == pytest.approx(expected['net_cost'], rel=1e-12)
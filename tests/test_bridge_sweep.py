@@ -0,0 +1,58 @@
+"""Parity tests for the broadcast bridge quantity kernels and design sweep"""
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.costing import total_project_cost
+from engine.quantities import bridge_boq
+from engine.sweep import iter_grid, sweep_bridge
+
+RATES = {'CONC_M30': 7425, 'REBAR_FE500': 67, 'FORMWORK': 850, 'EXCAV_SOFT': 155}
+
+AXES = {
+    'span': [12.0, 15.0, 20.0],
+    'width': [7.5, 9.0],
+    'deck_thk': [0.2, 0.25],
+    'n_girders': [4, 5],
+    'girder_area': [0.35],
+    'pier_dia': [1.0, 1.2],
+    'pier_height': [6.0],
+    'n_piers': [2, 3],
+}
+
+
+def test_broadcast_kernels_match_scalar_calls():
+    grid = next(iter_grid(AXES, chunk_size=10_000))
+    vector_boq = bridge_boq(*(grid[name] for name in AXES))
+
+    combos = list(itertools.product(*AXES.values()))
+    assert len(combos) == len(grid['span'])
+    for i, combo in enumerate(combos):
+        scalar_boq = bridge_boq(*combo)
+        for code, qty in scalar_boq.items():
+            assert np.isclose(vector_boq[code][i], qty)
+
+
+def test_sweep_finds_brute_force_minimum():
+    result = sweep_bridge(AXES, RATES, chunk_size=7, top=3)
+    assert result['evaluated'] == 96
+
+    totals = sorted(
+        total_project_cost(bridge_boq(*combo), RATES)['grand_total']
+        for combo in itertools.product(*AXES.values())
+    )
+    assert np.allclose(result['min_cost']['grand_total'].to_numpy(), totals[:3])
+
+    # Nothing on the Pareto front is both dearer and smaller than another design
+    front = result['pareto']
+    for _, row in front.iterrows():
+        dominated = front[(front['grand_total'] <= row['grand_total'])
+                          & (front['deck_area'] >= row['deck_area'])
+                          & ((front['grand_total'] < row['grand_total'])
+                             | (front['deck_area'] > row['deck_area']))]
+        assert dominated.empty
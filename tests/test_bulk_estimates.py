@@ -0,0 +1,41 @@
+"""Tests for bulk estimate generation"""
+import sys
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.bulk_estimates import generate_bulk_estimates
+
+
+def test_bulk_estimates_group_by_work_and_report_totals(tmp_path):
+    works = pd.DataFrame({
+        'work_name': ['Boundary Wall', 'School Block', 'Boundary Wall'],
+        'description': ['Brick work 1:6', 'PCC 1:4:8', 'Plaster 12mm'],
+        'nos': [1, 2, 2],
+        'length': [50.0, 10.0, 30.0],
+        'breadth': [0.23, 5.0, 3.5],
+        'height': [2.5, 0.1, None],
+        'unit': ['Cum', 'Cum', 'Sqm'],
+        'rate': [4850.0, 5200.0, 185.0],
+        'client': [None, 'Education Department', None],
+    })
+    manifest = generate_bulk_estimates(works, tmp_path, workers=1)
+
+    assert manifest['work_name'].tolist() == ['Boundary Wall', 'School Block']
+    assert manifest['status'].tolist() == ['success', 'success']
+    assert manifest['items'].tolist() == [2, 1]
+    wall_total = 50 * 0.23 * 2.5 * 4850 + 2 * 30 * 3.5 * 185
+    assert manifest['total_amount'].tolist() == pytest.approx([wall_total, 10 * 5200.0])
+
+    wb = openpyxl.load_workbook(manifest.loc[0, 'file_path'])
+    assert wb.sheetnames == ['Technical Report', 'Measurements', 'Abstract']
+    assert wb['Technical Report']['C5'].value == 'PWD Rajasthan'
+    assert [c.value for c in wb['Measurements'][5]] == [2, 'Plaster 12mm', 2, 30, 3.5, None, 210.0, 'Sqm']
+    assert wb['Abstract']['B6'].value == 'TOTAL'
+    assert wb['Abstract']['F6'].value == pytest.approx(round(wall_total, 2))
+    assert wb['Abstract']['A3'].font.b
@@ -0,0 +1,88 @@
+"""Tests for the command-line interface"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from estimator_cli.main import main
+
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def _write_boq(path, rows):
+    path.write_text("item_code,quantity\n" + "".join(f"{code},{qty}\n" for code, qty in rows))
+    return path
+
+
+def test_price_reports_totals_and_unknown_codes(tmp_path, capsys):
+    _write_boq(tmp_path / "a.csv", [("CONC_M30", 12.5), ("NOPE", 1)])
+    (tmp_path / "b.json").write_text(json.dumps({"CONC_M40": 2}))
+    summary = tmp_path / "summary.csv"
+
+    code = main(["price", str(tmp_path / "*.csv"), str(tmp_path / "*.json"), "--json",
+                 "--summary", str(summary)])
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert code == 0
+    assert [Path(r["file"]).name for r in results] == ["a.csv", "b.json"]
+    assert results[0]["unknown_codes"] == 1
+    assert results[1]["grand_total"] > results[1]["net_cost"] > 0
+    assert summary.read_text().splitlines()[0].startswith("file,items,unknown_codes")
+
+
+def test_bad_files_are_reported_without_stopping_the_batch(tmp_path, capsys):
+    good = _write_boq(tmp_path / "good.csv", [("CONC_M30", 1)])
+    bad = tmp_path / "bad.csv"
+    bad.write_text("foo,bar\n1,2\n")
+
+    code = main(["export-xlsx", str(bad), str(good), "--out-dir", str(tmp_path / "out"), "--jobs", "2"])
+
+    out = capsys.readouterr().out
+    assert code == 1
+    assert "❌" in out and "✅" in out
+    assert (tmp_path / "out" / "good.xlsx").exists()
+    assert main(["price", str(tmp_path / "missing*.csv")]) == 2
+
+
+def test_price_does_not_import_pandas(tmp_path):
+    boq = _write_boq(tmp_path / "boq.csv", [("CONC_M30", 3)])
+    script = ("import sys\n"
+              "from estimator_cli.main import main\n"
+              f"code = main(['price', {str(boq)!r}])\n"
+              "print('pandas' in sys.modules, code)\n")
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "False 0"
+
+
+def test_scenarios_writes_one_row_per_grid_point(tmp_path, capsys):
+    boq = _write_boq(tmp_path / "bridge.csv", [("CONC_M30", 10), ("REBAR_FE500", 800)])
+
+    code = main(["scenarios", str(boq), "--overhead", "0.05", "0.08", "--gst", "0.12", "0.18",
+                 "--escalate", "CONC=0,0.1", "--out-dir", str(tmp_path / "out"), "--json"])
+
+    result = json.loads(capsys.readouterr().out)
+    assert code == 0
+    assert result["scenarios"] == 8
+    assert result["max_grand_total"] > result["min_grand_total"] > 0
+    lines = (tmp_path / "out" / "bridge_scenarios.csv").read_text().splitlines()
+    assert len(lines) == 9 and "escalation_CONC" in lines[0]
+
+
+def test_risk_reports_reproducible_percentiles(tmp_path, capsys):
+    boq = _write_boq(tmp_path / "bridge.csv", [("CONC_M30", 10), ("REBAR_FE500", 800)])
+    argv = ["risk", str(boq), "--quantity", "CONC=0.95,1,1.1", "--rate", "REBAR=0.12",
+            "--trials", "5000", "--seed", "3", "--json"]
+
+    assert main(argv) == 0
+    first = json.loads(capsys.readouterr().out)
+    assert main(argv) == 0
+    assert json.loads(capsys.readouterr().out) == first
+    assert first["trials"] == 5000
+    assert first["p50"] <= first["p80"] <= first["p90"]
+    assert first["mean"] == pytest.approx(first["deterministic_total"], rel=0.05)
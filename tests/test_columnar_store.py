@@ -0,0 +1,60 @@
+"""Tests for Parquet export/import of project data and archive datasets"""
+import sys
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.columnar_store import export_project, import_project, read_archive_dataset
+from project_archive_manager import ProjectArchiveManager
+
+
+def test_project_round_trip_with_dictionary_columns(tmp_path):
+    measurements = {
+        'Civil': pd.DataFrame({'description': ['Excavation', 'PCC'], 'nos': [1, 2],
+                               'length': [10.0, None], 'unit': ['cum', 'cum'],
+                               'ssr_code': ['2.1', None], 'ssr_match_confidence': [0.9, 0.0]}),
+        'Electrical': pd.DataFrame({'description': ['Wiring'], 'nos': [3], 'length': [5.0],
+                                    'unit': ['rm'], 'ssr_code': ['E.4'], 'ssr_match_confidence': [0.8]}),
+    }
+    abstracts = {'Abstract': pd.DataFrame({'ssr_code': ['2.1'], 'description': ['Excavation'],
+                                           'quantity': [10.0], 'rate': [92.0], 'amount': [920.0]})}
+    paths = export_project(tmp_path, {'name': 'School Block'}, measurements, abstracts)
+
+    schema = pq.read_schema(paths['measurements'])
+    assert str(schema.field('unit').type).startswith('dictionary')
+    assert str(schema.field('ssr_code').type).startswith('dictionary')
+
+    project = import_project(tmp_path)
+    assert project['project_info'] == {'name': 'School Block'}
+    assert list(project['measurements']) == ['Civil', 'Electrical']
+    for name, df in measurements.items():
+        pd.testing.assert_frame_equal(project['measurements'][name], df, check_dtype=False)
+    pd.testing.assert_frame_equal(project['abstracts']['Abstract'], abstracts['Abstract'], check_dtype=False)
+    assert project['ssr_matches']['ssr_code'].tolist() == ['2.1', 'E.4']
+
+    categorical = import_project(tmp_path, categorical=True)
+    assert isinstance(categorical['measurements']['Civil']['unit'].dtype, pd.CategoricalDtype)
+
+
+def test_archive_dataset_partitioned_by_category(tmp_path):
+    archive = ProjectArchiveManager(str(tmp_path / 'archives'))
+    for category, rate in (('1_BUILDINGS', 92.0), ('2_BRIDGES', 5850.0)):
+        wb = openpyxl.Workbook()
+        wb.active.append(['S.No', 'Description', 'Quantity', 'Unit', 'Rate', 'Amount'])
+        wb.active.append(['1', 'Earth work in excavation', 10, 'cum', rate, 10 * rate])
+        source = tmp_path / f'{category}.xlsx'
+        wb.save(source)
+        assert archive.archive_project(str(source), category, {'project_name': category})['success']
+
+    result = archive.export_dataset(str(tmp_path / 'dataset'))
+    assert result['rows'] == 2 and result['categories'] == ['1_BUILDINGS', '2_BRIDGES']
+    assert (tmp_path / 'dataset' / 'category=2_BRIDGES').is_dir()
+
+    bridges = read_archive_dataset(str(tmp_path / 'dataset'), '2_BRIDGES')
+    assert bridges['rate'].tolist() == [5850.0] and bridges['unit'].tolist() == ['cum']
+    assert len(read_archive_dataset(str(tmp_path / 'dataset'))) == 2
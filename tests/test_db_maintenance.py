@@ -0,0 +1,113 @@
+"""Tests for online and page-level incremental database backups"""
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.db_maintenance import (apply_page_delta, online_backup,
+                                    page_hashes, run_pragma_task,
+                                    write_page_delta)
+
+
+def _make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE items (code TEXT, rate REAL)")
+    conn.executemany("INSERT INTO items VALUES (?, ?)",
+                     [(f"1.{i}", i * 10.0) for i in range(2000)])
+    conn.commit()
+    return conn
+
+
+def test_online_backup_of_live_wal_database(tmp_path):
+    """Backup sees committed rows even while they are still in the WAL"""
+    conn = _make_db(tmp_path / "live.db")
+    written = online_backup(str(tmp_path / "live.db"), str(tmp_path / "copy.db"))
+
+    assert written > 0
+    copy = sqlite3.connect(tmp_path / "copy.db")
+    assert copy.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2000
+    copy.close()
+    conn.close()
+
+
+def test_page_delta_roundtrip(tmp_path):
+    """Base + delta reproduces the later snapshot and stores only changed pages"""
+    conn = _make_db(tmp_path / "live.db")
+    online_backup(str(tmp_path / "live.db"), str(tmp_path / "base.db"))
+    _, base_hashes = page_hashes(str(tmp_path / "base.db"))
+
+    conn.execute("UPDATE items SET rate = 1.0 WHERE code = '1.5'")
+    conn.execute("DELETE FROM items WHERE rowid > 1500")
+    conn.commit()
+    online_backup(str(tmp_path / "live.db"), str(tmp_path / "snap.db"))
+
+    written, snap_hashes, changed = write_page_delta(
+        str(tmp_path / "snap.db"), base_hashes, str(tmp_path / "inc.delta"))
+    assert 0 < changed < len(snap_hashes)
+    assert written < (tmp_path / "snap.db").stat().st_size
+
+    shutil.copyfile(tmp_path / "base.db", tmp_path / "restored.db")
+    apply_page_delta(str(tmp_path / "restored.db"), str(tmp_path / "inc.delta"))
+    assert page_hashes(str(tmp_path / "restored.db"))[1] == snap_hashes
+
+    restored = sqlite3.connect(tmp_path / "restored.db")
+    assert restored.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1500
+    assert restored.execute("SELECT rate FROM items WHERE code = '1.5'").fetchone()[0] == 1.0
+    restored.close()
+    conn.close()
+
+
+def test_incremental_vacuum_skipped_without_auto_vacuum(tmp_path):
+    _make_db(tmp_path / "live.db").close()
+    run = run_pragma_task(str(tmp_path / "live.db"), "incremental_vacuum")
+    assert run.status == "skipped"
+    assert run_pragma_task(str(tmp_path / "live.db"), "optimize").status == "ok"
+
+
+def test_one_scheduler_serves_every_database(tmp_path):
+    """Concurrent incremental backups share one manager and never clash on snapshots"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from modules.db_maintenance import MaintenanceScheduler
+    from modules.performance_optimizer import BackupManager
+
+    manager = BackupManager(str(tmp_path / "backups"))
+    paths = [str(tmp_path / f"session_{i}.db") for i in range(2)]
+    for path in paths:
+        _make_db(path).close()
+        manager.create_backup(path)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(manager.create_incremental_backup, paths * 4))
+    assert not list((tmp_path / "backups").glob("gen_*/.snapshot*"))
+    assert all(run['status'] == 'ok' for run in manager.recent_runs())
+
+    scheduler = MaintenanceScheduler(manager, intervals={'incremental_backup': 1e-6, 'optimize': 0,
+                                                         'analyze': 0, 'incremental_vacuum': 0})
+    for path in paths + paths:
+        scheduler.add_database(path)
+    scheduler.add_database(str(tmp_path / "closed_session.db"))
+    runs = scheduler.run_pending()
+    assert sorted(run.db_path for run in runs) == sorted(paths)
+    assert len(scheduler.databases) == 2
+
+
+def test_incremental_vacuum_reclaims_pages_once_enabled(tmp_path):
+    from modules.db_maintenance import enable_incremental_vacuum
+
+    path = str(tmp_path / "live.db")
+    _make_db(path).close()
+    assert enable_incremental_vacuum(path) is True
+    assert enable_incremental_vacuum(path) is False
+
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM items")
+    conn.commit()
+    conn.close()
+    run = run_pragma_task(path, "incremental_vacuum")
+    assert run.status == "ok"
+    assert run.detail.startswith("reclaimed") and run.detail != "reclaimed 0 bytes"
@@ -0,0 +1,28 @@
+"""Tests for the buffered activity/audit event logger"""
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.event_logger import EventLogger
+
+
+def test_events_are_batched_and_flushed_on_close(tmp_path):
+    db_path = str(tmp_path / "events.db")
+    event_logger = EventLogger(db_path, batch_size=1000, flush_interval_ms=60000, capacity=50)
+
+    for i in range(120):
+        assert event_logger.log(action="login", entity_type="security", entity_id=str(i))
+
+    metrics = event_logger.metrics()
+    assert metrics['backpressure_flushes'] >= 2
+    assert metrics['dropped'] == 0
+
+    event_logger.close()
+    assert not event_logger.log(action="late", entity_type="security")
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM activity_log").fetchone()[0] == 120
+    conn.close()
@@ -0,0 +1,60 @@
+"""Tests for the Excel analyzer fingerprint mode"""
+import sys
+from pathlib import Path
+
+import openpyxl
+from openpyxl.styles import PatternFill
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.excel_analyzer import ExcelAnalyzer
+
+
+def _workbook(path, sheet_names, colored=False):
+    wb = openpyxl.Workbook()
+    wb.active.title = sheet_names[0]
+    for name in sheet_names[1:]:
+        wb.create_sheet(name)
+    ws = wb.active
+    for row in range(1, 31):
+        ws.cell(row, 1, f"Item {row}")
+        ws.cell(row, 2, row * 1.5)
+        ws.cell(row, 3, f"=B{row}*2")
+    if colored:
+        ws['B1'].fill = PatternFill('solid', start_color='FFFFFF00')
+        ws['C1'].fill = PatternFill('solid', start_color='FF90EE90')
+    ws.merge_cells('E1:F1')
+    wb.save(path)
+    return str(path)
+
+
+def test_fingerprint_matches_full_analysis(tmp_path):
+    analyzer = ExcelAnalyzer()
+    files = [
+        _workbook(tmp_path / 'template.xlsx', ['Calc'], colored=True),
+        _workbook(tmp_path / 'estimate.xlsx', ['Measurement', 'Abstract']),
+        _workbook(tmp_path / 'other.xlsx', ['Data']),
+    ]
+
+    for file_path, mode in zip(files, ['Dynamic Template', 'Standard Estimate', 'Auto-detect']):
+        fingerprint = analyzer.fingerprint_file(file_path)
+        full = analyzer.analyze_file(file_path)
+        assert fingerprint['import_mode'] == analyzer.get_import_mode(full) == mode
+        assert fingerprint['summary']['total_formulas'] == full['summary']['total_formulas'] == 30
+        assert fingerprint['summary']['total_colored_cells'] == full['summary']['total_colored_cells']
+        assert fingerprint['sheet_names'] == full['sheet_names']
+
+    sheet = analyzer.fingerprint_file(files[0])['sheets']['Calc']
+    assert (sheet['max_row'], sheet['max_column'], sheet['merged_cells']) == (30, 6, 1)
+    assert (sheet['yellow_cells'], sheet['green_cells']) == (1, 1)
+
+
+def test_fingerprint_reports_non_xlsx_files(tmp_path):
+    path = tmp_path / 'legacy.xlsx'
+    path.write_bytes(b'not a zip file')
+
+    analyzer = ExcelAnalyzer()
+    rows = analyzer.triage([str(path)])
+    assert rows[0]['import_mode'] == 'Error'
+    assert rows[0]['error']
@@ -0,0 +1,90 @@
+"""Tests for the in-process Excel formula evaluator"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pytest
+from openpyxl.styles import PatternFill
+from openpyxl.workbook.defined_name import DefinedName
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.dynamic_template_renderer import DynamicTemplateRenderer
+from modules.excel_formulas import (TemplateEvaluator, WorkbookModel,
+                                    get_template_evaluator, parse_formula)
+from modules.formula_engine import FormulaError
+
+
+def _evaluate(formula, cells=None):
+    model = WorkbookModel(dict(cells or {}), {'S!Z1': formula})
+    return TemplateEvaluator(model).evaluate({}, ['S!Z1'])['S!Z1']
+
+
+@pytest.mark.parametrize("formula, expected", [
+    ("=1+2*3", 7),
+    ("=-2^2", 4),
+    ("=2^3^2", 64),
+    ("=50%*4", 2),
+    ("=ROUND(2.675, 2)", 2.68),
+    ("=ROUND(-2.5, 0)", -3),
+    ("=SUM(A1:A3, 10)", 16),
+    ("=PRODUCT(A1:A3)", 6),
+    ("=MAX(A1:A3) - MIN(A1, A2)", 2),
+    ('=IF(A2>1, "yes", "no") & "!"', "yes!"),
+])
+def test_formula_subset_matches_excel(formula, expected):
+    assert _evaluate(formula, {'S!A1': 1.0, 'S!A2': 2.0, 'S!A3': 3.0}) == expected
+
+
+def test_unsupported_and_circular_formulas_raise():
+    with pytest.raises(FormulaError):
+        parse_formula("=VLOOKUP(A1, B1:C9, 2)+")
+    with pytest.raises(FormulaError):
+        _evaluate("=INDIRECT(A1)")
+    model = WorkbookModel({}, {'S!A1': '=A2+1', 'S!A2': '=A1'})
+    with pytest.raises(FormulaError):
+        TemplateEvaluator(model).evaluate({}, ['S!A1'])
+
+
+def test_compute_outputs_for_batch_with_cross_sheet_and_named_ranges(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Calc'
+    for row, (label, value) in enumerate([('Length', 10), ('Width', 5)], start=1):
+        ws.cell(row, 1, label)
+        ws.cell(row, 2, value).fill = PatternFill('solid', start_color='FFFFFF00')
+    ws['A3'] = 'Area'
+    ws['B3'] = '=B1*B2'
+    ws['A4'] = 'Cost'
+    ws['B4'] = '=ROUND(B3*Rates!B1*(1+GST), 2)'
+    for cell in ('B3', 'B4'):
+        ws[cell].fill = PatternFill('solid', start_color='FF90EE90')
+    rates = wb.create_sheet('Rates')
+    rates['B1'] = 100
+    rates['B2'] = 0.18
+    wb.defined_names['GST'] = DefinedName('GST', attr_text='Rates!$B$2')
+    path = tmp_path / 'template.xlsx'
+    wb.save(path)
+
+    renderer = DynamicTemplateRenderer()
+    compiled = renderer.compile_template(str(path), str(tmp_path / 'templates.db'))
+    outputs = renderer.compute_outputs(compiled, [{'Length': 2}, {'Calc!B2': 0.5}, {}])
+
+    np.testing.assert_allclose(outputs['Calc!B3'], [10, 5, 50])
+    np.testing.assert_allclose(outputs['Calc!B4'], [1180, 590, 5900])
+
+
+def test_template_evaluator_cached_by_template_id_across_temp_paths(tmp_path):
+    wb = openpyxl.Workbook()
+    wb.active['A1'] = 2
+    wb.active['A2'] = '=A1*3'
+    first, second = tmp_path / 'upload_1.xlsx', tmp_path / 'upload_2.xlsx'
+    wb.save(first)
+    wb.save(second)
+
+    evaluator = get_template_evaluator('same-template', str(first))
+    first.unlink()
+    assert get_template_evaluator('same-template', str(second)) is evaluator
+    assert get_template_evaluator('same-template', str(first)) is evaluator
@@ -0,0 +1,32 @@
+"""Tests for the streaming BOQ Excel exporter"""
+import sys
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+# Add the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.exporters import export_excel
+
+
+def test_export_excel_round_trip(tmp_path):
+    rates = {'CONC_M30': 7500.0, 'REBAR_FE500': 68.0}
+    rates_full = pd.DataFrame({
+        'description': ['Concrete M30', 'Rebar Fe500 & bending <cut>'],
+        'unit': ['cum', 'kg'],
+    }, index=['CONC_M30', 'REBAR_FE500'])
+    boq = {'CONC_M30': 12.5, 'REBAR_FE500': 1500.0, 'UNKNOWN': 3.0}
+    summary = {'net_cost': 195750.0, 'overhead': 1.0, 'contingency': 2.0, 'gst': 3.0, 'grand_total': 195756.0}
+    path = tmp_path / 'boq.xlsx'
+
+    export_excel(boq, rates, rates_full, summary, str(path))
+
+    rows = list(openpyxl.load_workbook(path)['BOQ'].iter_rows(values_only=True))
+    assert rows[0] == ('Item Code', 'Description', 'Unit', 'Quantity', 'Rate (₹)', 'Amount (₹)')
+    assert rows[1] == ('CONC_M30', 'Concrete M30', 'cum', 12.5, 7500.0, 93750.0)
+    assert rows[2][1] == 'Rebar Fe500 & bending <cut>'
+    assert rows[3] == ('UNKNOWN', 'UNKNOWN', 'unit', 3.0, 0.0, 0.0)
+    assert rows[-1][4:] == ('Grand Total:', 195756.0)
+    assert len(rows) == 1 + 3 + 5
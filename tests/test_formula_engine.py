@@ -0,0 +1,31 @@
+"""Tests for the compiled measurement formula engine"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.formula_engine import FormulaError, compile_formula
+
+
+def test_variables_are_bound_by_name_not_substring():
+    formula = compile_formula("length_total - length")
+    assert formula.variables == ("length_total", "length")
+    assert formula(length_total=10, length=4) == 6.0
+
+
+def test_caret_is_power_and_rows_are_vectorized():
+    formula = compile_formula("nos * 3.14159 * (diameter/2)^2 * height")
+    assert formula is compile_formula("nos * 3.14159 * (diameter/2)^2 * height")
+
+    rows = {"nos": np.array([1, 2]), "diameter": np.array([2.0, 4.0]), "height": 1.0}
+    assert np.allclose(formula.evaluate(rows), [3.14159, 2 * 3.14159 * 4])
+
+
+@pytest.mark.parametrize("text", ['__import__("os")', "x.__class__", "open(1)", "lambda: 1", "'a'"])
+def test_disallowed_syntax_is_rejected(text):
+    with pytest.raises(FormulaError):
+        compile_formula(text)
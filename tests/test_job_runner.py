@@ -0,0 +1,148 @@
+"""Tests for the SQLite-backed background job runner"""
+import os
+import sys
+import threading
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.job_runner import JobCancelled, JobContext, JobRunner
+
+
+def test_progress_retry_cancel_and_per_user_cap(tmp_path):
+    runner = JobRunner(tmp_path / 'jobs.db', tmp_path / 'artifacts', thread_workers=4,
+                       per_user_limit=1, poll_interval=0.05)
+    release = threading.Event()
+    calls = []
+
+    def slow(ctx, payload):
+        ctx.progress(0.5, 'half way')
+        while not release.wait(0.02):
+            ctx.progress(0.5, 'waiting')
+        return {'value': payload['n']}
+
+    def flaky(ctx, payload):
+        calls.append(ctx.job_id)
+        if len(calls) < 2:
+            raise RuntimeError('transient')
+        return {'ok': True}
+
+    runner.register('slow', slow)
+    runner.register('flaky', flaky)
+    try:
+        first = runner.submit('alice', 'slow', {'n': 1})
+        second = runner.submit('alice', 'slow', {'n': 2})
+        other = runner.submit('bob', 'flaky', max_retries=1)
+
+        # Bob is not blocked by Alice; his job succeeds on the retry
+        assert runner.wait(other, 10)['status'] == 'succeeded' and len(calls) == 2
+        # Alice's second job waits for her first (cap of one running job)
+        assert runner.get(first)['status'] == 'running'
+        assert runner.get(first)['message'] == 'waiting'
+        assert runner.get(second)['status'] == 'queued'
+
+        assert runner.cancel(first)
+        assert runner.wait(first, 10)['status'] == 'cancelled'
+        release.set()
+        job = runner.wait(second, 10)
+        assert job['status'] == 'succeeded' and job['result'] == {'value': 2} and job['progress'] == 1
+        assert [j['id'] for j in runner.jobs_for_user('alice')] == [second, first]
+        assert runner.retry(first) and runner.wait(first, 10)['status'] == 'succeeded'
+    finally:
+        release.set()
+        runner.shutdown()
+
+
+def test_jobs_survive_restart_and_export_in_process_pool(tmp_path):
+    db, artifacts = tmp_path / 'jobs.db', tmp_path / 'artifacts'
+    # A job left running by a dead server process is picked up again
+    runner = JobRunner(db, artifacts, autostart=False)
+    sheets = {'Abstract': pd.DataFrame({'Description': ['Earthwork'], 'Amount': [1200.0]})}
+    job_id = runner.submit('alice', 'export', {'format': 'xlsx', 'file_name': 'clone.xlsx'},
+                           inputs={'sheets': sheets, 'project_info': {'Project': 'School'}})
+    assert runner._claim(job_id)
+
+    runner = JobRunner(db, artifacts, process_workers=1, poll_interval=0.05)
+    try:
+        job = runner.wait(job_id, 60)
+        assert job['status'] == 'succeeded' and job['attempts'] == 2
+        wb = openpyxl.load_workbook(job['artifact_path'])
+        assert wb.sheetnames == ['Metadata', 'Abstract']
+    finally:
+        runner.shutdown()
+
+
+def test_job_context_raises_when_cancelled(tmp_path):
+    runner = JobRunner(tmp_path / 'jobs.db', tmp_path / 'artifacts', autostart=False)
+    runner.register('noop', lambda ctx, payload: None)
+    job_id = runner.submit('alice', 'noop')
+    runner._claim(job_id)
+    ctx = JobContext(runner.db_path, job_id, runner.artifact_dir)
+    ctx.progress(0.25)
+    runner.cancel(job_id)
+    with pytest.raises(JobCancelled):
+        ctx.progress(0.5)
+    assert ctx.cancelled()
+
+
+def _kill_worker(ctx, payload):
+    os._exit(1)
+
+
+def _echo(ctx, payload):
+    return {'n': payload['n']}
+
+
+def test_pool_recovers_after_worker_dies(tmp_path):
+    runner = JobRunner(tmp_path / 'jobs.db', tmp_path / 'artifacts', process_workers=1, poll_interval=0.05)
+    runner.register('crash', _kill_worker, 'process')
+    runner.register('echo', _echo, 'process')
+    try:
+        crashed = runner.wait(runner.submit('alice', 'crash'), 60)
+        assert crashed['status'] == 'failed' and crashed['attempts'] == 2
+        job = runner.wait(runner.submit('alice', 'echo', {'n': 7}), 60)
+        assert job['status'] == 'succeeded' and job['result'] == {'n': 7}
+    finally:
+        runner.shutdown()
+
+
+def test_non_dict_result_fails_and_frees_the_slot(tmp_path):
+    runner = JobRunner(tmp_path / 'jobs.db', tmp_path / 'artifacts', per_user_limit=1, poll_interval=0.05)
+    runner.register('bad', lambda ctx, payload: [1, 2])
+    runner.register('good', lambda ctx, payload: {'ok': True})
+    try:
+        bad = runner.wait(runner.submit('alice', 'bad'), 10)
+        assert bad['status'] == 'failed' and 'expected a dict' in bad['error']
+        assert runner.wait(runner.submit('alice', 'good'), 10)['status'] == 'succeeded'
+    finally:
+        runner.shutdown()
+
+
+def test_import_job_writes_a_parquet_project_folder(tmp_path):
+    from modules.columnar_store import import_project
+
+    workbook = tmp_path / 'school.xlsx'
+    with pd.ExcelWriter(workbook) as writer:
+        pd.DataFrame({'description': ['Earthwork', 'PCC'], 'quantity': [12.0, 3.5]}).to_excel(
+            writer, sheet_name='Measurement', index=False)
+        pd.DataFrame({'description': ['Earthwork'], 'amount': [1200.0]}).to_excel(
+            writer, sheet_name='General Abstract', index=False)
+
+    runner = JobRunner(tmp_path / 'jobs.db', tmp_path / 'artifacts', process_workers=1, poll_interval=0.05)
+    try:
+        job = runner.wait(runner.submit('alice', 'import', {'file_path': str(workbook), 'project_id': 'P1'}), 60)
+    finally:
+        runner.shutdown()
+
+    assert job['status'] == 'succeeded'
+    assert job['result']['measurement_sheets'] == 1 and job['result']['abstract_sheets'] == 1
+    assert job['result']['project_id'] == 'P1'
+    loaded = import_project(job['artifact_path'])
+    assert list(loaded['measurements']) == ['Measurement']
+    assert loaded['measurements']['Measurement']['quantity'].tolist() == [12.0, 3.5]
+    assert loaded['abstracts']['General Abstract']['amount'].tolist() == [1200.0]
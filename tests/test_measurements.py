@@ -0,0 +1,37 @@
+"""Tests for the shared NLBH measurement kernel"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from item_code_manager import ItemCodeManager, MultiRowMeasurementManager
+from modules.measurements import nlbh_quantities
+
+
+def test_fallbacks_circular_and_deduction_rows_in_one_pass():
+    quantities = nlbh_quantities(
+        nos=[2, 2, 2, 1, 1, 3],
+        length=[3, 3, 3, 0, 5, 0],
+        breadth=[4, 4, 0, 0, 0, 0],
+        height=[5, 0, 5, 0, 2, 0],
+        diameter=[0, 0, 0, 0, 2, 0],
+        deduction=[False, False, False, False, False, True],
+    )
+    assert np.allclose(quantities, [120, 24, 6, 1, np.pi * 2, -3])
+
+
+def test_multi_row_insert(tmp_path):
+    db_path = str(tmp_path / "measurements.db")
+    ItemCodeManager(db_path)
+    manager = MultiRowMeasurementManager(db_path)
+    rows = [{'description': f'Wall {i}', 'nos': 1, 'length': 10.0, 'breadth': 0.23,
+             'height': 3.0, 'unit': 'Cum', 'rate': 100.0} for i in range(50)]
+    assert manager.add_measurement_rows(1, '5.4.6', rows)
+
+    saved = manager.get_measurements_by_item('5.4.6')
+    assert len(saved) == 50
+    assert np.allclose(saved['total'], 6.9)
+    assert np.allclose(saved['amount'], 690.0)
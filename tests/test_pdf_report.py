@@ -0,0 +1,122 @@
+"""Tests for chunked, bounded-memory PDF table rendering"""
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.pdf_report import (FlowableStream, abstract_rows, abstracts_story,
+                                build_streaming, measurement_rows,
+                                measurements_story, report_document)
+
+
+def test_chunked_report_builds(tmp_path):
+    n = 500
+    measurements = {'Foundation': pd.DataFrame({
+        'description': ['Excavation in hard soil for trench foundations, including disposal'] * n,
+        'quantity': 2, 'length': np.linspace(1, 5, n), 'breadth': 0.6, 'height': np.nan,
+        'unit': 'cum', 'total': np.linspace(1, 5, n) * 1.2,
+    })}
+    abstracts = {'Civil': pd.DataFrame({'description': ['PCC', 'RCC'], 'unit': ['cum', 'cum'],
+                                        'quantity': [2.0, 3.0], 'rate': [4500.0, 7200.0],
+                                        'amount': [9000.0, 21600.0]})}
+
+    rows = measurement_rows(measurements['Foundation'].head(1))
+    assert rows == [['1', 'Excavation in hard soil for trench foundations, in...',
+                     '2.00', '1.00', '0.60', '', 'cum', '1.200']]
+    assert abstract_rows(abstracts['Civil'], start=10)[1] == ['12', 'RCC', 'cum', '3.00', '₹7200.00', '₹21600.00']
+
+    tables = [f for f in measurements_story(measurements, rows_per_chunk=40) if hasattr(f, 'repeatRows')]
+    assert len(tables) == 13 and all(t.repeatRows == 1 for t in tables)
+    last = [f for f in abstracts_story(abstracts) if hasattr(f, 'repeatRows')][-1]
+    assert last._cellvalues[-1][-1] == '₹30,600.00'
+
+    def story():
+        yield from measurements_story(measurements)
+        yield from abstracts_story(abstracts)
+
+    doc = report_document(str(tmp_path / 'report.pdf'))
+    build_streaming(doc, story())
+    assert (tmp_path / 'report.pdf').read_bytes().startswith(b'%PDF')
+    assert doc.page > 10
+
+
+def test_flowable_stream_materializes_only_lookahead():
+    pulled = []
+
+    def source():
+        for i in range(1000):
+            pulled.append(i)
+            yield i
+
+    stream = FlowableStream(source(), lookahead=4)
+    assert len(pulled) == 4
+    del stream[0]
+    assert stream[0] == 1 and len(pulled) == 5
+
+
+MEMORY_SCRIPT = """
+import resource, sys
+sys.path.insert(0, {root!r})
+import numpy as np, pandas as pd
+from modules.pdf_report import measurements_story
+n = 100_000
+df = pd.DataFrame({{'description': ['Brick masonry in cement mortar 1:6 in superstructure'] * n,
+                   'quantity': 1.0, 'length': np.arange(n) / 7, 'breadth': 0.23,
+                   'height': 3.0, 'unit': 'cum', 'total': np.arange(n) * 0.69 / 7}})
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+count = 0
+for flowable in measurements_story({{'Ground Floor': df}}):
+    count += 1
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in bytes on macOS and KiB on Linux
+per_mb = 1024 * 1024 if sys.platform == 'darwin' else 1024
+print(count, (after - before) / per_mb)
+"""
+
+
+@pytest.mark.skipif(sys.platform not in ('linux', 'darwin'),
+                    reason="needs the resource module and a known ru_maxrss unit")
+def test_100k_row_story_memory_ceiling():
+    """Formatting and chunking a 100k-row sheet stays within a fixed memory budget"""
+    script = MEMORY_SCRIPT.format(root=str(Path(__file__).parent.parent))
+    out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    count, grown_mb = out.stdout.split()
+    assert int(count) == 2 + 1 + 2500 + 1
+    # Formatting every row up front as Python strings takes about 100 MB
+    assert float(grown_mb) < 32
+
+
+def test_parallel_report_is_byte_stable(tmp_path):
+    from pypdf import PdfReader
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph
+
+    from modules.pdf_report import render_parallel_report
+
+    styles = getSampleStyleSheet()
+    sheets = {f'Block {i}': pd.DataFrame({'description': ['Brickwork'] * 120, 'unit': 'cum',
+                                          'quantity': 1.0, 'rate': 5200.0, 'amount': 5200.0,
+                                          'total': np.arange(120.0)}) for i in range(3)}
+    outputs = []
+    for workers in (1, 2):
+        path = tmp_path / f'report_{workers}.pdf'
+        pages = render_parallel_report(str(path), [Paragraph('Estimate', styles['Title']), PageBreak()],
+                                       [Paragraph('Summary', styles['Normal'])],
+                                       sheets, {'Abstract': sheets['Block 0']}, workers=workers)
+        outputs.append(path.read_bytes())
+    assert outputs[0] == outputs[1]
+
+    reader = PdfReader(tmp_path / 'report_2.pdf')
+    assert len(reader.pages) == pages
+    toc = reader.pages[1].extract_text()
+    assert 'TABLE OF CONTENTS' in toc and f'Page 2 of {pages}' in toc
+    # Each TOC entry points at the page that starts with its sheet heading
+    block_1 = reader.outline[2][1]
+    assert block_1.title == 'Block 1'
+    assert 'Sheet: Block 1' in reader.pages[reader.get_destination_page_number(block_1)].extract_text()
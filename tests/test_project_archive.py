@@ -0,0 +1,65 @@
+"""Tests for archive search and content indexing"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import openpyxl
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from project_archive_manager import ProjectArchiveManager
+
+
+def _estimate(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Abstract'
+    ws.append(['S.No', 'Description', 'Unit', 'Quantity', 'Rate', 'Amount'])
+    for i, (description, rate) in enumerate(rows, start=1):
+        ws.append([i, description, 'cum', 10, rate, 10 * rate])
+    wb.save(path)
+    return str(path)
+
+
+def test_rows_from_before_fts_are_searchable(tmp_path):
+    root = tmp_path / 'archives'
+    ProjectArchiveManager(str(root))
+    # Simulate a database from before the full-text indexes existed
+    with sqlite3.connect(root / 'archive_metadata.db') as conn:
+        for name in ('archived_items_fts', 'archived_projects_fts'):
+            conn.execute(f"DROP TABLE {name}")
+        for (trigger,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f"DROP TRIGGER {trigger}")
+        conn.execute("""
+            INSERT INTO archived_projects (id, file_name, original_name, category, project_name,
+                                           location, archived_date, file_path)
+            VALUES ('legacy', 'a.xlsx', 'a.xlsx', '1_BUILDINGS', 'Commercial Complex Panchayat Samiti',
+                    'Girwa', '2024-01-01', 'missing.xlsx')
+        """)
+
+    archive = ProjectArchiveManager(str(root))
+    assert archive.get_archived_projects(search_term="Panchayat")['id'].tolist() == ['legacy']
+    assert len(archive.get_archived_projects()) == 1
+
+
+def test_content_search_and_incremental_index(tmp_path):
+    archive = ProjectArchiveManager(str(tmp_path / 'archives'))
+    first = archive.archive_project(_estimate(tmp_path / 'hall.xlsx', [('RCC M25 slab', 7200), ('Brick work', 5100)]),
+                                    '1_BUILDINGS', {'project_name': 'Community Hall'})
+    assert first['indexed_items'] == 2
+
+    hits = archive.search_contents("RCC slab", min_rate=7000)
+    assert hits['description'].tolist() == ['RCC M25 slab']
+    assert archive.get_archived_projects(search_term="brick")['project_name'].tolist() == ['Community Hall']
+
+    # Everything is indexed already; a new project only indexes itself
+    assert archive.build_content_index()['indexed_projects'] == 0
+    archive.archive_project(_estimate(tmp_path / 'school.xlsx', [('Plaster 12mm', 185)]),
+                            '1_BUILDINGS', {'project_name': 'School'})
+    assert archive.build_content_index()['indexed_projects'] == 0
+
+    rebuilt = archive.build_content_index(rebuild=True)
+    assert (rebuilt['indexed_projects'], rebuilt['indexed_items']) == (2, 3)
+    assert len(archive.search_contents("slab")) == 1
+    assert archive.get_archived_projects(search_term="School")['project_name'].tolist() == ['School']
@@ -0,0 +1,87 @@
+"""Tests for the hierarchical SSR rate roll-up"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.rate_rollup import RateRollupEngine, synthetic_book
+
+
+def test_rollup_and_incremental_update_match_full_recompute(tmp_path):
+    items = pd.DataFrame([
+        {'code': 'CEMENT', 'parent_code': 'PCC', 'rate': 400.0, 'metadata': '{"coefficient": 4.4}'},
+        {'code': 'SAND', 'parent_code': 'PCC', 'rate': 1500.0, 'metadata': '{"coefficient": 0.47}'},
+        {'code': 'MASON', 'parent_code': 'PCC', 'labor_cost': 900.0, 'metadata': '{"coefficient": 0.1}'},
+        {'code': 'PCC', 'parent_code': 'FOOTING', 'labor_cost': 200.0,
+         'overhead_percentage': 10.0, 'profit_percentage': 5.0},
+        {'code': 'FOOTING', 'parent_code': None, 'equipment_cost': 50.0},
+        {'code': 'BRICK', 'parent_code': None, 'rate': 8.0},
+    ])
+    engine = RateRollupEngine(items)
+    rates = engine.compute_all()
+
+    pcc = (200 + 400 * 4.4 + 1500 * 0.47 + 900 * 0.1) * 1.10 * 1.05
+    assert rates['PCC'] == pytest.approx(pcc)
+    assert rates['FOOTING'] == pytest.approx(50 + pcc)
+    assert rates['BRICK'] == 8.0
+
+    changed = engine.update_basic_rates({'CEMENT': {'rate': 450.0}})
+    assert changed == ['CEMENT', 'PCC', 'FOOTING']
+    assert engine.timings['incremental_nodes'] == 3
+
+    # Incremental result equals a fresh full roll-up
+    book = synthetic_book(2000)
+    engine = RateRollupEngine(book)
+    engine.compute_all()
+    basic = [c for c, node in engine.nodes.items() if not node.children][:25]
+    engine.update_basic_rates({c: {'rate': 999.0} for c in basic})
+    book.loc[book['code'].isin(basic), 'rate'] = 999.0
+    assert engine.rates() == pytest.approx(RateRollupEngine(book).compute_all())
+
+    db_path = tmp_path / 'ssr.db'
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE ssr_items (code TEXT UNIQUE, rate REAL, level INTEGER, updated_at TEXT)")
+        conn.executemany("INSERT INTO ssr_items (code) VALUES (?)", [(c,) for c in engine.nodes])
+    assert engine.write_back(str(db_path), codes=engine.nodes) == len(book)
+    with sqlite3.connect(db_path) as conn:
+        stored = dict(conn.execute("SELECT code, rate FROM ssr_items").fetchall())
+    assert stored == pytest.approx(engine.rates())
+
+
+def test_default_write_back_keeps_manual_leaf_rates(tmp_path):
+    db_path = tmp_path / 'ssr.db'
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""CREATE TABLE ssr_items (code TEXT UNIQUE, parent_code TEXT, rate REAL,
+            material_cost REAL, labor_cost REAL, equipment_cost REAL, overhead_percentage REAL,
+            profit_percentage REAL, metadata TEXT, status TEXT, level INTEGER, updated_at TEXT)""")
+        conn.executemany("INSERT INTO ssr_items (code, parent_code, rate, labor_cost, status) "
+                         "VALUES (?, ?, ?, ?, 'active')", [
+                             ('MASON', 'WALL', 950.0, 900.0),  # rate corrected by hand
+                             ('BRICK', 'WALL', 8.0, None),
+                             ('WALL', None, 0.0, 100.0),
+                             ('PLASTER', None, 55.0, None),
+                         ])
+
+    engine = RateRollupEngine.from_db(str(db_path))
+    engine.compute_all()
+    assert engine.write_back(str(db_path)) == 1
+    with sqlite3.connect(db_path) as conn:
+        stored = dict(conn.execute("SELECT code, rate FROM ssr_items").fetchall())
+    assert stored['MASON'] == 950.0
+    assert stored['WALL'] == pytest.approx(100 + 900 + 8)
+    assert engine.write_back(str(db_path)) == 0
+
+    engine = RateRollupEngine.from_db(str(db_path))
+    engine.compute_all()
+    assert engine.write_back(str(db_path)) == 0
+
+
+def test_cycles_are_rejected():
+    items = pd.DataFrame([{'code': 'A', 'parent_code': 'B'}, {'code': 'B', 'parent_code': 'A'}])
+    with pytest.raises(ValueError):
+        RateRollupEngine(items)
@@ -0,0 +1,83 @@
+"""Tests for rate book discovery and the memory-mapped snapshot cache"""
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.ratebook import SNAPSHOT_VERSION, RateBookRegistry
+
+UNIT_CSV = ("item_code,description,unit,rate_inr\n"
+            "CONC_M30,M30 concrete,cum,7425\n"
+            "REBAR_FE500,Fe500 steel,kg,67\n"
+            "FORMWORK,,sqm,850\n")
+
+
+def _write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    _write(data / 'unit_rates_rajssr2024.csv', UNIT_CSV)
+    _write(data / 'unit_rates_rajssr2023.csv', UNIT_CSV.replace('7425', '7000'))
+    _write(data / 'building_rates_cpwddsr2024.csv', UNIT_CSV)
+    _write(data / 'notes_rates.csv', UNIT_CSV)  # does not follow the naming scheme
+    return data
+
+
+def test_registry_discovers_books_by_file_name(data_dir):
+    registry = RateBookRegistry(data_dir)
+    assert sorted(registry.books) == ['building_cpwddsr2024', 'unit_rajssr2023', 'unit_rajssr2024']
+
+    assert registry.get('unit').year == 2024
+    assert registry.get('unit', year=2023).rate('CONC_M30') == 7000
+    assert registry.get('building').region == 'All India'
+    assert registry.get('unit', region='Rajasthan').key == 'unit_rajssr2024'
+    with pytest.raises(KeyError):
+        registry.get('unit', region='All India')
+
+
+def test_snapshot_round_trip_is_memory_mapped(data_dir, tmp_path):
+    cache = tmp_path / 'cache'
+    from_csv = RateBookRegistry(data_dir, cache).get('unit').index
+    assert (cache / 'unit_rajssr2024' / 'meta.json').exists()
+
+    from_snapshot = RateBookRegistry(data_dir, cache).get('unit').index
+    # Snapshot arrays are used as loaded, without an object-dtype copy
+    assert isinstance(from_snapshot.codes, np.memmap)
+    assert from_snapshot.codes.dtype.kind == 'U'
+    assert not from_snapshot.rates.flags.writeable
+
+    assert from_snapshot.codes.tolist() == from_csv.codes.tolist()
+    np.testing.assert_array_equal(from_snapshot.rates, from_csv.rates)
+    assert from_snapshot.descriptions.tolist() == ['M30 concrete', 'Fe500 steel', '']
+    assert from_snapshot.position('REBAR_FE500') == 1 and 'MISSING' not in from_snapshot
+    np.testing.assert_array_equal(from_snapshot.rates_at(from_snapshot.lookup(['FORMWORK', 'MISSING'])),
+                                  [850.0, 0.0])
+
+
+def test_stale_snapshot_is_rebuilt_from_csv(data_dir, tmp_path):
+    cache = tmp_path / 'cache'
+    RateBookRegistry(data_dir, cache).get('unit').index
+
+    csv_path = data_dir / 'unit_rates_rajssr2024.csv'
+    _write(csv_path, UNIT_CSV + "EXCAV_SOFT,Soft soil excavation,cum,155\n")
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    book = RateBookRegistry(data_dir, cache).get('unit')
+    assert book.rate('EXCAV_SOFT') == 155
+    assert len(book.index) == 4
+    with open(cache / 'unit_rajssr2024' / 'meta.json', encoding='utf-8') as f:
+        assert json.load(f) == {'version': SNAPSHOT_VERSION, 'size': csv_path.stat().st_size,
+                                'mtime_ns': csv_path.stat().st_mtime_ns}
+    assert len(RateBookRegistry(data_dir, cache).get('unit').index) == 4
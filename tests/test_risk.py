@@ -0,0 +1,58 @@
+"""Tests for the Monte Carlo cost-risk simulation"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.boq import ColumnarBOQ, RateIndex
+from engine.costing import total_project_cost
+from engine.risk import RiskModel, lognormal, simulate, triangular
+
+RATES = {'CONC_M30': 7425.0, 'REBAR_FE500': 67.0, 'STEEL_ST': 72.0, 'EXCAV_SOFT': 155.0}
+BOQ = {'CONC_M30': 120.0, 'REBAR_FE500': 9500.0, 'STEEL_ST': 2000.0, 'EXCAV_SOFT': 600.0}
+
+MODEL = RiskModel(
+    quantity={'CONC': triangular(0.95, 1.0, 1.10), 'EXCAV': triangular(0.9, 1.0, 1.25)},
+    rate={'REBAR': lognormal(0.12), 'STEEL': lognormal(0.12)},
+    correlations={('REBAR', 'STEEL'): 0.8},
+)
+
+
+def _boq():
+    return ColumnarBOQ.from_dict(BOQ, RateIndex.from_dict(RATES))
+
+
+def test_same_seed_gives_same_results_regardless_of_chunking():
+    first = simulate(_boq(), MODEL, 20_000, seed=42, chunk_size=5_000)
+    again = simulate(_boq(), MODEL, 20_000, seed=42, chunk_size=5_000)
+    parallel = simulate(_boq(), MODEL, 20_000, seed=42, chunk_size=5_000, workers=2)
+    other = simulate(_boq(), MODEL, 20_000, seed=7, chunk_size=5_000)
+
+    np.testing.assert_array_equal(first['totals'], again['totals'])
+    np.testing.assert_array_equal(first['totals'], parallel['totals'])
+    assert first['percentiles'] == parallel['percentiles']
+    assert not np.array_equal(first['totals'], other['totals'])
+
+
+def test_percentiles_are_ordered_and_centred_on_the_deterministic_total():
+    result = simulate(_boq(), MODEL, 50_000, seed=0)
+    p = result['percentiles']
+    assert p[50] <= p[80] <= p[90]
+    assert result['trials'] == 50_000 and len(result['totals']) == 50_000
+
+    # Mean-one lognormal rates and mildly right-skewed quantities stay close to the point estimate
+    deterministic = total_project_cost(BOQ, RATES)['grand_total']
+    assert result['mean'] == pytest.approx(deterministic, rel=0.03)
+
+
+def test_zero_variance_reproduces_total_project_cost():
+    model = RiskModel(rate={'CONC': lognormal(0.0), 'REBAR': lognormal(0.0)})
+    result = simulate(_boq(), model, 1_000, seed=1, overhead=0.1, contingency=0.05, gst=0.12)
+    expected = total_project_cost(BOQ, RATES, 0.1, 0.05, 0.12)['grand_total']
+    assert result['mean'] == pytest.approx(expected, rel=1e-12)
+    for value in result['percentiles'].values():
+        assert value == pytest.approx(expected, rel=1e-12)
@@ -0,0 +1,40 @@
+"""Tests for broadcast what-if scenario evaluation"""
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.boq import ColumnarBOQ, RateIndex
+from engine.costing import total_project_cost
+from engine.scenarios import evaluate_grid, evaluate_scenarios
+
+RATES = {'CONC_M30': 7425.0, 'CONC_M40': 8100.0, 'REBAR_FE500': 67.0, 'FORMWORK': 850.0}
+BOQ = {'CONC_M30': 120.0, 'CONC_M40': 30.0, 'REBAR_FE500': 9500.0, 'FORMWORK': 400.0, 'UNKNOWN_X': 5.0}
+
+
+def test_each_scalar_scenario_matches_total_project_cost():
+    boq = ColumnarBOQ.from_dict(BOQ, RateIndex.from_dict(RATES))
+    overheads, contingencies, gsts = [0.0, 0.08, 0.15], [0.05, 0.10], [0.12, 0.18]
+    results = evaluate_grid(boq, overheads, contingencies, gsts)
+
+    assert len(results) == 12
+    for row, (oh, cont, gst) in zip(results.itertuples(), itertools.product(overheads, contingencies, gsts)):
+        assert (row.overhead_pct, row.contingency_pct, row.gst_pct) == (oh, cont, gst)
+        expected = total_project_cost(BOQ, RATES, oh, cont, gst)
+        for key, value in expected.items():
+            assert getattr(row, key) == pytest.approx(value, rel=1e-12)
+
+
+def test_escalation_matches_repricing_with_escalated_rates():
+    boq = ColumnarBOQ.from_dict(BOQ, RateIndex.from_dict(RATES))
+    results = evaluate_scenarios(boq, escalation={'CONC': [0.0, 0.05], 'REBAR': [0.1, 0.1]})
+
+    for row, conc, rebar in zip(results.itertuples(), [0.0, 0.05], [0.1, 0.1]):
+        escalated = {code: rate * (1 + (conc if code.startswith('CONC') else
+                                        rebar if code.startswith('REBAR') else 0.0))
+                     for code, rate in RATES.items()}
+        assert row.grand_total == pytest.approx(total_project_cost(BOQ, escalated)['grand_total'], rel=1e-12)
@@ -0,0 +1,32 @@
+"""Tests for the dependency-graph building takeoff"""
+import sys
+from pathlib import Path
+
+# Add the estimate engine to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "estimate" / "src"))
+
+from engine.takeoff import BuildingTakeoff
+
+
+def test_only_downstream_quantities_are_recomputed():
+    takeoff = BuildingTakeoff()
+    for name in ('A', 'B', 'C'):
+        takeoff.add_block(name, length=20.0, width=12.0, n_floors=3)
+    first = takeoff.boq()
+    assert first['RCC_M25'] > 0
+    assert 'SANITARY_WC' not in first
+
+    takeoff.graph.recomputed = 0
+    takeoff.boq()
+    assert takeoff.graph.recomputed == 0
+
+    # Slab thickness feeds slab concrete, total RCC and steel only
+    assert takeoff.update_block('B', slab_thk=0.2) == ['B.slab_thk']
+    second = takeoff.boq()
+    assert takeoff.graph.recomputed == 3
+    assert second['RCC_M25'] > first['RCC_M25']
+    assert second['BRICK_230_CM16'] == first['BRICK_230_CM16']
+
+    # Setting an unchanged value invalidates nothing
+    assert takeoff.update_block('A', length=20.0) == []
+    assert not takeoff.graph.dirty()
@@ -0,0 +1,70 @@
+"""Tests for compiled template filling"""
+import sqlite3
+import sys
+from pathlib import Path
+
+import openpyxl
+import pytest
+from openpyxl.styles import PatternFill
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.dynamic_template_renderer import DynamicTemplateRenderer
+
+YELLOW = PatternFill('solid', start_color='FFFFFF00')
+GREEN = PatternFill('solid', start_color='FF90EE90')
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Calc'
+    for row, (label, value) in enumerate([('Length', 10), ('Width', 5), ('Work', 'Wall')], start=1):
+        ws.cell(row, 1, label)
+        ws.cell(row, 2, value).fill = YELLOW
+    ws['A4'] = 'Area'
+    ws['B4'] = '=B1*B2'
+    ws['B4'].fill = GREEN
+    path = tmp_path / 'template.xlsx'
+    wb.save(path)
+    return path
+
+
+def test_compile_persists_map_and_reuses_it(template_path, tmp_path):
+    db_path = tmp_path / 'templates.db'
+    compiled = DynamicTemplateRenderer().compile_template(str(template_path), str(db_path))
+
+    assert [f['cell_ref'] for f in compiled.input_fields] == ['B1', 'B2', 'B3']
+    assert compiled.formulas == {'Calc!B4': '=B1*B2'}
+    assert compiled.sheet_parts == {'Calc': 'xl/worksheets/sheet1.xml'}
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM templates").fetchone()[0] == 1
+
+    reloaded = DynamicTemplateRenderer().compile_template(str(template_path), str(db_path))
+    assert reloaded.input_fields == compiled.input_fields
+    assert reloaded.template_id == compiled.template_id
+
+
+def test_fill_batch_patches_only_input_cells(template_path, tmp_path):
+    renderer = DynamicTemplateRenderer()
+    compiled = renderer.compile_template(str(template_path), str(tmp_path / 'templates.db'))
+
+    paths = renderer.fill_batch(compiled, [
+        {'Calc!B1': 12.5, 'Width': 4},
+        {'Work': 'Plaster & <Paint>'},
+    ], str(tmp_path / 'out'))
+
+    first = openpyxl.load_workbook(paths[0])['Calc']
+    assert (first['B1'].value, first['B2'].value, first['B3'].value) == (12.5, 4, 'Wall')
+    assert first['B4'].value == '=B1*B2'
+    assert first['B1'].fill.start_color.rgb == 'FFFFFF00'
+
+    second = openpyxl.load_workbook(paths[1])
+    assert second['Calc']['B3'].value == 'Plaster & <Paint>'
+    assert second.calculation.fullCalcOnLoad
+
+    with pytest.raises(ValueError):
+        renderer.fill_batch(compiled, [{'Calc!B4': 1}], str(tmp_path / 'out'))
@@ -0,0 +1,53 @@
+"""Tests for the streaming estimate workbook writer"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from modules.workbook_writer import column_widths, save_estimate_workbook
+
+
+def test_save_estimate_workbook_layout(tmp_path):
+    sheets = {
+        'Abstract': pd.DataFrame({'Description': ['Earthwork', 'PCC 1:4:8'],
+                                  'Quantity': [12.5, np.nan], 'Unit': ['cum', None]}),
+        'Measurements': pd.DataFrame({'Item': ['A'], 'Nos': [2]}),
+    }
+    path = tmp_path / 'clone.xlsx'
+    save_estimate_workbook(str(path), sheets, {'Project': 'School Block'},
+                           [{'type': 'modify', 'sheet': 'Abstract', 'timestamp': 't1'}])
+
+    wb = openpyxl.load_workbook(path)
+    assert wb.sheetnames == ['Metadata', 'Abstract', 'Measurements']
+    meta = [row for row in wb['Metadata'].iter_rows(values_only=True)]
+    assert meta[2] == ('Project', 'School Block')
+    assert meta[-1][0] == 'MODIFY: Abstract - t1'
+
+    ws = wb['Abstract']
+    assert [c.value for c in ws[1]] == ['Description', 'Quantity', 'Unit']
+    assert ws['A1'].font.b
+    assert [c.value for c in ws[3]] == ['PCC 1:4:8', None, None]
+    assert column_widths(sheets['Abstract']) == [len('Description') + 2, len('Quantity') + 2, 6]
+
+
+def test_cloning_a_clone_replaces_metadata_sheet(tmp_path):
+    from estimate_cloner import EstimateCloner
+
+    source = tmp_path / 'source.xlsx'
+    save_estimate_workbook(str(source), {'Abstract': pd.DataFrame({'Item': ['A'], 'Qty': [1.0]})},
+                           {'Project': 'Original'})
+    paths = [source]
+    for name in ('clone1.xlsx', 'clone2.xlsx'):
+        cloner = EstimateCloner()
+        cloner.load_estimate(str(paths[-1]))
+        assert cloner.save_as_new_estimate(str(tmp_path / name), {'Project': name})
+        paths.append(tmp_path / name)
+
+    wb = openpyxl.load_workbook(paths[-1])
+    assert wb.sheetnames == ['Metadata', 'Abstract']
+    assert wb['Metadata']['B3'].value == 'clone2.xlsx'